@@ -0,0 +1,183 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures the overhead of dispatching gateway events through the client.
+
+A mix of dispatches is fed through :meth:`.Client.handle_dispatches`, both buffered and streamed,
+and the handler lookup is compared against looking the handler up and inspecting it for every
+dispatch.
+
+The mix can be recorded from a real bot by logging the ``t`` and ``d`` fields of each dispatch as
+one JSON object per line, and passed with ``--recording``. The guild, channel and members it
+refers to are made up on the fly.
+
+.. code-block:: bash
+
+    $ python benchmarks/dispatch.py --events 100000
+"""
+import argparse
+import inspect
+import json
+import random
+import time
+from types import SimpleNamespace
+
+import multio
+
+from curious.core.client import Client
+from curious.core.event import EventContext
+from curious.dataclasses.bases import allow_external_makes
+from curious.dataclasses.guild import Guild
+from curious.dataclasses.user import BotUser
+
+GUILD_ID = 1 << 22
+CHANNEL_ID = GUILD_ID + 1
+MEMBERS = 1000
+
+
+def _user(n: int) -> dict:
+    return {"id": str(GUILD_ID + 10 + n), "username": f"user{n}", "discriminator": "0001",
+            "avatar": None}
+
+
+def synthetic_mix(count: int) -> list:
+    """
+    Makes a mix of dispatches, weighted roughly like a large guild.
+    """
+    rng = random.Random(1)
+    events = []
+    for n in range(count):
+        user = _user(rng.randrange(MEMBERS))
+        roll = rng.random()
+        if roll < 0.55:
+            events.append(("PRESENCE_UPDATE", {
+                "guild_id": str(GUILD_ID), "user": {"id": user["id"]}, "roles": [],
+                "status": rng.choice(["online", "idle", "dnd", "offline"]),
+                "game": {"name": "a game", "type": 0},
+            }))
+        elif roll < 0.75:
+            events.append(("TYPING_START", {
+                "channel_id": str(CHANNEL_ID), "user_id": user["id"], "timestamp": 0,
+            }))
+        elif roll < 0.9:
+            events.append(("MESSAGE_CREATE", {
+                "id": str(GUILD_ID + 1000000 + n), "channel_id": str(CHANNEL_ID),
+                "author": user, "content": "hello world", "timestamp": None,
+                "mentions": [], "mention_roles": [], "embeds": [], "attachments": [],
+            }))
+        else:
+            events.append(("GUILD_MEMBER_UPDATE", {
+                "guild_id": str(GUILD_ID), "user": user, "roles": [], "nick": f"nick{n}",
+            }))
+
+    return events
+
+
+def load_recording(path: str) -> list:
+    """
+    Loads a recorded mix of dispatches.
+    """
+    with open(path) as f:
+        return [(item["t"], item["d"]) for item in map(json.loads, f) if item.get("t")]
+
+
+def make_client(stream: bool) -> Client:
+    """
+    Makes a client with a guild for the dispatches to refer to.
+    """
+    client = Client("benchmark.token", stream_dispatches=stream)
+    with allow_external_makes():
+        client.state._user = BotUser(client, **_user(-1))
+        guild = Guild(client, id=GUILD_ID)
+        guild.from_guild_create(
+            id=str(GUILD_ID), name="benchmark",
+            roles=[{"id": str(GUILD_ID), "name": "@everyone", "permissions": 0}],
+            channels=[{"id": str(CHANNEL_ID), "name": "general", "type": 0}],
+            members=[{"user": _user(n), "roles": []} for n in range(-1, MEMBERS)],
+        )
+        guild.shard_id = 0
+        client.state._guilds[guild.id] = guild
+
+    return client
+
+
+def old_lookup(state, name: str):
+    """
+    Looks up and inspects a handler the way every dispatch used to.
+    """
+    handler = getattr(state, f"handle_{name.lower()}")
+    inspect.isawaitable(handler)
+    inspect.isasyncgen(handler)
+    return handler
+
+
+def bench_lookup(events: list):
+    client = make_client(False)
+    state = client.state
+
+    start = time.perf_counter()
+    for name, _ in events:
+        old_lookup(state, name)
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name, _ in events:
+        state.get_dispatch_handler(name)
+    new = time.perf_counter() - start
+
+    print(f"lookup, getattr + inspect: {old / len(events) * 1e9:.0f} ns/event")
+    print(f"lookup, dispatch table:    {new / len(events) * 1e9:.0f} ns/event")
+
+
+async def bench_dispatch(events: list, stream: bool):
+    client = make_client(stream)
+    client._gateways[0] = SimpleNamespace(gw_state=SimpleNamespace(shard_id=0))
+
+    async with multio.asynclib.task_manager() as tg:
+        client.events.task_manager = tg
+
+        start = time.perf_counter()
+        for name, data in events:
+            ctx = EventContext(client, 0, "gateway_dispatch_received")
+            await client.handle_dispatches(ctx, name, data)
+        taken = time.perf_counter() - start
+
+    mode = "streamed" if stream else "buffered"
+    print(f"handle_dispatches, {mode}: {taken / len(events) * 1e6:.1f} us/event, "
+          f"{len(events) / taken:.0f} events/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=100_000,
+                        help="The number of dispatches in the synthetic mix.")
+    parser.add_argument("--recording", default=None,
+                        help="A file of recorded dispatches to use instead of the synthetic mix.")
+    args = parser.parse_args()
+
+    multio.init("trio")
+    if args.recording is not None:
+        events = load_recording(args.recording)
+    else:
+        events = synthetic_mix(args.events)
+
+    bench_lookup(events)
+    for stream in (False, True):
+        multio.run(bench_dispatch, events, stream)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures the memory retained by the member cache.
+
+Members are fed through :meth:`.Guild._handle_member_chunk` in chunks of 1000, the same way
+``GUILD_MEMBERS_CHUNK`` does, and the payloads are dropped afterwards so only the memory kept by
+the cache is counted.
+
+.. code-block:: bash
+
+    $ python benchmarks/member_memory.py --members 1000000 --guilds 4
+"""
+import argparse
+import gc
+import tracemalloc
+
+import multio
+
+from curious.core.client import Client
+from curious.dataclasses.bases import allow_external_makes
+from curious.dataclasses.guild import Guild
+
+
+def make_chunk(guild_id: int, start: int, count: int, total_users: int) -> list:
+    """
+    Makes a chunk of fake member payloads.
+    """
+    members = []
+    for n in range(start, start + count):
+        user_id = 100000000000000000 + (n % total_users)
+        members.append({
+            "user": {
+                "id": str(user_id),
+                "username": f"user{user_id}",
+                "discriminator": "{:04d}".format(n % 10000),
+                "avatar": "a_{:030x}".format(n % 5000) if n % 3 else None,
+            },
+            "roles": [str(guild_id + r) for r in range(n % 4)],
+            "nick": f"nick{n}" if n % 5 == 0 else None,
+            "joined_at": "2018-01-01T00:00:00.000000+00:00",
+        })
+
+    return members
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--members", type=int, default=1_000_000,
+                        help="The total number of members to cache.")
+    parser.add_argument("--guilds", type=int, default=1,
+                        help="The number of guilds to spread the members over. The same users "
+                             "are reused in every guild.")
+    args = parser.parse_args()
+
+    multio.init("trio")
+    client = Client("benchmark.token")
+    per_guild = args.members // args.guilds
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    with allow_external_makes():
+        for n in range(args.guilds):
+            guild = Guild(client, id=(n + 1) << 22)
+            client.state._guilds[guild.id] = guild
+            for start in range(0, per_guild, 1000):
+                chunk = make_chunk(guild.id, start, min(1000, per_guild - start), per_guild)
+                guild._handle_member_chunk(chunk)
+                del chunk
+
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    used = after - before
+    total = per_guild * args.guilds
+    print(f"members: {total} over {args.guilds} guild(s), users: {len(client.state._users)}")
+    print(f"retained: {used / 1024 / 1024:.1f} MiB, {used / total:.0f} bytes/member")
+    print(f"per 1M members: {used / total * 1_000_000 / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures splitting command arguments out of a message.
+
+The old per-character splitter followed by :func:`curious.util.replace_quotes` on every token is
+compared against :class:`.TokenStream`, both for commands that take every token, and for commands
+that take the rest of the message (like an eval command).
+
+.. code-block:: bash
+
+    $ python benchmarks/tokenizer.py --length 2000
+"""
+import argparse
+import random
+import time
+
+from curious.commands.utils import TokenStream
+from curious.util import replace_quotes
+
+
+# This function is the old version of split_message_content, taken from
+# https://stackoverflow.com/a/43035638.
+# This function is licenced under the MIT Licence. (C) 2017 THE_MAD_KING.
+# See: https://meta.stackexchange.com/questions/272956/a-new-code-license-the-mit-this-time-with
+# -attribution-required
+# You can find a copy of the MIT Licence at https://opensource.org/licenses/MIT.
+def old_split(content: str, delim: str = " ") -> list:
+    tokens = []
+    cur = ''
+    in_quotes = False
+
+    for char in content.strip():
+        if char == delim and not in_quotes:
+            tokens.append(cur)
+            cur = ''
+        elif char == '"' and not in_quotes:
+            in_quotes = True
+            cur += char
+        elif char == '"' and in_quotes:
+            in_quotes = False
+            cur += char
+        else:
+            cur += char
+    tokens.append(cur)
+
+    return tokens
+
+
+def make_inputs(length: int) -> dict:
+    """
+    Makes a few kinds of message content, roughly ``length`` characters long.
+    """
+    rng = random.Random(1)
+    words = ["hello", "world", "curious", "discord", "1234", "ban", "<@1234567890>"]
+
+    plain = []
+    while sum(map(len, plain)) + len(plain) < length:
+        plain.append(rng.choice(words))
+
+    quoted = []
+    while sum(map(len, quoted)) + len(quoted) < length:
+        quoted.append(f'"{rng.choice(words)} {rng.choice(words)}"')
+
+    code = "```py\n"
+    while len(code) < length - 3:
+        code += f'print("{rng.choice(words)}")\n'
+    code += "```"
+
+    return {"plain words": " ".join(plain), "quoted pairs": " ".join(quoted), "code block": code}
+
+
+def bench(label: str, func, content: str, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(content)
+    taken = time.perf_counter() - start
+    print(f"  {label:<24} {taken / iterations * 1e6:8.1f} us/message")
+
+
+def old_every_token(content: str):
+    return [replace_quotes(token) for token in old_split(content) if token]
+
+
+def new_every_token(content: str):
+    return list(TokenStream(content))
+
+
+def old_rest(content: str):
+    tokens = old_split(content)
+    return " ".join(tokens[1:])
+
+
+def new_rest(content: str):
+    stream = TokenStream(content)
+    stream.next_raw()
+    return stream.rest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--length", type=int, default=2000,
+                        help="The length of each message, in characters.")
+    parser.add_argument("--iterations", type=int, default=2000,
+                        help="The number of times to split each message.")
+    args = parser.parse_args()
+
+    for name, content in make_inputs(args.length).items():
+        print(f"{name} ({len(content)} chars):")
+        bench("every token, old", old_every_token, content, args.iterations)
+        bench("every token, stream", new_every_token, content, args.iterations)
+        bench("rest, old", old_rest, "eval " + content, args.iterations)
+        bench("rest, stream", new_rest, "eval " + content, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,7 @@ Commands helpers.
     plugin
     utils
     ratelimit
+    pool
     help
     conditions
 
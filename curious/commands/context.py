@@ -18,15 +18,20 @@ Class for the commands context.
 
 .. currentmodule:: curious.commands.context
 """
+import functools
 import inspect
 import types
+from contextlib import contextmanager
+
+import multio
 import typing_inspect
 from typing import Any, Callable, List, Tuple, Type, Union
 
 from curious.commands.converters import convert_channel, convert_float, convert_int, convert_list, \
     convert_member, convert_role, convert_union
 from curious.commands.exc import CommandInvokeError, CommandsError, ConditionsFailedError
-from curious.commands.utils import _convert
+from curious.commands.pool import run_in_pools
+from curious.commands.utils import TokenStream, _convert
 from curious.core.event import EventContext
 from curious.dataclasses.channel import Channel
 from curious.dataclasses.guild import Guild
@@ -52,6 +57,9 @@ class Context(object):
         float: convert_float,
     }
 
+    # incremented when a converter is added, so converter plans re-resolve their converters
+    _converters_version = 0
+
     def __init__(self, message: Message, event_context: EventContext):
         """
         :param message: The :class:`.Message` this command was invoked with.
@@ -64,7 +72,8 @@ class Context(object):
         self.command_name = None  # type: str
 
         #: The tokens for this context.
-        self.tokens = []  # type: List[str]
+        #: This is usually a :class:`.TokenStream`, which is consumed as the command is invoked.
+        self.tokens = []  # type: Union[TokenStream, List[str]]
 
         #: The formatted command for this context.
         self.formatted_command = None  # type: str
@@ -81,6 +90,9 @@ class Context(object):
         #: The :class:`.Client` for this context.
         self.bot = event_context.bot
 
+        # condition -> result, inside of memoize_conditions
+        self._condition_results = None  # type: dict
+
     @classmethod
     def add_converter(cls, type_: Type[Any], converter):
         """
@@ -90,6 +102,7 @@ class Context(object):
         :param converter: The converter callable.
         """
         cls._converters[type_] = converter
+        Context._converters_version += 1
 
     @property
     def guild(self) -> Guild:
@@ -155,7 +168,7 @@ class Context(object):
         """
         Gets the converted args and kwargs for this command, based on the tokens.
         """
-        return await _convert(self, self.tokens, inspect.signature(func))
+        return await _convert(self, self.tokens, func)
 
     def _make_reraise_ctx(self, new_name: str) -> EventContext:
         """
@@ -180,10 +193,46 @@ class Context(object):
                 await self.manager.client.events.fire_event("command_error", self, e2,
                                                             ctx=evt_ctx)
 
+    @contextmanager
+    def memoize_conditions(self):
+        """
+        Remembers the result of each condition for the duration of a ``with`` block, so that a
+        condition shared between commands is only checked once.
+
+        .. code-block:: python3
+
+            with ctx.memoize_conditions():
+                runnable = [cmd for cmd in commands if (await ctx.can_run(cmd))[0]]
+
+        This is used by the help command, which checks every command.
+        """
+        if self._condition_results is not None:
+            # already memoizing, so leave it to the outer block
+            yield
+            return
+
+        self._condition_results = {}
+        try:
+            yield
+        finally:
+            self._condition_results = None
+
+    @staticmethod
+    async def _await_condition(results: dict, condition, awaitable):
+        """
+        Awaits the result of a condition, storing it or the exception it raised.
+        """
+        try:
+            results[condition] = await awaitable
+        except Exception as e:
+            results[condition] = e
+
     async def can_run(self, cmd) -> Tuple[bool, list]:
         """
         Checks if a command can be ran.
 
+        Conditions that return an awaitable are awaited concurrently.
+
         :return: If it can be ran, and a list of conditions that failed.
         """
         if getattr(cmd, "cmd_owner_bypass", False):
@@ -193,19 +242,44 @@ class Context(object):
                     return True, []
 
         conditions = getattr(cmd, "cmd_conditions", [])
-        failed = []
+        memo = self._condition_results
+        # condition -> result, or the exception it raised
+        results = {}
+        pending = []
         for condition in conditions:
+            if memo is not None and condition in memo:
+                results[condition] = memo[condition]
+                continue
+
             try:
                 success = condition(self)
+            except Exception as e:
+                results[condition] = e
+            else:
                 if inspect.isawaitable(success):
-                    success = await success
-            except CommandsError:
-                raise
-            except Exception:
+                    pending.append((condition, success))
+                else:
+                    results[condition] = success
+
+        if len(pending) == 1:
+            await self._await_condition(results, *pending[0])
+        elif pending:
+            async with multio.asynclib.task_manager() as tg:
+                for condition, awaitable in pending:
+                    await multio.asynclib.spawn(tg, self._await_condition, results, condition,
+                                                awaitable)
+
+        if memo is not None:
+            memo.update(results)
+
+        failed = []
+        for condition in conditions:
+            result = results[condition]
+            if isinstance(result, CommandsError):
+                raise result
+
+            if isinstance(result, Exception) or not result:
                 failed.append(condition)
-            else:
-                if not success:
-                    failed.append(success)
 
         if failed:
             return False, failed
@@ -217,6 +291,10 @@ class Context(object):
         Invokes a command.
         This will convert arguments, pass them in to the command, and run the command.
 
+        Commands in a pool with a limit are run in a new task, so that waiting for a slot doesn't
+        hold up the event handler this was called from. Their errors are fired as
+        ``command_error`` events, and None is returned.
+
         :param command: The command function to run.
         """
         # try and do a group lookup
@@ -237,26 +315,26 @@ class Context(object):
 
         self.plugin = self_
 
+        self.tokens = TokenStream.from_tokens(self.tokens)
         while True:
             if not current_command.cmd_subcommands:
                 break
 
-            if not self.tokens:
+            token = self.tokens.peek_raw()
+            if token is None:
                 break
 
-            token = self.tokens[0]
-            for command in current_command.cmd_subcommands:
-                if command.cmd_name == token or token in command.cmd_aliases:
-                    matched_command = command
-                    current_command = command
-                    # update tokens so that they're consumed
-                    self.tokens = self.tokens[1:]
-                    break
-            else:
+            command = self.manager._lookup_subcommand(current_command, token)
+            if command is None:
                 # we didnt match any subcommand
                 # so escape the loop now
                 break
 
+            matched_command = command
+            current_command = command
+            # update tokens so that they're consumed
+            self.tokens.next_raw()
+
         # bind method, if appropriate
         if not hasattr(matched_command, "__self__") and self_ is not None:
             matched_command = types.MethodType(matched_command, self_)
@@ -272,9 +350,26 @@ class Context(object):
         # convert all the arguments into the command
         converted_args, converted_kwargs = await self._get_converted_args(matched_command)
 
+        # the command's own limit is waited on first, so queued commands don't hold plugin slots
+        pools = [pool for pool in (getattr(matched_command, "cmd_pool", None),
+                                   getattr(self_, "pool", None)) if pool is not None]
+
         # finally, spawn the new command task
         try:
-            return await matched_command(self, *converted_args, **converted_kwargs)
+            if not pools:
+                return await matched_command(self, *converted_args, **converted_kwargs)
+
+            coro = run_in_pools(pools, functools.partial(matched_command, self,
+                                                         *converted_args, **converted_kwargs))
+            if all(pool.limit is None for pool in pools):
+                return await coro
+
+            # queue in a new task, as the slot might not be free until another event is handled
+            try:
+                await self.manager.client.events.spawn(self._safety_wrapper, coro)
+            except BaseException:
+                coro.close()
+                raise
         except CommandsError:
             raise
         except Exception as e:
@@ -284,22 +379,10 @@ class Context(object):
         """
         Attempts to invoke the command, using the specified manager.
 
-        This will scan all the commands, then invoke as appropriate.
+        This will look up the command in the manager's command registry, then invoke as
+        appropriate.
         """
-        # temp variable used to invoke if applicable
-        to_invoke = None
-
-        for command in self.manager.commands.values():
-            if self.match_command(command):
-                to_invoke = command
-                break
-
-        for plugin in self.manager.plugins.values():
-            commands = plugin._get_commands()
-            for command in commands:
-                if self.match_command(command):
-                    to_invoke = command
-                    break
+        to_invoke = self.manager._lookup_command(self.command_name)
 
         if to_invoke is not None:
             ev_ctx = self._make_reraise_ctx("command_error")
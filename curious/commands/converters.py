@@ -28,6 +28,16 @@ from curious.dataclasses.member import Member
 from curious.dataclasses.role import Role
 
 
+def _only(results: list):
+    """
+    Gets the only search result, or None if there were none or more than one.
+    """
+    if len(results) == 1:
+        return results[0]
+
+    return None
+
+
 def convert_member(ann, ctx, arg: str) -> Member:
     """
     Converts an argument into a Member.
@@ -49,6 +59,9 @@ def convert_member(ann, ctx, arg: str) -> Member:
         member = ctx.guild.members.get(member_id)
     else:
         member = ctx.guild.search_for_member(full_name=arg)
+        if member is None:
+            # fall back to a unique prefix match, such as a name without the discriminator
+            member = _only(ctx.guild.search_members(arg, limit=2, fuzzy=False))
 
     if member is None:
         raise ConversionFailedError(ctx, arg, Member, "Could not find Member")
@@ -72,7 +85,9 @@ def convert_channel(ann, ctx, arg: str) -> Channel:
     if channel_id is not None:
         channel = ctx.guild.channels.get(channel_id)
     else:
-        channel = next(filter(lambda c: c.name == arg, ctx.guild.channels.values()), None)
+        channel = ctx.guild.channels.get(arg)
+        if channel is None:
+            channel = _only(ctx.guild.channels.search(arg, limit=2, fuzzy=False))
 
     if channel is None:
         raise ConversionFailedError(ctx, arg, Channel, "Could not find channel")
@@ -96,7 +111,9 @@ def convert_role(ann, ctx, arg: str) -> Role:
     if role_id is not None:
         role = ctx.guild.roles.get(role_id)
     else:
-        role = next(filter(lambda c: c.name == arg, ctx.guild.roles.values()), None)
+        role = ctx.guild.roles.get(arg)
+        if role is None:
+            role = _only(ctx.guild.roles.search(arg, limit=2, fuzzy=False))
 
     if role is None:
         raise ConversionFailedError(ctx, arg, Role, "Could not find role")
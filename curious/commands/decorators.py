@@ -23,8 +23,9 @@ import logging
 from typing import Any, List, Type
 
 from curious.commands import plugin as md_plugin
-from curious.commands.ratelimit import BucketNamer, CommandRateLimit
-from curious.commands.utils import get_description
+from curious.commands.pool import ExecutionPool
+from curious.commands.ratelimit import BucketNamer, CommandRateLimit, RateLimitAlgorithm
+from curious.commands.utils import ConverterPlan, get_description
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +73,12 @@ def command(*,
         set("cmd_hidden", hidden)
         set("cmd_conditions", [])
         set("cmd_ratelimits", [])
+        set("cmd_plan", ConverterPlan(func))
+        set("cmd_pool", None)
+
+        # pools from @concurrency are made before the command has a name
+        if func.cmd_pool is not None and func.cmd_pool.name is None:
+            func.cmd_pool.name = func.cmd_name
 
         # annotate command object with any extra
         for ann_name, annotation in kwargs.items():
@@ -106,7 +113,8 @@ def condition(cbl, *, bypass_owner=True):
     return inner
 
 
-def ratelimit(*, limit: int, time: float, bucket_namer=BucketNamer.AUTHOR):
+def ratelimit(*, limit: int, time: float, bucket_namer=BucketNamer.AUTHOR,
+              algorithm: RateLimitAlgorithm = RateLimitAlgorithm.FIXED_WINDOW):
     """
     Adds a ratelimit to a command.
     """
@@ -115,7 +123,8 @@ def ratelimit(*, limit: int, time: float, bucket_namer=BucketNamer.AUTHOR):
         if not hasattr(func, "cmd_ratelimits"):
             func.cmd_ratelimits = []
 
-        rl = CommandRateLimit(limit=limit, time=time, bucket_namer=bucket_namer)
+        rl = CommandRateLimit(limit=limit, time=time, bucket_namer=bucket_namer,
+                              algorithm=algorithm)
         rl.command = func
         func.cmd_ratelimits.append(rl)
         return func
@@ -123,6 +132,30 @@ def ratelimit(*, limit: int, time: float, bucket_namer=BucketNamer.AUTHOR):
     return inner
 
 
+def concurrency(limit: int):
+    """
+    Limits how many invocations of a command can run at once.
+
+    Invocations past the limit are queued until a running one finishes. This is checked before
+    the limit of the command's plugin, so queued invocations don't use up the plugin's slots.
+
+    .. code-block:: python3
+
+        @command()
+        @concurrency(2)
+        async def render(self, ctx):
+            ...
+
+    :param limit: The maximum number of invocations that can run at once.
+    """
+
+    def inner(func):
+        func.cmd_pool = ExecutionPool(getattr(func, "cmd_name", None), limit=limit)
+        return func
+
+    return inner
+
+
 def _subcommand(parent):
     """
     Decorator factory set on a command to produce subcommands.
@@ -19,115 +19,235 @@ Home of the default help command.
 .. currentmodule:: curious.commands.help
 """
 import inspect
+from collections import OrderedDict
 
 from curious.commands import Context
 from curious.commands.exc import CommandsError
 from curious.commands.utils import get_full_name, get_usage
 
 
-async def _get_command_list(ctx: Context, command, *, include_root: bool = True):
+class _HelpNode(object):
     """
-    Recursively produces a command list for the command, using subcommands.
+    A command in the help, with its visible subcommands.
     """
-    try:
-        if not (await ctx.can_run(command))[0]:
-            return []
-    except CommandsError:
-        return []
+    __slots__ = ("command", "name", "full_name", "description", "hidden", "children", "bit",
+                 "_usages")
 
-    # XXX: Don't add command names if they're subcommands.
-    if not command.cmd_subcommand and include_root:
-        l = [command.cmd_name]
-    else:
-        l = []
+    def __init__(self, command, bit: int):
+        self.command = command
+        self.name = command.cmd_name
+        self.full_name = get_full_name(command)
 
-    for subcommand in command.cmd_subcommands:
-        # don't do hidden subcommands
-        if getattr(subcommand, "cmd_hidden", False) is True:
-            continue
+        description = inspect.getdoc(command)
+        if description is None:
+            description = "No description."
 
-        # only do subcommands that can be ran
-        try:
-            can_run, _ = await ctx.can_run(subcommand)
-        except CommandsError:
-            can_run = False
+        self.description = description
+        self.hidden = getattr(command, "cmd_hidden", False) is True
+        self.children = []
+        # the bit for this node in a mask of visible nodes
+        self.bit = bit
 
-        if not can_run:
-            continue
+        # invoked as -> usage
+        self._usages = {}
 
-        if include_root:
-            l.append(get_full_name(subcommand))
+    def usage(self, invoked_as: str) -> str:
+        try:
+            return self._usages[invoked_as]
+        except KeyError:
+            usage = self._usages[invoked_as] = get_usage(self.command, invoked_as=invoked_as)
+            return usage
+
+    def names(self, mask: int, *, include_root: bool = True) -> list:
+        """
+        Gets the command list for this node, from the mask of visible nodes.
+        """
+        if not mask & self.bit:
+            return []
+
+        # XXX: Don't add command names if they're subcommands.
+        if not self.command.cmd_subcommand and include_root:
+            names = [self.name]
         else:
-            l.append(subcommand.cmd_name)
-        l.extend(await _get_command_list(ctx, subcommand))
+            names = []
 
-    return l
+        for child in self.children:
+            if not mask & child.bit:
+                continue
 
+            if include_root:
+                names.append(child.full_name)
+            else:
+                names.append(child.name)
 
-async def help_for_all(ctx: Context):
+            names.extend(child.names(mask))
+
+        return names
+
+
+class HelpIndex(object):
     """
-    Gets the content of help for all.
+    Stores the parts of the help output that don't depend on who asked for it.
+
+    The :class:`.CommandsManager` rebuilds this when plugins or commands are loaded or unloaded.
+    Each request for help only checks which commands can be ran, as a bitmask with one bit per
+    command; the page rendered for each mask is cached, as most users can run the same commands.
     """
-    # rows is a list of messages for a help row
-    rows = []
-    # row_num is the current number to put on a row
-    # this isn't incremented if we skip a row
-    row_num = 0
-
-    for plugin in ctx.manager.plugins.values():
-        commands = plugin._get_commands()
-        command_names = []
-
-        for command in commands:
-            # check for hidden annotation
-            if getattr(command, "cmd_hidden", False) is True:
-                continue
 
-            # don't add subcommands on their own
+    def __init__(self, manager, *, max_pages: int = 128):
+        """
+        :param manager: The :class:`.CommandsManager` to build the help for.
+        :param max_pages: The maximum number of rendered pages to cache.
+        """
+        #: The maximum number of rendered pages to cache.
+        self.max_pages = max_pages
+
+        # command function -> node
+        self._nodes = {}
+        self._next_bit = 1
+
+        #: A list of (section name, [top-level nodes]).
+        self.sections = []
+
+        # hidden commands are still built, so help for them can be asked for
+        for name, plugin in manager.plugins.items():
+            # subcommands are not included on their own
             # they are detected automatically by the command list loader
-            if command.cmd_subcommand:
+            nodes = [self._build(command) for command in manager.get_plugin_commands(name)]
+            plugin_name = getattr(plugin, "plugin_name", plugin.__class__.__name__)
+            self.sections.append((plugin_name, [node for node in nodes if not node.hidden]))
+
+        # add any uncategorized commands
+        nodes = [self._build(command) for command in manager.commands.values()
+                 if not command.cmd_subcommand]
+        self.sections.append(("Uncategorized", [node for node in nodes if not node.hidden]))
+
+        # key -> rendered page, least recently used first
+        self._pages = OrderedDict()
+
+    def _build(self, command) -> _HelpNode:
+        """
+        Builds the node for a command, and its subcommands.
+        """
+        node = _HelpNode(command, self._next_bit)
+        self._next_bit <<= 1
+        self._nodes[getattr(command, "__func__", command)] = node
+
+        for subcommand in command.cmd_subcommands:
+            child = self._build(subcommand)
+            # don't do hidden subcommands
+            if not child.hidden:
+                node.children.append(child)
+
+        return node
+
+    def _get_page(self, key, render) -> str:
+        """
+        Gets a page from the cache, rendering it if needed.
+        """
+        try:
+            self._pages.move_to_end(key)
+            return self._pages[key]
+        except KeyError:
+            page = self._pages[key] = render()
+            if len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+            return page
+
+    async def _visible_mask(self, ctx: Context, node: _HelpNode) -> int:
+        """
+        Gets the mask of the nodes that can be ran, out of a node and its subcommands.
+        """
+        # only do commands that can be ran
+        try:
+            can_run, _ = await ctx.can_run(node.command)
+        except CommandsError:
+            can_run = False
+
+        if not can_run:
+            return 0
+
+        mask = node.bit
+        for child in node.children:
+            mask |= await self._visible_mask(ctx, child)
+
+        return mask
+
+    async def render_all(self, ctx: Context) -> str:
+        """
+        Gets the content of help for all, for a context.
+        """
+        mask = 0
+        for _, nodes in self.sections:
+            for node in nodes:
+                mask |= await self._visible_mask(ctx, node)
+
+        return self._get_page(mask, lambda: self._render_all(mask))
+
+    def _render_all(self, mask: int) -> str:
+        # rows is a list of messages for a help row
+        rows = []
+        # row_num is the current number to put on a row
+        # this isn't incremented if we skip a row
+        row_num = 0
+
+        for section_name, nodes in self.sections:
+            command_names = []
+            for node in nodes:
+                command_names.extend(node.names(mask))
+
+            if not command_names:
                 continue
 
-            names = await _get_command_list(ctx, command)
-            command_names.extend(names)
+            row_num += 1
+            # wrap the command names in backticks
+            # and join it all up with some pipes
+            names_joined = ' | '.join(f"`{c}`" for c in command_names)
+            rows.append(f"**{row_num}. {section_name}:** {names_joined}")
 
-        if not command_names:
-            continue
+        if not rows:
+            return "**You cannot run any commands.**"
 
-        row_num += 1
-        # wrap the command names in backticks
-        # and join it all up with some pipes
-        names_joined = ' | '.join(f"`{c}`" for c in command_names)
-        plugin_name = getattr(plugin, "plugin_name", plugin.__class__.__name__)
-        rows.append(f"**{row_num}. {plugin_name}:** {names_joined}")
+        # add a preamble
+        preamble = "**Commands:**\nUse `help <command>` for more information about a command.\n\n"
 
-    # add any uncategorized commands
-    if ctx.manager.commands:
-        command_names = []
+        rows_joined = '\n'.join(rows)
+        return f"{preamble}{rows_joined}"
 
-        for command in ctx.manager.commands.values():
-            if getattr(command, "cmd_hidden", False) is True:
-                continue
+    async def render_one(self, ctx: Context, command, invoked_as: str) -> str:
+        """
+        Gets the content of help for one command, for a context.
 
-            if command.cmd_subcommand:
-                continue
+        :param command: The command function.
+        :param invoked_as: The name the command was asked for by.
+        """
+        node = self._nodes.get(getattr(command, "__func__", command))
+        if node is None:
+            node = self._build(command)
 
-            names = await _get_command_list(ctx, command)
-            command_names.extend(names)
+        mask = await self._visible_mask(ctx, node)
+        return self._get_page((node.bit, mask, invoked_as),
+                              lambda: self._render_one(node, mask, invoked_as))
 
-        if command_names:
-            row_num += 1
-            names_joined = ' | '.join(f"`{c}`" for c in command_names)
-            rows.append(f"**{row_num}. Uncategorized:** {names_joined}")
+    @staticmethod
+    def _render_one(node: _HelpNode, mask: int, invoked_as: str) -> str:
+        usage = node.usage(invoked_as)
 
-    if not rows:
-        return "**You cannot run any commands.**"
+        subcommands = node.names(mask, include_root=False)
+        subcommands_fmtted = " | ".join(f"`{x}`" for x in subcommands)
+
+        if subcommands:
+            return f"`{usage}`\n\n{node.description}\n\n**Subcommands:** {subcommands_fmtted}"
+        else:
+            return f"`{usage}`\n\n{node.description}"
 
-    # add a preamble
-    preamble = "**Commands:**\nUse `help <command>` for more information about a command.\n\n"
 
-    rows_joined = '\n'.join(rows)
-    return f"{preamble}{rows_joined}"
+async def help_for_all(ctx: Context):
+    """
+    Gets the content of help for all.
+    """
+    return await ctx.manager.help_index.render_all(ctx)
 
 
 async def help_for_one(ctx: Context, command):
@@ -139,31 +259,21 @@ async def help_for_one(ctx: Context, command):
     if cfunc is None:
         return f"No such command: **`{command}`**"
 
-    usage = get_usage(cfunc, invoked_as=command)
-
-    subcommands = await _get_command_list(ctx, cfunc, include_root=False)
-    subcommands_fmtted = " | ".join(f"`{x}`" for x in subcommands)
-
-    description = inspect.getdoc(cfunc)
-    if description is None:
-        description = "No description."
-
-    if subcommands:
-        return f"`{usage}`\n\n{description}\n\n**Subcommands:** {subcommands_fmtted}"
-    else:
-        return f"`{usage}`\n\n{description}"
+    return await ctx.manager.help_index.render_one(ctx, cfunc, command)
 
 
 async def help_command(ctx: Context, *, command: str = None):
     """
     The default help command.
     """
-    if command is None:
-        # Let the ruling classes tremble at a Communistic revolution.
-        # The proletarians have nothing to lose but their chains. They have a world to win.
-        content = await help_for_all(ctx)
-    else:
-        # Evidence-based policy
-        content = await help_for_one(ctx, command)
+    # every command is checked, so only check each condition once
+    with ctx.memoize_conditions():
+        if command is None:
+            # Let the ruling classes tremble at a Communistic revolution.
+            # The proletarians have nothing to lose but their chains. They have a world to win.
+            content = await help_for_all(ctx)
+        else:
+            # Evidence-based policy
+            content = await help_for_one(ctx, command)
 
     await ctx.channel.messages.send(content)
@@ -27,13 +27,12 @@ import logging
 import multio
 import traceback
 import typing
-from functools import partial
 
 from curious.commands.context import Context
 from curious.commands.exc import CommandsError
-from curious.commands.help import help_command
+from curious.commands.help import HelpIndex, help_command
 from curious.commands.plugin import Plugin
-from curious.commands.ratelimit import RateLimiter
+from curious.commands.ratelimit import RateLimitBackend, RateLimiter
 from curious.commands.utils import prefix_check_factory
 from curious.core import client as md_client
 from curious.core.event import EventContext, event
@@ -42,6 +41,30 @@ from curious.dataclasses.message import Message
 logger = logging.getLogger("curious.commands.manager")
 
 
+def _get_plugin_classes(module) -> typing.Dict[str, typing.Type[Plugin]]:
+    """
+    Gets the plugin classes defined in or imported into a module.
+
+    :return: A dict of plugin name to plugin class, in the order of the attribute names.
+    """
+    classes = {}
+    for _, item in sorted(vars(module).items()):
+        if isinstance(item, type) and issubclass(item, Plugin) and item is not Plugin:
+            classes[getattr(item, "plugin_name", item.__name__)] = item
+
+    return classes
+
+
+def _get_source(klass: type) -> typing.Optional[str]:
+    """
+    Gets the source of a class, or None if it isn't available.
+    """
+    try:
+        return inspect.getsource(klass)
+    except (OSError, TypeError):
+        return None
+
+
 class CommandsManager(object):
     """
     A manager that handles commands for a client.
@@ -108,7 +131,9 @@ class CommandsManager(object):
     """
 
     def __init__(self, client: 'md_client.Client', *,
-                 message_check=None, command_prefix: str = None):
+                 message_check=None, command_prefix: str = None,
+                 prefix_cache_ttl: float = None,
+                 ratelimit_backend: 'RateLimitBackend' = None):
         """
         :param client: The :class:`.Client` to use with this manager.
         :param message_check: The message check function for this manager.
@@ -116,7 +141,13 @@ class CommandsManager(object):
             This should take two arguments, the client and message, and should return either None
             or a 2-item tuple:
               - The command word matched
-              - The tokens after the command word
+              - The tokens after the command word, as a :class:`.TokenStream` or a list
+        :param command_prefix: The prefix, prefixes, or callable that returns prefixes to use, \
+            if no message check function is provided. See :func:`.prefix_check_factory`.
+        :param prefix_cache_ttl: If ``command_prefix`` is a callable, the number of seconds to \
+            cache its result for each guild.
+        :param ratelimit_backend: The :class:`.RateLimitBackend` to store command ratelimits in. \
+            Defaults to storing them in memory.
         """
         if message_check is None and command_prefix is None:
             raise ValueError("Must provide one of message_check or command_prefix")
@@ -125,7 +156,7 @@ class CommandsManager(object):
         self.client = client
 
         if message_check is None:
-            message_check = prefix_check_factory(command_prefix)
+            message_check = prefix_check_factory(command_prefix, cache_ttl=prefix_cache_ttl)
 
         #: The message check function for this manager.
         self.message_check = message_check
@@ -134,12 +165,33 @@ class CommandsManager(object):
         self.plugins = {}
 
         #: A dictionary of stand-alone commands, i.e. commands not associated with a plugin.
+        #: Use :meth:`.CommandsManager.add_command` and :meth:`.CommandsManager.remove_command`
+        #: to change this, so the command registry is kept up to date.
         self.commands = {}
 
         #: The current ratelimiter.
-        self.ratelimiter = RateLimiter()
+        self.ratelimiter = RateLimiter(ratelimit_backend)
 
         self._module_plugins = defaultdict(lambda: [])
+        # plugin class -> its source when it was loaded from a module, to find changes on reload
+        self._plugin_sources = {}
+
+        #: A dictionary mapping of <event name> -> [bound plugin event handlers].
+        #: This is built when plugins are loaded, and the handlers are registered with the
+        #: client's :class:`.EventManager`.
+        self.plugin_events = defaultdict(lambda: [])
+
+        # command registry, rebuilt whenever commands are added or removed
+        # name or alias -> top-level command
+        self._command_index = {}
+        # parent command function -> {name or alias -> subcommand}
+        self._subcommand_index = {}
+        # plugin name -> [top-level commands of the plugin]
+        self._plugin_commands = {}
+
+        #: The :class:`.HelpIndex` used by the help command.
+        #: This is rebuilt when plugins or commands are loaded or unloaded.
+        self.help_index = HelpIndex(self)
 
     @classmethod
     def with_client(cls, client: 'md_client.Client', **kwargs):
@@ -156,10 +208,9 @@ class CommandsManager(object):
         """
         self.client.events.add_event(self.handle_message)
         self.client.events.add_event(self.default_command_error)
-        self.client.events.add_event_hook(self.event_hook)
 
         from curious.commands.decorators import command
-        self.commands["help"] = command(name="help")(help_command)
+        self.add_command(command(name="help")(help_command))
 
     async def load_plugin(self, klass: typing.Type[Plugin], *args,
                           module: str = None):
@@ -185,8 +236,31 @@ class CommandsManager(object):
         if module is not None:
             self._module_plugins[module].append(instance)
 
+        self._add_plugin_events(instance)
+        self._rebuild_command_index()
         return instance
 
+    def _add_plugin_events(self, plugin: Plugin):
+        """
+        Registers the event handlers of a plugin.
+        """
+        for _, handler in inspect.getmembers(plugin, predicate=lambda v: hasattr(v, "is_event")):
+            for name in handler.events:
+                self.plugin_events[name].append(handler)
+                self.client.events.add_event(handler, name=name)
+
+    def _remove_plugin_events(self, plugin: Plugin):
+        """
+        Unregisters the event handlers of a plugin.
+        """
+        for name, handlers in list(self.plugin_events.items()):
+            for handler in [h for h in handlers if h.__self__ is plugin]:
+                handlers.remove(handler)
+                self.client.events.remove_event(name, handler)
+
+            if not handlers:
+                del self.plugin_events[name]
+
     async def unload_plugin(self, klass: typing.Union[Plugin, str]):
         """
         Unloads a plugin.
@@ -196,36 +270,109 @@ class CommandsManager(object):
         p: Plugin = None
         if isinstance(klass, str):
             p = self.plugins.pop(klass)
-
-        for k, p in self.plugins.copy().items():
-            if type(p) == klass:
-                p = self.plugins.pop(k)
-                break
+        else:
+            for k, plugin in self.plugins.items():
+                if type(plugin) == klass:
+                    p = self.plugins.pop(k)
+                    break
 
         if p is not None:
+            self._remove_plugin_events(p)
+            self._rebuild_command_index()
+
             # cancel the task group used for this plugin, if it's running
             if p.task_group is not None:
                 await multio.asynclib.cancel_task_group(p.task_group)
 
             await p.unload()
+            await p.pool.shutdown()
 
         return p
 
+    def _index_subcommands(self, command):
+        """
+        Adds the subcommands of a command to the subcommand index, recursively.
+        """
+        if not command.cmd_subcommands:
+            return
+
+        subcommands = {}
+        # names take priority over aliases
+        for subcommand in command.cmd_subcommands:
+            for alias in subcommand.cmd_aliases:
+                subcommands[alias] = subcommand
+
+        for subcommand in command.cmd_subcommands:
+            subcommands[subcommand.cmd_name] = subcommand
+            self._index_subcommands(subcommand)
+
+        self._subcommand_index[getattr(command, "__func__", command)] = subcommands
+
+    def _rebuild_command_index(self):
+        """
+        Rebuilds the command registry, after a plugin or command was added or removed.
+
+        Plugin commands take priority over stand-alone commands, and commands from plugins loaded
+        later take priority over commands from plugins loaded earlier.
+        """
+        plugin_commands = {}
+        for name, plugin in self.plugins.items():
+            plugin_commands[name] = [cmd for cmd in plugin._get_commands()
+                                     if not cmd.cmd_subcommand]
+
+        # commands in priority order, lowest first
+        commands = [cmd for cmd in self.commands.values() if not cmd.cmd_subcommand]
+        for cmds in plugin_commands.values():
+            commands.extend(cmds)
+
+        index = {}
+        for command in commands:
+            for alias in command.cmd_aliases:
+                index[alias] = command
+
+        for command in commands:
+            index[command.cmd_name] = command
+
+        self._subcommand_index = {}
+        for command in commands:
+            self._index_subcommands(command)
+
+        self._command_index = index
+        self._plugin_commands = plugin_commands
+        self.help_index = HelpIndex(self)
+
     def _lookup_command(self, name: str):
         """
         Does a lookup in plugin and standalone commands.
         """
-        if name in self.commands:
-            return self.commands[name]
+        return self._command_index.get(name)
 
-        for plugin in self.plugins.values():
-            cmds = plugin._get_commands()
+    def _lookup_subcommand(self, command, name: str):
+        """
+        Looks up a subcommand of a command by name or alias.
+        """
+        subcommands = self._subcommand_index.get(getattr(command, "__func__", command))
+        if subcommands is None:
+            return None
 
-            try:
-                return next(filter(lambda cmd: not cmd.cmd_subcommand and
-                                   (cmd.cmd_name == name or name in cmd.cmd_aliases), cmds))
-            except StopIteration:
-                continue
+        return subcommands.get(name)
+
+    def get_plugin_commands(self, plugin_name: str) -> list:
+        """
+        Gets the top-level commands of a loaded plugin.
+
+        :param plugin_name: The name of the plugin.
+        :return: A list of the plugin's commands, excluding subcommands.
+        """
+        return self._plugin_commands.get(plugin_name, [])
+
+    def get_pool_metrics(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        Gets the queue and latency metrics of the execution pool of every loaded plugin.
+
+        :return: A dict of plugin name to :meth:`.ExecutionPool.metrics`.
+        """
+        return {name: plugin.pool.metrics() for name, plugin in self.plugins.items()}
 
     def get_command(self, command_name: str):
         """
@@ -242,11 +389,8 @@ class CommandsManager(object):
             return None
 
         for token in sp[1:]:
-            try:
-                filtered = filter(lambda cmd: cmd.cmd_name == token or token in cmd.cmd_aliases,
-                                  command.cmd_subcommands)
-                command = next(filtered)
-            except StopIteration:
+            command = self._lookup_subcommand(command, token)
+            if command is None:
                 return None
 
         return command
@@ -261,6 +405,7 @@ class CommandsManager(object):
             raise ValueError("Commands must be decorated with the command decorator")
 
         self.commands[command.cmd_name] = command
+        self._rebuild_command_index()
         return command
 
     def remove_command(self, command):
@@ -270,11 +415,17 @@ class CommandsManager(object):
         :param command: The name of the command, or the command function.
         """
         if isinstance(command, str):
-            return self.commands.pop(command)
+            removed = self.commands.pop(command)
         else:
             for k, p in self.commands.copy().items():
                 if p == command:
-                    return self.commands.pop(k)
+                    removed = self.commands.pop(k)
+                    break
+            else:
+                return None
+
+        self._rebuild_command_index()
+        return removed
 
     async def load_plugins_from(self, import_path: str):
         """
@@ -284,23 +435,8 @@ class CommandsManager(object):
         """
         mod = importlib.import_module(import_path)
 
-        # define the predicate for the body scanner
-        def predicate(item):
-            if not isinstance(item, type):
-                return False
-
-            # only accept plugin subclasses
-            if not issubclass(item, Plugin):
-                return False
-
-            # ensure item is not actually Plugin
-            if item == Plugin:
-                return False
-
-            # it is a plugin
-            return True
-
-        for plugin_name, plugin_class in inspect.getmembers(mod, predicate=predicate):
+        for plugin_class in _get_plugin_classes(mod).values():
+            self._plugin_sources[plugin_class] = _get_source(plugin_class)
             await self.load_plugin(plugin_class, module=mod)
 
     async def unload_plugins_from(self, import_path: str):
@@ -317,27 +453,145 @@ class CommandsManager(object):
             module = import_path
 
         for plugin in self._module_plugins[module]:
+            self._remove_plugin_events(plugin)
             await plugin.unload()
+            await plugin.pool.shutdown()
             self.plugins.pop(getattr(plugin, "plugin_name", type(plugin).__name__))
+            self._plugin_sources.pop(type(plugin), None)
+
+        self._rebuild_command_index()
 
         del sys.modules[import_path]
         del self._module_plugins[module]
 
-    async def event_hook(self, ctx: EventContext, *args, **kwargs):
+    async def reload_plugins_from(self, import_path: str) -> typing.Dict[str, typing.List[str]]:
         """
-        The event hook for the commands manager.
+        Reloads a module, and replaces only the plugins in it that changed.
+
+        The plugin classes in the reloaded module are compared with the loaded plugins by name:
+
+            - Plugins that are new are loaded.
+            - Plugins that are gone are unloaded.
+            - Plugins whose class source changed are replaced with a new instance.
+            - Plugins whose class source is the same keep their instance (and its state), which
+              is switched over to the new class without being unloaded or loaded again.
+
+        New instances are loaded before anything is swapped, so if one of them fails to load,
+        the old plugins are left in place. The plugins, events and command index are then swapped
+        in one step, so no command is ever looked up in a half-reloaded manager.
+
+        Invocations of old commands that are already running are allowed to finish; the replaced
+        plugins are only unloaded once their :class:`.ExecutionPool` is idle, in the background.
+        If the client isn't running, they are unloaded before this returns.
+
+        :param import_path: The import path, or module, to reload.
+        :return: A dict with the names of the ``added``, ``removed``, ``replaced`` and \
+            ``unchanged`` plugins.
         """
-        async with multio.asynclib.task_manager() as tg:
-            for plugin in self.plugins.values():
-                body = inspect.getmembers(plugin, predicate=lambda v: hasattr(v, "is_event"))
-                for _, handler in body:
-                    if ctx.event_name not in handler.events:
-                        continue
+        if isinstance(import_path, str):
+            module = sys.modules.get(import_path)
+        else:
+            module = import_path
 
-                    cofunc = partial(self.client.events._safety_wrapper,
-                                     handler, ctx, *args, **kwargs)
+        if module is None:
+            module = importlib.import_module(import_path)
+            old_plugins = {}
+        else:
+            old_plugins = {getattr(plugin, "plugin_name", type(plugin).__name__): plugin
+                           for plugin in self._module_plugins.get(module, [])}
+
+            # reloading re-runs the module in the same namespace, so classes that were deleted
+            # from the module would still be found afterwards
+            namespace = vars(module)
+            stale = {name: item for name, item in namespace.items()
+                     if isinstance(item, type) and issubclass(item, Plugin)
+                     and item.__module__ == module.__name__}
+            for name in stale:
+                del namespace[name]
 
-                    await multio.asynclib.spawn(tg, cofunc)
+            try:
+                module = importlib.reload(module)
+            except BaseException:
+                namespace.update(stale)
+                raise
+
+        new_classes = _get_plugin_classes(module)
+        new_sources = {klass: _get_source(klass) for klass in new_classes.values()}
+        diff = {"added": [], "removed": [], "replaced": [], "unchanged": []}
+        for name, klass in new_classes.items():
+            if name not in old_plugins:
+                diff["added"].append(name)
+                continue
+
+            old_source = self._plugin_sources.get(type(old_plugins[name]))
+            if old_source is not None and old_source == new_sources[klass]:
+                diff["unchanged"].append(name)
+            else:
+                diff["replaced"].append(name)
+
+        diff["removed"] = [name for name in old_plugins if name not in new_classes]
+
+        # load the new instances first, so a plugin that fails to load doesn't leave the manager
+        # with half of the module reloaded
+        instances = {}
+        try:
+            for name in diff["added"] + diff["replaced"]:
+                instance = new_classes[name](self.client)
+                await instance.load()
+                instances[name] = instance
+        except Exception:
+            for instance in instances.values():
+                await instance.unload()
+                await instance.pool.shutdown()
+            raise
+
+        # nothing below awaits, so no command or event sees the manager part way through the swap
+        for plugin in old_plugins.values():
+            self._remove_plugin_events(plugin)
+            self._plugin_sources.pop(type(plugin), None)
+
+        for name in diff["unchanged"]:
+            instances[name] = old_plugins[name]
+            instances[name].__class__ = new_classes[name]
+
+        for name in diff["removed"]:
+            self.plugins.pop(name, None)
+
+        # replaced plugins keep their position, so the command priority stays the same
+        self.plugins.update(instances)
+        self._plugin_sources.update(new_sources)
+        self._module_plugins[module] = [instances[name] for name in new_classes]
+        for plugin in self._module_plugins[module]:
+            self._add_plugin_events(plugin)
+
+        self._rebuild_command_index()
+
+        for name in diff["replaced"] + diff["removed"]:
+            # without a running client, nothing can be running in the old plugin either
+            if self.client.task_manager is None:
+                await self._retire_plugin(old_plugins[name])
+            else:
+                await multio.asynclib.spawn(self.client.task_manager, self._retire_plugin,
+                                            old_plugins[name])
+
+        logger.info("Reloaded %s: %s", module.__name__,
+                    ", ".join(f"{len(names)} {key}" for key, names in diff.items()))
+        return diff
+
+    async def _retire_plugin(self, plugin: Plugin):
+        """
+        Unloads a plugin that was replaced, once the commands running in it have finished.
+        """
+        await plugin.pool.wait_idle()
+
+        try:
+            if plugin.task_group is not None:
+                await multio.asynclib.cancel_task_group(plugin.task_group)
+
+            await plugin.unload()
+            await plugin.pool.shutdown()
+        except Exception:
+            logger.exception("Failed to unload replaced plugin %s", type(plugin).__name__)
 
     async def handle_commands(self, ctx: EventContext, message: Message):
         """
@@ -24,6 +24,7 @@ from collections import OrderedDict
 
 import multio
 
+from curious.commands.pool import ExecutionPool
 from curious.core import client as md_client
 
 
@@ -36,6 +37,10 @@ class Plugin(metaclass=PluginMeta):
     """
     Represents a plugin (a collection of events and commands under one class).
     """
+    #: The maximum number of commands from this plugin that can run at once, or None for no limit.
+    #: Commands past the limit are queued until a running one finishes.
+    concurrency_limit = None
+
     def __init__(self, client: 'md_client.Client'):
         #: The client for this plugin.
         self.client = client
@@ -43,6 +48,10 @@ class Plugin(metaclass=PluginMeta):
         #: The task group for this plugin.
         self.task_group = None
 
+        #: The :class:`.ExecutionPool` the commands of this plugin run in.
+        self.pool = ExecutionPool(getattr(type(self), "plugin_name", type(self).__name__),
+                                  limit=self.concurrency_limit)
+
     async def load(self) -> None:
         """
         Called when this plugin is loaded.
@@ -0,0 +1,299 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Execution pools, which limit how many commands run at once.
+
+.. currentmodule:: curious.commands.pool
+"""
+import time
+import typing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import multio
+
+from curious.core.tracing import LatencyHistogram
+
+
+async def run_in_thread(func, *args):
+    """
+    Runs a function in a worker thread, using the thread pool of the current async library.
+
+    :param func: The regular function to run.
+    :param args: The arguments to pass to the function.
+    :return: The return value of the function.
+    """
+    lib = multio.asynclib.lib_name
+    if lib == "curio":
+        import curio
+        return await curio.run_in_thread(func, *args)
+
+    if lib == "trio":
+        import trio
+        # trio.to_thread replaced run_sync_in_worker_thread in newer versions
+        to_thread = getattr(trio, "to_thread", None)
+        if to_thread is not None:
+            return await to_thread.run_sync(func, *args)
+
+        return await trio.run_sync_in_worker_thread(func, *args)
+
+    raise RuntimeError(f"Cannot run threads with {lib!r}")
+
+
+async def wait_for_future(future: Future):
+    """
+    Waits for a :class:`concurrent.futures.Future` to finish, without blocking a thread on it.
+
+    The current task is woken up from the done callback of the future, using the current async
+    library. If the wait is cancelled, the future is cancelled too, if it hasn't started yet.
+
+    :param future: The future to wait for.
+    :return: The result of the future.
+    """
+    lib = multio.asynclib.lib_name
+    try:
+        if lib == "curio":
+            from curio.traps import _future_wait
+            await _future_wait(future)
+        elif lib == "trio":
+            import trio
+            # trio.lowlevel replaced trio.hazmat in newer versions
+            lowlevel = getattr(trio, "lowlevel", None) or trio.hazmat
+            token = lowlevel.current_trio_token()
+            done = trio.Event()
+
+            def wake(_):
+                try:
+                    token.run_sync_soon(done.set)
+                except trio.RunFinishedError:
+                    pass
+
+            future.add_done_callback(wake)
+            await done.wait()
+        else:
+            raise RuntimeError(f"Cannot wait for futures with {lib!r}")
+    except BaseException:
+        future.cancel()
+        raise
+
+    return future.result()
+
+
+async def run_in_pools(pools: 'typing.Sequence[ExecutionPool]', cofunc, *args):
+    """
+    Runs a coroutine function in several pools, acquiring a slot in each one in order.
+
+    :param pools: The :class:`.ExecutionPool` objects to run in.
+    :param cofunc: The coroutine function to run.
+    :param args: The arguments to pass to the function.
+    :return: The return value of the function.
+    """
+    if not pools:
+        return await cofunc(*args)
+
+    return await pools[0].run(run_in_pools, pools[1:], cofunc, *args)
+
+
+class ExecutionPool(object):
+    """
+    Limits how many tasks run at once, and records how long they wait and run for.
+
+    Tasks past the limit wait in a queue, and start in the order they arrived. Every
+    :class:`.Plugin` has a pool, which its commands run in; the limit is set with the
+    ``concurrency_limit`` attribute of the plugin class. Commands can also be given their own
+    limit with :func:`.concurrency`.
+
+    CPU-heavy work can be moved out of the event loop with :meth:`.ExecutionPool.run_in_thread`
+    and :meth:`.ExecutionPool.run_in_process`:
+
+    .. code-block:: python3
+
+        class Images(Plugin):
+            concurrency_limit = 4
+
+            @command()
+            async def blur(self, ctx, radius: int):
+                data = await self.pool.run_in_process(blur_image, ctx.message.attachments, radius)
+    """
+
+    def __init__(self, name: str = None, limit: int = None, *, process_workers: int = None):
+        """
+        :param name: The name of this pool, used in metrics.
+        :param limit: The maximum number of tasks that can run at once, or None for no limit.
+        :param process_workers: The number of worker processes used by \
+            :meth:`.ExecutionPool.run_in_process`. Defaults to the number of CPUs.
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+
+        #: The name of this pool.
+        self.name = name
+
+        #: The maximum number of tasks that can run at once, or None for no limit.
+        self.limit = limit
+
+        #: The number of worker processes for :meth:`.ExecutionPool.run_in_process`.
+        self.process_workers = process_workers
+
+        #: The number of tasks waiting for a slot.
+        self.queued = 0
+
+        #: The number of tasks running.
+        self.running = 0
+
+        #: The number of tasks that have finished.
+        self.completed = 0
+
+        #: The time tasks spent waiting for a slot.
+        self.wait_latency = LatencyHistogram()
+
+        #: The time tasks spent running.
+        self.run_latency = LatencyHistogram()
+
+        #: The time spent waiting for work run in threads or processes.
+        self.offload_latency = LatencyHistogram()
+
+        # made on first use, as pools can be made before multio is initialized
+        self._semaphore = None
+        self._executor = None  # type: ProcessPoolExecutor
+
+        # set when the pool next becomes idle, if anything is waiting for that
+        self._idle = None  # type: multio.Event
+
+    def __repr__(self) -> str:
+        return f"<ExecutionPool name={self.name!r} limit={self.limit} running={self.running} " \
+               f"queued={self.queued}>"
+
+    async def run(self, cofunc, *args):
+        """
+        Runs a coroutine function in this pool, waiting for a slot if the pool is full.
+
+        :param cofunc: The coroutine function to run.
+        :param args: The arguments to pass to the function.
+        :return: The return value of the function.
+        """
+        queued_at = time.perf_counter()
+        if self.limit is None:
+            return await self._run(queued_at, cofunc, *args)
+
+        if self._semaphore is None:
+            self._semaphore = multio.asynclib.Semaphore(self.limit)
+
+        self.queued += 1
+        dequeued = False
+        try:
+            async with self._semaphore:
+                self.queued -= 1
+                dequeued = True
+                return await self._run(queued_at, cofunc, *args)
+        finally:
+            # cancelled while still in the queue
+            if not dequeued:
+                self.queued -= 1
+                await self._notify_idle()
+
+    async def _run(self, queued_at: float, cofunc, *args):
+        started_at = time.perf_counter()
+        self.wait_latency.record(started_at - queued_at)
+        self.running += 1
+        try:
+            return await cofunc(*args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.run_latency.record(time.perf_counter() - started_at)
+            await self._notify_idle()
+
+    async def _notify_idle(self):
+        if self._idle is not None and not self.running and not self.queued:
+            idle, self._idle = self._idle, None
+            await idle.set()
+
+    async def wait_idle(self):
+        """
+        Waits until no tasks are running or queued in this pool.
+        """
+        while self.running or self.queued:
+            if self._idle is None:
+                self._idle = multio.Event()
+
+            await self._idle.wait()
+
+    async def _offload(self, func, *args):
+        started_at = time.perf_counter()
+        try:
+            return await run_in_thread(func, *args)
+        finally:
+            self.offload_latency.record(time.perf_counter() - started_at)
+
+    async def run_in_thread(self, func, *args):
+        """
+        Runs a regular function in a worker thread.
+
+        Threads still share the GIL, so this is best for functions that release it, such as ones
+        that do I/O or call into C extensions.
+
+        :param func: The function to run.
+        :param args: The arguments to pass to the function.
+        :return: The return value of the function.
+        """
+        return await self._offload(func, *args)
+
+    async def run_in_process(self, func, *args):
+        """
+        Runs a regular function in a worker process.
+
+        The function and its arguments must be picklable, so the function has to be defined at
+        the top level of a module. No thread is used to wait for the result.
+
+        :param func: The function to run.
+        :param args: The arguments to pass to the function.
+        :return: The return value of the function.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.process_workers)
+
+        started_at = time.perf_counter()
+        try:
+            return await wait_for_future(self._executor.submit(func, *args))
+        finally:
+            self.offload_latency.record(time.perf_counter() - started_at)
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        """
+        :return: A dict of the queue and latency metrics of this pool. Latencies are in seconds.
+        """
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "wait_mean": self.wait_latency.mean,
+            "wait_p99": self.wait_latency.percentile(99),
+            "run_mean": self.run_latency.mean,
+            "run_p99": self.run_latency.percentile(99),
+            "offload_mean": self.offload_latency.mean,
+        }
+
+    async def shutdown(self):
+        """
+        Shuts down the worker processes of this pool, if any were started.
+
+        This waits for running work to finish, in a thread so that the event loop isn't blocked.
+        """
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await run_in_thread(executor.shutdown)
@@ -1,48 +1,75 @@
 """
 Utilities for ratelimiting a command.
+
+The :class:`.RateLimiter` of a :class:`.CommandsManager` stores its buckets in a
+:class:`.RateLimitBackend`. By default, this is a :class:`.MemoryRateLimitBackend`, which is local
+to the process; bots that run the same commands in several processes can use a shared backend
+instead, so that a user can't get around a ratelimit by hitting a different process.
 """
+import abc
+import enum
+import heapq
 import time
-from typing import Any, Callable, List, Tuple
+import warnings
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from curious.commands import Context
 from curious.commands.exc import CommandRateLimited
+from curious.util import CuriousDeprecatedWarning, deprecated
 
 
 class BucketNamer:
     """
     A simple namespace for storing bucket functions.
+
+    Bucket namers should return an int, such as a snowflake; other values are hashed into one.
     """
 
     def __new__(cls):
         raise NotImplementedError("Don't make an instance of this class")
 
     @staticmethod
-    def GUILD(ctx: Context) -> str:
+    def GUILD(ctx: Context) -> int:
         """
         A bucket namer that uses the guild ID as the bucket.
         """
-        return str(ctx.guild.id)
+        return ctx.guild.id
 
     @staticmethod
-    def CHANNEL(ctx: Context) -> str:
+    def CHANNEL(ctx: Context) -> int:
         """
         A bucket namer that uses the channel ID as the bucket.
         """
-        return str(ctx.channel.id)
+        return ctx.channel.id
 
     @staticmethod
-    def AUTHOR(ctx: Context) -> str:
+    def AUTHOR(ctx: Context) -> int:
         """
         A bucket namer that uses the author ID as the bucket.
         """
-        return str(ctx.author.id)
+        return ctx.author.id
 
     @staticmethod
-    def GLOBAL(ctx: Context) -> str:
+    def GLOBAL(ctx: Context) -> int:
         """
         A bucket namer that is global.
         """
-        return "GLOBAL"
+        return 0
+
+
+class RateLimitAlgorithm(enum.Enum):
+    """
+    Represents the algorithm used by a ratelimit.
+    """
+    #: Allows ``limit`` uses in a window of ``time`` seconds, which starts at the first use.
+    #: Uses can be bunched up at the end of one window and the start of the next.
+    FIXED_WINDOW = "fixed_window"
+
+    #: The generic cell rate algorithm, which acts like a sliding window.
+    #: Allows a burst of ``limit`` uses, after which uses are allowed again at an even rate of
+    #: one every ``time / limit`` seconds.
+    GCRA = "gcra"
 
 
 class CommandRateLimit(object):
@@ -51,24 +78,179 @@ class CommandRateLimit(object):
     """
 
     def __init__(self, *, limit: int, time: float,
-                 bucket_namer: Callable[[Context], str] = BucketNamer.AUTHOR):
+                 bucket_namer: Callable[[Context], int] = BucketNamer.AUTHOR,
+                 algorithm: RateLimitAlgorithm = RateLimitAlgorithm.FIXED_WINDOW):
         """
         :param limit: The number of times a command can be called in the specified limit.
         :param time: The time (in seconds) this ratelimit lasts.
         :param bucket_namer: A callable that gets the ratelimit bucket name.
+        :param algorithm: The :class:`.RateLimitAlgorithm` to use.
         """
         self.limit = limit
         self.time = time
         self.bucket_namer = bucket_namer
+        self.algorithm = algorithm
 
         #: The command function being used.
         self.command = None
 
-    def get_full_bucket_key(self, ctx: Context) -> Tuple[str, str]:
+        # the upper bits of the bucket keys, made from the command name
+        self._key_prefix = None  # type: int
+
+    def get_full_bucket_key(self, ctx: Context) -> int:
         """
         Gets the full bucket key for this ratelimit.
+
+        The key is made out of a checksum of the command name, so that it is the same in every
+        process, and the bucket from the bucket namer.
+        """
+        if self._key_prefix is None:
+            # commands can have more than one ratelimit, so they each need their own buckets
+            index = self.command.cmd_ratelimits.index(self)
+            name = f"{self.command.cmd_name}:{index}".encode("utf-8")
+            self._key_prefix = zlib.crc32(name) << 64
+
+        bucket = self.bucket_namer(ctx)
+        if not isinstance(bucket, int):
+            bucket = zlib.crc32(str(bucket).encode("utf-8"))
+
+        return self._key_prefix | bucket
+
+    def apply(self, state: Any, now: float) -> Tuple[float, Any, float]:
+        """
+        Applies a use of the command to the state of a bucket.
+
+        This does not store anything, so that it can be used by any :class:`.RateLimitBackend`.
+
+        :param state: The current state of the bucket, or None for a new bucket.
+        :param now: The current time, in seconds.
+        :return: A tuple of (retry after, new state, expiration time). If retry after is more \
+            than zero, the use is not allowed, and the bucket must be left as it is. The bucket \
+            can be forgotten after the expiration time.
+        """
+        if self.algorithm is RateLimitAlgorithm.GCRA:
+            # the state is the theoretical arrival time of the next use
+            interval = self.time / self.limit
+            tat = now if state is None else max(state, now)
+            retry_after = tat - now - (self.time - interval)
+            if retry_after > 0:
+                return retry_after, state, state
+
+            tat += interval
+            return 0.0, tat, tat
+
+        # the state is (uses, end of the window)
+        if state is None or now >= state[1]:
+            return 0.0, (1, now + self.time), now + self.time
+
+        uses, reset = state
+        if uses >= self.limit:
+            return reset - now, state, reset
+
+        return 0.0, (uses + 1, reset), reset
+
+
+class RateLimitBackend(abc.ABC):
+    """
+    The base class for the storage of ratelimit buckets.
+
+    A backend that is shared between processes should get the state of the bucket, call
+    :meth:`.CommandRateLimit.apply` with the current time, and store the new state with a
+    compare-and-set operation, retrying if another process changed it in the meantime. Shared
+    backends must use wall clock time, as the monotonic clocks of processes aren't comparable.
+    """
+
+    @abc.abstractmethod
+    async def hit(self, key: int, limit: CommandRateLimit) -> float:
+        """
+        Records a use of a command, if it isn't ratelimited.
+
+        :param key: The bucket key, from :meth:`.CommandRateLimit.get_full_bucket_key`.
+        :param limit: The :class:`.CommandRateLimit` being checked.
+        :return: 0 if the use is allowed, or the number of seconds until it would be.
+        """
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Stores ratelimit buckets in memory.
+
+    Buckets are forgotten once they expire, using a heap ordered by expiration time, so the memory
+    used only depends on the number of buckets that are currently ratelimiting something.
+    """
+
+    def __init__(self):
+        # key -> [state, expiration]
+        self._buckets = {}  # type: Dict[int, List[Any]]
+
+        # (expiration, key), with one entry per bucket, which may be earlier than the bucket's
+        # current expiration
+        self._expiry = []  # type: List[Tuple[float, int]]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _expire(self, now: float):
+        """
+        Forgets every expired bucket.
+        """
+        heap = self._expiry
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            bucket = self._buckets[key]
+            if bucket[1] <= now:
+                del self._buckets[key]
+            else:
+                # the bucket was extended since this entry was pushed
+                heapq.heappush(heap, (bucket[1], key))
+
+    async def hit(self, key: int, limit: CommandRateLimit) -> float:
+        now = time.monotonic()
+        self._expire(now)
+
+        bucket = self._buckets.get(key)
+        state = bucket[0] if bucket is not None else None
+        retry_after, state, expires = limit.apply(state, now)
+        if retry_after > 0:
+            return retry_after
+
+        if bucket is None:
+            self._buckets[key] = [state, expires]
+            heapq.heappush(self._expiry, (expires, key))
+        else:
+            bucket[0] = state
+            bucket[1] = expires
+
+        return 0.0
+
+    def get_bucket(self, key: int) -> Optional[Tuple[int, float]]:
+        """
+        Gets a fixed window bucket, for :meth:`.RateLimiter.get_bucket`.
+
+        :param key: The bucket key.
+        :return: A tuple of (uses, expiration), or None if there is no fixed window bucket.
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None or not isinstance(bucket[0], tuple):
+            return None
+
+        return bucket[0]
+
+    def update_bucket(self, key: int, uses: int, expiration: float):
+        """
+        Sets a fixed window bucket, for :meth:`.RateLimiter.update_bucket`.
+
+        :param key: The bucket key.
+        :param uses: The number of uses in the window.
+        :param expiration: When the window ends, in :func:`time.monotonic` time.
         """
-        return self.command.cmd_name, self.bucket_namer(ctx)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [(uses, expiration), expiration]
+            heapq.heappush(self._expiry, (expiration, key))
+        else:
+            bucket[0] = (uses, expiration)
+            bucket[1] = expiration
 
 
 class RateLimiter(object):
@@ -76,9 +258,39 @@ class RateLimiter(object):
     Represents a ratelimiter. This ensures that commands meet the ratelimit before being ran.
     """
 
-    def __init__(self):
-        self._ratelimit_buckets = {}
+    # if a subclass overrides get_bucket and update_bucket, checked on first use
+    _legacy_buckets = None  # type: Optional[bool]
+
+    def __init__(self, backend: RateLimitBackend = None):
+        """
+        :param backend: The :class:`.RateLimitBackend` to store buckets in. Defaults to a \
+            :class:`.MemoryRateLimitBackend`.
+        """
+        if backend is None:
+            backend = MemoryRateLimitBackend()
 
+        #: The backend buckets are stored in.
+        self.backend = backend
+
+    def _legacy_backend(self) -> Any:
+        backend = self.backend
+        if not hasattr(backend, "get_bucket") or not hasattr(backend, "update_bucket"):
+            raise NotImplementedError(f"{type(backend).__name__} doesn't support get_bucket "
+                                      f"and update_bucket")
+
+        return backend
+
+    @deprecated(since="0.8.0", see_instead=RateLimitBackend.hit, removal="0.9.0")
+    async def get_bucket(self, key: Any) -> Optional[Tuple[int, float]]:
+        """
+        Gets the ratelimit bucket for the specified key.
+
+        :param key: The key to use.
+        :return: A two-item tuple of (uses, expiration), or None if no bucket was found.
+        """
+        return self._legacy_backend().get_bucket(key)
+
+    @deprecated(since="0.8.0", see_instead=RateLimitBackend.hit, removal="0.9.0")
     async def update_bucket(self, key: Any, current_uses: int, expiration: float):
         """
         Updates a ratelimit bucket.
@@ -87,37 +299,51 @@ class RateLimiter(object):
         :param current_uses: The current uses for the key.
         :param expiration: When the ratelimit expires.
         """
-        self._ratelimit_buckets[key] = (current_uses, expiration)
+        self._legacy_backend().update_bucket(key, current_uses, expiration)
 
-    async def get_bucket(self, key: Any) -> Tuple[int, float]:
+    def _uses_legacy_buckets(self) -> bool:
         """
-        Gets the ratelimit bucket for the specified key.
+        Checks if a subclass still stores buckets by overriding get_bucket and update_bucket.
+        """
+        cls = type(self)
+        return cls.get_bucket is not RateLimiter.get_bucket \
+            or cls.update_bucket is not RateLimiter.update_bucket
 
-        :param key: The key to use.
-        :return: A two-item tuple of (uses, expiration), or None if no bucket was found.
+    async def _ensure_legacy_ratelimits(self, ctx: Context, cmd):
+        """
+        Ensures the ratelimits for a command with the overridden get_bucket and update_bucket,
+        as a fixed window.
         """
-        return self._ratelimit_buckets.get(key)
+        for limit in cmd.cmd_ratelimits:
+            key = limit.get_full_bucket_key(ctx)
+            bucket = await self.get_bucket(key)
+            now = time.monotonic()
+            if not bucket or now >= bucket[1]:
+                await self.update_bucket(key, 1, now + limit.time)
+            elif bucket[0] >= limit.limit:
+                raise CommandRateLimited(ctx, cmd, limit, bucket)
+            else:
+                await self.update_bucket(key, bucket[0] + 1, bucket[1])
 
     async def ensure_ratelimits(self, ctx: Context, cmd):
         """
         Ensures the ratelimits for a command.
         """
+        if self._legacy_buckets is None:
+            self._legacy_buckets = self._uses_legacy_buckets()
+            # only warn once, rather than on every command
+            if self._legacy_buckets:
+                warnings.warn(f"{type(self).__name__} overrides get_bucket and update_bucket, "
+                              f"which are deprecated; pass a RateLimitBackend to the "
+                              f"RateLimiter instead", category=CuriousDeprecatedWarning,
+                              stacklevel=2)
+
+        if self._legacy_buckets:
+            return await self._ensure_legacy_ratelimits(ctx, cmd)
+
         ratelimits: List[CommandRateLimit] = cmd.cmd_ratelimits
         for limit in ratelimits:
-            bucket_key = limit.get_full_bucket_key(ctx)
-            bucket = await self.get_bucket(key=bucket_key)
-            if not bucket:
-                await self.update_bucket(bucket_key, 1, time.monotonic() + limit.time)
-                continue
-
-            # check if we've hit the limit
-            if bucket[0] == limit.limit:
-                # we have, but that might be okay if the timer has expired
-                if time.monotonic() > bucket[1]:
-                    # we're good, so we can just reset the bucket and continue on our way
-                    await self.update_bucket(bucket_key, 1, time.monotonic() + limit.time)
-                else:
-                    raise CommandRateLimited(ctx, cmd, limit, bucket)
-            else:
-                # we haven't, but we need to up the number anyway
-                await self.update_bucket(bucket_key, bucket[0] + 1, bucket[1])
+            retry_after = await self.backend.hit(limit.get_full_bucket_key(ctx), limit)
+            if retry_after > 0:
+                bucket = (limit.limit, time.monotonic() + retry_after)
+                raise CommandRateLimited(ctx, cmd, limit, bucket)
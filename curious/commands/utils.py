@@ -17,10 +17,12 @@ Misc utilities used in commands related things.
 
 .. currentmodule:: curious.commands.utils
 """
-import collections
+import functools
 import inspect
+import re
+import time
 import typing_inspect
-from typing import Callable, Iterable, List, Union
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from curious.commands.exc import ConversionFailedError, MissingArgumentError
 from curious.core.client import Client
@@ -46,13 +48,81 @@ def get_full_name(func) -> str:
     return ' '.join(reversed(name))
 
 
-async def _convert(ctx, tokens: List[str], signature: inspect.Signature):
+class ConverterPlan(object):
     """
-    Converts tokens passed from discord, using a signature.
+    The analysed signature of a command, made once when the command is created.
+
+    Invoking a command runs the plan, rather than inspecting the signature and looking up the
+    converter for every parameter again.
+    """
+
+    def __init__(self, func):
+        """
+        :param func: The unbound command function.
+        """
+        #: The parameters of the function, including ``self`` for plugin commands.
+        self.parameters = tuple(inspect.signature(func).parameters.values())
+
+        # (context class, converters version, offset) -> [converter for each parameter]
+        self._converters = {}
+
+    def parameters_for(self, func) -> Tuple[inspect.Parameter, ...]:
+        """
+        Gets the parameters of a command, the same as ``inspect.signature(func).parameters``.
+
+        :param func: The command, which may be bound to a plugin.
+        :return: The parameters, excluding ``self`` if the command is bound.
+        """
+        if inspect.ismethod(func):
+            return self.parameters[1:]
+
+        return self.parameters
+
+    def converters_for(self, ctx, parameters: Tuple[inspect.Parameter, ...]) -> list:
+        """
+        Gets the converter for every parameter, resolving them for the first invocation with this
+        context class.
+
+        :param ctx: The :class:`.Context` the command is being invoked with.
+        :param parameters: The parameters, from :meth:`.ConverterPlan.parameters_for`.
+        :return: A list of converters, one for each parameter.
+        """
+        from curious.commands.context import Context
+        key = (type(ctx), Context._converters_version, len(parameters))
+        try:
+            return self._converters[key]
+        except KeyError:
+            converters = [ctx._lookup_converter(param.annotation) for param in parameters]
+            self._converters[key] = converters
+            return converters
+
+
+def get_converter_plan(func) -> ConverterPlan:
+    """
+    Gets the :class:`.ConverterPlan` of a command, making it if the function has no plan.
+
+    :param func: The command function, which may be bound to a plugin.
+    :return: The :class:`.ConverterPlan` for the command.
+    """
+    func = getattr(func, "__func__", func)
+    try:
+        return func.cmd_plan
+    except AttributeError:
+        plan = func.cmd_plan = ConverterPlan(func)
+        return plan
+
+
+async def _convert(ctx, tokens: 'Union[TokenStream, List[str]]', func):
+    """
+    Converts tokens passed from discord, using the converter plan of a command.
     """
     final_args = []
     final_kwargs = {}
 
+    plan = get_converter_plan(func)
+    parameters = plan.parameters_for(func)
+    converters = plan.converters_for(ctx, parameters)
+
     def _with_reraise(func, ann, ctx, arg):
         try:
             return func(ann, ctx, arg)
@@ -61,88 +131,50 @@ async def _convert(ctx, tokens: List[str], signature: inspect.Signature):
         except Exception as e:
             raise ConversionFailedError(ctx, arg, ann, message="Converter error") from e
 
-    args_it = iter(tokens)
-    for n, (name, param) in enumerate(signature.parameters.items()):
+    tokens = TokenStream.from_tokens(tokens)
+    for n, param in enumerate(parameters):
         if n == 0:
             # Don't convert the `ctx` argument.
             continue
 
         assert isinstance(param, inspect.Parameter)
         # We loop over the signature parameters because it's easier to use those to consume.
-        # Get the next argument from args.
-
-        def consume_token() -> str:
-            try:
-                return next(args_it)
-            except StopIteration as e:
-                # not good!
-                # If we're a *arg format, we can safely handle this, or if we have a default.
-                if param.kind in [inspect.Parameter.KEYWORD_ONLY,
-                                  inspect.Parameter.VAR_POSITIONAL]:
-                    return None
-
-                if param.default == inspect.Parameter.empty:
-                    raise MissingArgumentError(ctx, param.name) from e
-
-                return None  # ??
+        # Tokens are only split off of the content as they are consumed.
 
         # Begin the consumption!
         if param.kind in [inspect.Parameter.POSITIONAL_OR_KEYWORD,
                           inspect.Parameter.POSITIONAL_ONLY]:
-            # ensure we have a non-empty argument
-            arg = consume_token()
+            # empty tokens are skipped, and quotes are already removed
+            arg = next(tokens, None)
             if arg is None:
-                break
-
-            while arg == "":
-                if arg is None:
-                    break
+                if param.default == inspect.Parameter.empty:
+                    raise MissingArgumentError(ctx, param.name)
 
-                arg = next(args_it)
+                break
 
-            arg = replace_quotes(arg)
-            converter = ctx._lookup_converter(param.annotation)
+            converter = converters[n]
             final_args.append(_with_reraise(converter, param.annotation, ctx, arg))
             continue
 
         if param.kind in [inspect.Parameter.KEYWORD_ONLY]:
             # Only add it to final_kwargs.
-            # This is a consume all operation, so we eat all of the arguments.
-            f = []
+            # This is a consume all operation, so we take the rest of the message as written.
+            rest = tokens.rest()
 
-            while True:
-                next_arg = consume_token()
-                if next_arg is None:
-                    break
-
-                f.append(next_arg)
-
-            if not f:
+            if rest is None:
                 if param.default is inspect.Parameter.empty:
                     raise MissingArgumentError(ctx, param.name)
                 else:
                     final_kwargs[param.name] = param.default
             else:
-                converter = ctx._lookup_converter(param.annotation)
-                if len(f) == 1:
-                    final_kwargs[param.name] = _with_reraise(converter, param.annotation, ctx,
-                                                             f[0])
-                else:
-                    final_kwargs[param.name] = _with_reraise(converter, param.annotation, ctx,
-                                                             " ".join(f))
+                converter = converters[n]
+                final_kwargs[param.name] = _with_reraise(converter, param.annotation, ctx, rest)
             continue
 
         if param.kind in [inspect.Parameter.VAR_POSITIONAL]:
             # This *shouldn't* be called on `*` arguments, but we can't be sure.
             # Special case - consume ALL the arguments.
-            f = []
-
-            while True:
-                next_arg = consume_token()
-                if next_arg is None:
-                    break
-
-                f.append(next_arg)
+            f = list(tokens)
 
             if not f:
                 if param.default is inspect.Parameter.empty:
@@ -150,7 +182,7 @@ async def _convert(ctx, tokens: List[str], signature: inspect.Signature):
                 else:
                     final_kwargs[param.name] = param.default
             else:
-                converter = ctx._lookup_converter(param.annotation)
+                converter = converters[n]
                 results = []
                 for item in f:
                     results.append(_with_reraise(converter, param.annotation, ctx, item))
@@ -188,7 +220,7 @@ def get_usage(func, invoked_as: str = None) -> str:
     else:
         final = [func.cmd_name]
 
-    signature = inspect.signature(func)
+    parameters = get_converter_plan(func).parameters_for(func)
 
     # TODO: Replace this with a proper one
     def stringify(ann):
@@ -199,7 +231,8 @@ def get_usage(func, invoked_as: str = None) -> str:
         args = typing_inspect.get_args(ann, evaluate=True)
         return f"{origin.__name__}[{', '.join(arg.__name__ for arg in args)}]"
 
-    for n, (name, param) in enumerate(signature.parameters.items()):
+    for n, param in enumerate(parameters):
+        name = param.name
         # always skip the first arg, as it's self/ctx
         if n == 0:
             continue
@@ -239,11 +272,6 @@ def get_usage(func, invoked_as: str = None) -> str:
     return " ".join(final)
 
 
-# This function is a modified version of the code taken from https://stackoverflow.com/a/43035638.
-# This function is licenced under the MIT Licence. (C) 2017 THE_MAD_KING.
-# See: https://meta.stackexchange.com/questions/272956/a-new-code-license-the-mit-this-time-with
-# -attribution-required
-# You can find a copy of the MIT Licence at https://opensource.org/licenses/MIT.
 def split_message_content(content: str, delim: str = " ") -> List[str]:
     """
     Splits a message into individual parts by `delim`, returning a list of strings.
@@ -258,29 +286,339 @@ def split_message_content(content: str, delim: str = " ") -> List[str]:
     :param delim: The delimiter to split on.
     :return: A list of items split
     """
-
+    stream = TokenStream(content, delim)
     tokens = []
-    cur = ''
-    in_quotes = False
-
-    for char in content.strip():
-        if char == delim and not in_quotes:
-            tokens.append(cur)
-            cur = ''
-        elif char == '"' and not in_quotes:
-            in_quotes = True
-            cur += char
-        elif char == '"' and in_quotes:
-            in_quotes = False
-            cur += char
-        else:
-            cur += char
-    tokens.append(cur)
+    while True:
+        token = stream._next_raw()
+        if token is None:
+            return tokens
+
+        tokens.append(token)
+
+
+@functools.lru_cache()
+def _get_token_pattern(delim: str):
+    """
+    Gets the pattern that matches one token, as written.
+    """
+    # a token is made up of quoted sections (which can contain the delimiter, and run to the end if
+    # they aren't closed), escaped quotes and backslashes, and anything else that isn't the
+    # delimiter
+    delim = re.escape(delim)
+    return re.compile(rf'(?:"(?:\\[\\"]|[^"])*(?:"|\Z)|\\[\\"]|[^"{delim}])*', re.DOTALL)
+
+
+_UNQUOTE_PATTERN = re.compile(r'\\([\\"])|"')
+
+
+def _unquote(token: str) -> str:
+    """
+    Removes the quotes in a token, and resolves escaped quotes and backslashes.
+    """
+    if '"' not in token and "\\" not in token:
+        return token
+
+    return _UNQUOTE_PATTERN.sub(lambda match: match.group(1) or "", token)
+
+
+class TokenStream(object):
+    """
+    Splits a message into tokens lazily, one token at a time.
+
+    Tokens are split by the delimiter, unless it is inside double quotes. Iterating over the stream
+    skips empty tokens, and yields each token with its quotes removed:
+
+    .. code-block:: python3
+
+        stream = TokenStream(r'"Fuyukai desu" says \\"hi\\"')
+        list(stream)  # ['Fuyukai desu', 'says', '"hi"']
+
+    Each token is matched with a single regular expression when it is consumed, so a command that
+    takes the rest of the message with a keyword-only argument never splits it at all.
+    """
+
+    def __init__(self, content: str, delim: str = " "):
+        """
+        :param content: The message content to split.
+        :param delim: The delimiter to split on.
+        """
+        #: The content being split.
+        self.content = content.strip()
+
+        #: The delimiter being split on.
+        self.delim = delim
+
+        self._pattern = _get_token_pattern(delim)
+        # the start of the next token, or None if every token has been consumed
+        self._pos = 0  # type: Optional[int]
+
+    @classmethod
+    def from_tokens(cls, tokens: 'Union[TokenStream, Iterable[str]]', delim: str = " ") \
+            -> 'TokenStream':
+        """
+        Makes a stream out of a list of tokens, such as one returned by a custom message check.
+
+        The tokens are used as they are, and are never split again; only their quotes are removed
+        when they are consumed, with :func:`.replace_quotes`.
+
+        :param tokens: The list of tokens, or a :class:`.TokenStream` which is returned as-is.
+        :param delim: The delimiter the tokens were split on, used to join them for \
+            :meth:`.TokenStream.rest`.
+        :return: A :class:`.TokenStream` of the tokens.
+        """
+        if isinstance(tokens, TokenStream):
+            return tokens
+
+        return _TokenListStream(tokens, delim)
+
+    def __repr__(self) -> str:
+        return f"<TokenStream content={self.content!r} pos={self._pos}>"
+
+    def __iter__(self) -> 'TokenStream':
+        return self
+
+    def __next__(self) -> str:
+        token = self.next_raw()
+        if token is None:
+            raise StopIteration
+
+        return _unquote(token)
+
+    def __bool__(self) -> bool:
+        return self.peek_raw() is not None
+
+    def _next_raw(self) -> Optional[str]:
+        """
+        Consumes the next token as written, including empty tokens.
+        """
+        if self._pos is None:
+            return None
+
+        match = self._pattern.match(self.content, self._pos)
+        end = match.end()
+        # the match always stops at a delimiter, or the end of the content
+        self._pos = end + 1 if end < len(self.content) else None
+        return match.group()
+
+    def next_raw(self) -> Optional[str]:
+        """
+        Consumes the next non-empty token, as written.
+
+        :return: The token with its quotes, or None if there are no tokens left.
+        """
+        while True:
+            token = self._next_raw()
+            if token != "":
+                return token
+
+    def peek_raw(self) -> Optional[str]:
+        """
+        Gets the next non-empty token, as written, without consuming it.
+
+        :return: The token with its quotes, or None if there are no tokens left.
+        """
+        pos = self._pos
+        try:
+            return self.next_raw()
+        finally:
+            self._pos = pos
+
+    def rest(self) -> Optional[str]:
+        """
+        Consumes the rest of the content, as written.
+
+        :return: The rest of the content, or None if there are no tokens left.
+        """
+        if self._pos is None:
+            return None
+
+        rest = self.content[self._pos:].lstrip(self.delim)
+        self._pos = None
+        return rest or None
+
+
+class _TokenListStream(TokenStream):
+    """
+    A :class:`.TokenStream` over tokens that have already been split.
+    """
+
+    def __init__(self, tokens: Iterable[str], delim: str = " "):
+        self.tokens = list(tokens)
+        super().__init__(delim.join(self.tokens), delim)
+        self._index = 0
+
+    def __repr__(self) -> str:
+        return f"<TokenStream tokens={self.tokens!r} index={self._index}>"
+
+    def __next__(self) -> str:
+        token = self.next_raw()
+        if token is None:
+            raise StopIteration
+
+        return replace_quotes(token)
+
+    def _next_raw(self) -> Optional[str]:
+        if self._index >= len(self.tokens):
+            return None
+
+        self._index += 1
+        return self.tokens[self._index - 1]
+
+    def peek_raw(self) -> Optional[str]:
+        index = self._index
+        try:
+            return self.next_raw()
+        finally:
+            self._index = index
+
+    def rest(self) -> Optional[str]:
+        if self._index >= len(self.tokens):
+            return None
+
+        rest = self.delim.join(self.tokens[self._index:])
+        self._index = len(self.tokens)
+        return rest
+
+
+class PrefixMatcher(object):
+    """
+    Matches one of a set of static prefixes at the start of a message.
+
+    The prefixes are compiled into a single regular expression, so matching costs the same no
+    matter how many prefixes there are. If more than one prefix matches, the first one in the
+    order given wins, so longer prefixes should come before shorter prefixes they start with.
+
+    .. code-block:: python3
+
+        matcher = PrefixMatcher(["!!", "!", "bot "])
+        matcher.match("!!ping")  # "!!"
+    """
+
+    def __init__(self, prefixes: Iterable[str]):
+        """
+        :param prefixes: The prefixes to match, in order of priority.
+        """
+        #: The prefixes this matcher matches, in order of priority.
+        self.prefixes = tuple(dict.fromkeys(prefixes))
+
+        self._regex = re.compile("|".join(map(re.escape, self.prefixes)))
+
+    def __repr__(self) -> str:
+        return f"<PrefixMatcher prefixes={self.prefixes!r}>"
 
-    return tokens
+    def match(self, content: str) -> Optional[str]:
+        """
+        :param content: The content of a message.
+        :return: The prefix the content starts with, or None if it doesn't start with any.
+        """
+        if not self.prefixes:
+            return None
+
+        match = self._regex.match(content)
+        if match is None:
+            return None
+
+        return match.group(0)
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_matcher(prefixes: Tuple[str, ...]) -> PrefixMatcher:
+    """
+    Gets a compiled :class:`.PrefixMatcher`, re-using ones for prefixes seen before.
+    """
+    return PrefixMatcher(prefixes)
 
 
-def prefix_check_factory(prefix: Union[str, Iterable[str], Callable[[Client, Message], str]]):
+def _make_matcher(prefix: Union[str, Iterable[str]]) -> PrefixMatcher:
+    """
+    Makes a :class:`.PrefixMatcher` from a prefix or an iterable of prefixes.
+    """
+    if isinstance(prefix, str):
+        return _get_matcher((prefix,))
+
+    return _get_matcher(tuple(prefix))
+
+
+class PrefixCache(object):
+    """
+    Caches the result of a callable prefix for every guild.
+
+    The cached prefixes of a guild expire after ``ttl`` seconds, and can be invalidated
+    explicitly, e.g. when the prefix of a guild is changed:
+
+    .. code-block:: python3
+
+        message_check = prefix_check_factory(get_prefix_from_db, cache_ttl=600)
+        manager = CommandsManager(bot, message_check=message_check)
+
+        async def set_prefix(guild, prefix):
+            await save_prefix_to_db(guild, prefix)
+            message_check.cache.invalidate(guild.id)
+
+    .. warning::
+
+        The callable is only called once per guild (and once for all DMs) until the cache
+        expires, so it must only depend on the guild of the message.
+    """
+
+    def __init__(self, func: 'Callable[[Client, Message], Union[str, Iterable[str]]]',
+                 ttl: float):
+        """
+        :param func: The callable that gets the prefixes for a message.
+        :param ttl: The number of seconds prefixes are cached for.
+        """
+        #: The callable that gets the prefixes for a message.
+        self.func = func
+
+        #: The number of seconds prefixes are cached for.
+        self.ttl = ttl
+
+        # guild id -> (matcher, expires at)
+        self._cache = {}  # type: Dict[Optional[int], Tuple[PrefixMatcher, float]]
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    async def get_matcher(self, bot: Client, message: Message) -> PrefixMatcher:
+        """
+        Gets the :class:`.PrefixMatcher` for the guild of a message, calling the callable if the
+        prefixes aren't cached.
+
+        :param bot: The :class:`.Client` the message was received on.
+        :param message: The :class:`.Message` to get the prefixes for.
+        :return: The :class:`.PrefixMatcher` for the guild.
+        """
+        key = message.guild_id
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        prefix = self.func(bot, message)
+        if inspect.isawaitable(prefix):
+            prefix = await prefix
+
+        matcher = _make_matcher(prefix)
+        self._cache[key] = (matcher, now + self.ttl)
+        return matcher
+
+    def invalidate(self, guild_id: Optional[int]):
+        """
+        Removes the cached prefixes of a guild.
+
+        :param guild_id: The ID of the guild, or None for DMs.
+        """
+        self._cache.pop(guild_id, None)
+
+    def clear(self):
+        """
+        Removes every cached prefix.
+        """
+        self._cache.clear()
+
+
+def prefix_check_factory(prefix: Union[str, Iterable[str], Callable[[Client, Message], str]], *,
+                         cache_ttl: float = None):
     """
     The default message function factory.
 
@@ -302,39 +640,47 @@ def prefix_check_factory(prefix: Union[str, Iterable[str], Callable[[Client, Mes
     The :attr:`prefix` is set on the returned function that can be used to retrieve the prefixes
     defined to create  the function at any time.
 
+    Static prefixes are compiled into a :class:`.PrefixMatcher` once. If ``prefix`` is a callable
+    and ``cache_ttl`` is set, its result is cached per guild in a :class:`.PrefixCache`, which is
+    set as :attr:`cache` on the returned function.
+
     :param prefix: A :class:`str` or :class:`typing.Iterable[str]` that represents the prefix(es) \
         to use.
+    :param cache_ttl: The number of seconds to cache the result of a callable prefix for, per \
+        guild. If this is None, the callable is called for every message.
     :return: A callable that can be used for the ``message_check`` function on the client.
     """
+    cache = None
+    if callable(prefix):
+        static_matcher = None
+        if cache_ttl is not None:
+            cache = PrefixCache(prefix, ttl=cache_ttl)
+    else:
+        static_matcher = _make_matcher(prefix)
 
     async def __inner(bot: Client, message: Message):
-        # move prefix out of global scope
-        _prefix = prefix
-        matched = None
-
-        if callable(_prefix):
-            _prefix = _prefix(bot, message)
+        if static_matcher is not None:
+            matcher = static_matcher
+        elif cache is not None:
+            matcher = await cache.get_matcher(bot, message)
+        else:
+            _prefix = prefix(bot, message)
             if inspect.isawaitable(_prefix):
                 _prefix = await _prefix
 
-        if isinstance(_prefix, str):
-            match = message.content.startswith(_prefix)
-            if match:
-                matched = _prefix
-
-        elif isinstance(prefix, collections.Iterable):
-            for i in _prefix:
-                if message.content.startswith(i):
-                    matched = i
-                    break
+            matcher = _make_matcher(_prefix)
 
+        matched = matcher.match(message.content)
         if not matched:
             return None
 
-        tokens = split_message_content(message.content[len(matched):])
-        command_word = tokens[0]
+        tokens = TokenStream(message.content[len(matched):])
+        command_word = tokens.next_raw()
+        if command_word is None:
+            return None
 
-        return command_word, tokens[1:]
+        return command_word, tokens
 
     __inner.prefix = prefix
+    __inner.cache = cache
     return __inner
@@ -24,10 +24,15 @@ delegating it to client code.
 .. autosummary::
     :toctree: core
     
+    cache_policy
     client
+    coalescer
     event
+    event_bus
+    event_queue
     gateway
     httpclient
     state
+    tracing
 """
 
@@ -0,0 +1,75 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Controls what the connection state caches.
+
+.. currentmodule:: curious.core.cache_policy
+"""
+from dataclasses import dataclass
+
+
+@dataclass
+class CachePolicy:
+    """
+    Controls which entities the :class:`.State` caches.
+
+    Events are still dispatched for entities that aren't cached, but the objects passed to them
+    will not be kept around afterwards.
+
+    .. code-block:: python3
+
+        # only keep members that have been seen in the last 30 minutes, and no presences
+        policy = CachePolicy(presences=False, member_ttl=30 * 60)
+        client = Client(token, cache_policy=policy)
+    """
+
+    #: If member presences (statuses and games) are cached.
+    #: If this is False, every member will appear offline.
+    presences: bool = True
+
+    #: If the games of member presences are cached. Only used if presences are cached.
+    presence_games: bool = True
+
+    #: If guild voice states are cached.
+    voice_states: bool = True
+
+    #: If guild emojis are cached.
+    emojis: bool = True
+
+    #: If offline members are cached.
+    #: If this is False, members are dropped when they go offline, and large guilds will not be
+    #: chunked.
+    offline_members: bool = True
+
+    #: If set, members that haven't been seen for this many seconds are dropped from the cache.
+    #: A member is seen when they send a message, start typing, or have their presence, voice
+    #: state, or member data updated.
+    member_ttl: float = None
+
+    @classmethod
+    def minimal(cls) -> 'CachePolicy':
+        """
+        :return: A :class:`.CachePolicy` that caches as little as possible.
+        """
+        return cls(presences=False, presence_games=False, voice_states=False, emojis=False,
+                   offline_members=False)
+
+    @property
+    def caches_all_members(self) -> bool:
+        """
+        :return: If every member of a guild is kept in the cache with this policy.
+        """
+        return self.offline_members and self.member_ttl is None
@@ -84,7 +84,7 @@ class Chunker(object):
 
             if len(guilds) < self.batch_size:
                 # if all are available, skip the exit check
-                if any(guild.unavailable for guild in self.client.guilds_for(shard)):
+                if self.client.state.unavailable_guild_count(shard):
                     continue
 
             # pray for the gil
@@ -103,14 +103,14 @@ class Chunker(object):
         if self._ready[shard_id]:
             return
 
-        guilds = self.client.guilds_for(shard_id)
+        state = self.client.state
 
         # if they're unavailable we clearly don't have the members
-        if any(guild.unavailable is True for guild in guilds):
+        if state.unavailable_guild_count(shard_id):
             return
 
         # if they're not all set then we don't want to fire ready at all
-        if not all(guild._finished_chunking.is_set() for guild in guilds if guild.large):
+        if state.unchunked_guild_count(shard_id):
             return
 
         # fire a ready
@@ -131,7 +131,7 @@ class Chunker(object):
         """
         Potentially adds a guild to the pending count.
         """
-        if guild.large:
+        if guild.large and self.client.state.cache_policy.offline_members:
             logger.debug("Added guild `%s` to chunk pending", guild.id)
             self._pending[ctx.shard_id].append(guild)
 
@@ -143,6 +143,10 @@ class Chunker(object):
         """
         Handles a new guild (just become available for) has just joined.
         """
+        # chunks are only useful if we're caching offline members
+        if not self.client.state.cache_policy.offline_members:
+            return
+
         # immediately chunk
         await self.fire_chunks(ctx.shard_id, [guild])
 
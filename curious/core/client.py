@@ -27,14 +27,20 @@ import functools
 import inspect
 import logging
 import multio
+import time
 import typing
 from types import MappingProxyType
 from typing import Union
 
 from curious.core import chunker as md_chunker
+from curious.core.cache_policy import CachePolicy
+from curious.core.coalescer import DispatchCoalescer
 from curious.core.event import EventContext, EventManager, event as ev_dec, scan_events
+from curious.core.event_queue import EventQueue
 from curious.core.gateway import GatewayHandler, open_websocket
 from curious.core.httpclient import HTTPClient
+from curious.core.state import HandlerType
+from curious.core.tracing import EventTracer, TraceStage
 from curious.dataclasses import channel as dt_channel, guild as dt_guild, member as dt_member
 from curious.dataclasses.appinfo import AppInfo
 from curious.dataclasses.bases import allow_external_makes
@@ -96,6 +102,12 @@ class Client(object):
             print("Bot logged in.")
 
     """
+    #: The dispatches the state always processes, even if they have raw subscribers, as they are
+    #: needed to track if the bot is ready. ``GUILD_MEMBERS_CHUNK`` is included as a shard that
+    #: requested chunks isn't ready until every chunk has been processed.
+    STATE_REQUIRED_DISPATCHES = frozenset({"READY", "RESUMED", "GUILD_CREATE", "GUILD_DELETE",
+                                           "GUILD_MEMBERS_CHUNK"})
+
     #: A list of events to ignore the READY status.
     IGNORE_READY = [
         "connect",
@@ -107,11 +119,25 @@ class Client(object):
 
     def __init__(self, token: str, *,
                  state_klass: type = None,
-                 bot_type: int = (BotType.BOT | BotType.ONLY_USER)):
+                 bot_type: int = (BotType.BOT | BotType.ONLY_USER),
+                 columnar_members: bool = False,
+                 cache_policy: CachePolicy = None,
+                 stream_dispatches: bool = False,
+                 event_queue_factory: 'typing.Callable[[], EventQueue]' = None,
+                 coalescer_factory: 'typing.Callable[[], DispatchCoalescer]' = None):
         """
         :param token: The current token for this bot.
         :param state_klass: The class to construct the connection state from.
         :param bot_type: A union of :class:`.BotType` that defines the type of this bot.
+        :param columnar_members: If every guild should keep a :class:`.ColumnarMemberStore` of \
+            its members, for fast aggregate queries.
+        :param cache_policy: The :class:`.CachePolicy` that controls what the state caches.
+        :param stream_dispatches: If events should be fired as soon as the state produces them, \
+            rather than after the whole dispatch has been processed.
+        :param event_queue_factory: A callable that makes an :class:`.EventQueue` for each shard. \
+            If this is None, dispatches are processed as soon as they are received.
+        :param coalescer_factory: A callable that makes a :class:`.DispatchCoalescer` for each \
+            shard. If this is None, high-frequency dispatches are not coalesced.
         """
         #: The mapping of `shard_id -> gateway` objects.
         self._gateways = {}  # type: typing.MutableMapping[int, GatewayHandler]
@@ -128,10 +154,30 @@ class Client(object):
 
         #: The current connection state for the bot.
         self.state = state_klass(self)
+        self.state.columnar_members = columnar_members
+        if cache_policy is not None:
+            self.state.cache_policy = cache_policy
 
         #: The bot type for this bot.
         self.bot_type = bot_type
 
+        #: If events should be fired as soon as the state produces them.
+        #: When this is False, every event from a dispatch is fired after the state has finished
+        #: processing it.
+        self.stream_dispatches = stream_dispatches
+
+        #: The callable used to make the :class:`.EventQueue` for each shard, if any.
+        self.event_queue_factory = event_queue_factory
+
+        #: The mapping of `shard_id -> event queue` objects.
+        self._event_queues = {}  # type: typing.MutableMapping[int, EventQueue]
+
+        #: The callable used to make the :class:`.DispatchCoalescer` for each shard, if any.
+        self.coalescer_factory = coalescer_factory
+
+        #: The mapping of `shard_id -> coalescer` objects.
+        self._coalescers = {}  # type: typing.MutableMapping[int, DispatchCoalescer]
+
         if self.bot_type & BotType.BOT and self.bot_type & BotType.USERBOT:
             raise ValueError("Bot cannot be a bot and a userbot at the same time")
 
@@ -156,9 +202,63 @@ class Client(object):
         #: The task manager used for this bot.
         self.task_manager = None
 
+        #: The :class:`.EventTracer` for this bot, if tracing is enabled.
+        self.tracer = None  # type: EventTracer
+
+        #: A mapping of dispatch name -> list of raw dispatch subscribers.
+        self._raw_subscribers = {}  # type: typing.Dict[str, typing.List[typing.Callable]]
+
         for (name, event) in scan_events(self):
             self.events.add_event(event)
 
+    def enable_tracing(self, tracer: EventTracer = None) -> EventTracer:
+        """
+        Enables latency tracing of the event pipeline.
+
+        Every stage in :class:`.TraceStage` is timed, and recorded into per-event histograms on
+        the returned :class:`.EventTracer`. Use :meth:`.EventTracer.add_hook` to export samples
+        as they are recorded.
+
+        :param tracer: The :class:`.EventTracer` to use. If this is None, a new one is created.
+        :return: The :class:`.EventTracer` being used.
+        """
+        if tracer is None:
+            tracer = EventTracer()
+
+        self.tracer = tracer
+        self.events.tracer = tracer
+        for gw in self._gateways.values():
+            gw.tracer = tracer
+
+        return tracer
+
+    def disable_tracing(self):
+        """
+        Disables latency tracing of the event pipeline.
+
+        The previous :class:`.EventTracer` is kept around with everything it recorded.
+        """
+        self.tracer = None
+        self.events.tracer = None
+        for gw in self._gateways.values():
+            gw.tracer = None
+
+    @property
+    def event_queues(self) -> 'typing.Mapping[int, EventQueue]':
+        """
+        :return: A mapping of shard_id -> :class:`.EventQueue` for every running shard, if event \
+            queues are enabled.
+        """
+        return MappingProxyType(self._event_queues)
+
+    @property
+    def coalescers(self) -> 'typing.Mapping[int, DispatchCoalescer]':
+        """
+        :return: A mapping of shard_id -> :class:`.DispatchCoalescer` for every running shard, if \
+            coalescing is enabled.
+        """
+        return MappingProxyType(self._coalescers)
+
     @property
     def user(self) -> BotUser:
         """
@@ -260,6 +360,62 @@ class Client(object):
 
         return _inner
 
+    def add_raw_subscriber(self, name: str, func):
+        """
+        Subscribes to the raw data of a dispatch.
+
+        The subscriber is called with ``(ctx, name, data)`` for every dispatch of this type, where
+        ``data`` is the decoded ``d`` field of the payload. Dispatches with a raw subscriber are
+        not processed by the state, so no objects are created for them and no events are fired
+        for them, except for :attr:`.Client.STATE_REQUIRED_DISPATCHES`.
+
+        Subscribers are awaited in order before the next dispatch is processed, so they should be
+        fast.
+
+        :param name: The name of the dispatch, e.g. ``MESSAGE_CREATE``.
+        :param func: The async function to call.
+        """
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError("Raw subscribers must be async functions")
+
+        self._raw_subscribers.setdefault(name, []).append(func)
+
+    def remove_raw_subscriber(self, name: str, func):
+        """
+        Unsubscribes from the raw data of a dispatch.
+
+        :param name: The name of the dispatch.
+        :param func: The subscriber to remove.
+        """
+        subscribers = self._raw_subscribers.get(name)
+        if not subscribers:
+            return
+
+        subscribers.remove(func)
+        if not subscribers:
+            del self._raw_subscribers[name]
+
+    def raw_dispatch(self, *names: str):
+        """
+        A convenience decorator to subscribe a function to the raw data of dispatches.
+
+        .. code-block:: python3
+
+            @bot.raw_dispatch("MESSAGE_CREATE", "MESSAGE_DELETE")
+            async def forward(ctx, name: str, data: dict):
+                await queue.put((name, data))
+
+        :param names: The names of the dispatches to subscribe to.
+        """
+
+        def _inner(func):
+            for name in names:
+                self.add_raw_subscriber(name, func)
+
+            return func
+
+        return _inner
+
     # rip in peace old fire_event
     # 2016-2017
     # broke my pycharm
@@ -569,44 +725,96 @@ class Client(object):
 
         return guild
 
-    @ev_dec(name="gateway_dispatch_received")
+    # inline, so dispatches are processed in order without a task each
+    @ev_dec(name="gateway_dispatch_received", inline=True)
     async def handle_dispatches(self, ctx: EventContext, name: str, dispatch: dict):
         """
         Handles dispatches for the client.
         """
-        try:
-            handle_name = name.lower()
-            handler = getattr(self.state, f"handle_{handle_name}")
-        except AttributeError:
+        subscribers = self._raw_subscribers.get(name)
+        if subscribers is not None:
+            for func in subscribers:
+                await self.events._safety_wrapper(func, ctx, name, dispatch)
+
+            if name not in self.STATE_REQUIRED_DISPATCHES:
+                return
+
+        entry = self.state.get_dispatch_handler(name)
+        if entry is None:
             logger.warning(f"Got unknown dispatch {name}")
             return
-        else:
-            logger.debug(f"Processing event {name}")
 
-        try:
-            with allow_external_makes():
-                result = handler(ctx.gateway, dispatch)
+        logger.debug(f"Processing event {name}")
+        handler, type_ = entry
+
+        tracer = self.tracer
+        if tracer is not None:
+            start = time.perf_counter()
+            # time spent in the state handler, excluding the events it fired if streamed
+            state_time = 0.0
 
-                if inspect.isawaitable(result):
-                    results = [await result]
-                elif inspect.isasyncgen(result):
-                    async with multio.asynclib.finalize_agen(result) as gen:
+        try:
+            if type_ is HandlerType.ASYNC_GENERATOR:
+                with allow_external_makes():
+                    result = handler(ctx.gateway, dispatch)
+
+                async with multio.asynclib.finalize_agen(result) as gen:
+                    if self.stream_dispatches:
+                        while True:
+                            if tracer is not None:
+                                item_start = time.perf_counter()
+
+                            with allow_external_makes():
+                                try:
+                                    item = await gen.__anext__()
+                                except StopAsyncIteration:
+                                    break
+                                finally:
+                                    if tracer is not None:
+                                        state_time += time.perf_counter() - item_start
+
+                            await self._fire_dispatch_result(ctx, item)
+
+                        if tracer is not None:
+                            tracer.record(TraceStage.STATE, name, state_time)
+                            tracer.record(TraceStage.DISPATCH, name, time.perf_counter() - start)
+
+                        return
+
+                    with allow_external_makes():
                         results = [r async for r in gen]
-                else:
-                    results = [result]
+
+            elif type_ is HandlerType.COROUTINE:
+                with allow_external_makes():
+                    results = [await handler(ctx.gateway, dispatch)]
+
+            else:
+                with allow_external_makes():
+                    results = [handler(ctx.gateway, dispatch)]
+
+            if tracer is not None:
+                tracer.record(TraceStage.STATE, name, time.perf_counter() - start)
 
             for item in results:
-                if not isinstance(item, tuple):
-                    await self.events.fire_event(item, gateway=ctx.gateway, client=self)
-                else:
-                    await self.events.fire_event(item[0], *item[1:], gateway=ctx.gateway,
-                                                 client=self)
+                await self._fire_dispatch_result(ctx, item)
+
+            if tracer is not None:
+                tracer.record(TraceStage.DISPATCH, name, time.perf_counter() - start)
 
         except Exception:
             logger.exception(f"Error decoding event {name} with data {dispatch}!")
             await self.kill()
             raise
 
+    async def _fire_dispatch_result(self, ctx: EventContext, item):
+        """
+        Fires an event produced by a state handler.
+        """
+        if not isinstance(item, tuple):
+            await self.events.fire_event(item, gateway=ctx.gateway, client=self)
+        else:
+            await self.events.fire_event(item[0], *item[1:], gateway=ctx.gateway, client=self)
+
     @ev_dec(name="ready")
     async def handle_ready(self, ctx: 'EventContext'):
         """
@@ -631,16 +839,93 @@ class Client(object):
         async with open_websocket(self._token, self._gw_url,
                                   shard_id=shard_id, shard_count=shard_count) as gw:
             self._gateways[shard_id] = gw
+            gw.tracer = self.tracer
 
             try:
-                async with multio.asynclib.finalize_agen(gw.events()) as agen:
-                    async for event in agen:
-                        await self.fire_event(event[0], *event[1:], gateway=gw)
+                if self.event_queue_factory is None and self.coalescer_factory is None:
+                    async with multio.asynclib.finalize_agen(gw.events()) as agen:
+                        async for event in agen:
+                            await self.fire_event(event[0], *event[1:], gateway=gw)
+                else:
+                    await self._handle_shard_staged(shard_id, gw)
             except Exception as e:  # kill the bot if we failed to parse something
                 await self.kill()
                 raise
             finally:
                 self._gateways.pop(shard_id, None)
+                self._event_queues.pop(shard_id, None)
+                self._coalescers.pop(shard_id, None)
+
+    async def _handle_shard_staged(self, shard_id: int, gw: GatewayHandler):
+        """
+        Handles the events of a shard through a :class:`.DispatchCoalescer` and/or an
+        :class:`.EventQueue`.
+        """
+        queue = coalescer = None
+        if self.event_queue_factory is not None:
+            queue = self.event_queue_factory()
+            self._event_queues[shard_id] = queue
+
+        if self.coalescer_factory is not None:
+            coalescer = self.coalescer_factory()
+            self._coalescers[shard_id] = coalescer
+
+        # the reader and the flusher take turns, so that dispatches released by one are never
+        # overtaken by ones released by the other
+        lock = multio.Lock()
+
+        async def dispatch(event):
+            if queue is not None:
+                await queue.put(event)
+            else:
+                await self.fire_event(event[0], *event[1:], gateway=gw)
+
+        async def worker():
+            while True:
+                event = await queue.get()
+                try:
+                    await self.fire_event(event[0], *event[1:], gateway=gw)
+                finally:
+                    await queue.done(event)
+
+        async def flusher():
+            while True:
+                await multio.asynclib.sleep(coalescer.window)
+                async with lock:
+                    for event in coalescer.drain():
+                        await dispatch(event)
+
+        async with multio.asynclib.task_manager() as tg:
+            if queue is not None:
+                for _ in range(queue.workers):
+                    await multio.asynclib.spawn(tg, worker)
+
+            if coalescer is not None:
+                await multio.asynclib.spawn(tg, flusher)
+
+            try:
+                async with multio.asynclib.finalize_agen(gw.events()) as agen:
+                    async for event in agen:
+                        # only dispatches are staged, everything else is needed to keep the
+                        # connection going
+                        if event[0] != "gateway_dispatch_received":
+                            await self.fire_event(event[0], *event[1:], gateway=gw)
+                            continue
+
+                        if coalescer is None:
+                            await dispatch(event)
+                            continue
+
+                        if coalescer.hold(event):
+                            continue
+
+                        async with lock:
+                            for held in coalescer.release(event):
+                                await dispatch(held)
+
+                            await dispatch(event)
+            finally:
+                await multio.asynclib.cancel_task_group(tg)
 
     async def start(self, shard_count: int):
         """
@@ -0,0 +1,187 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Coalescing of high-frequency gateway dispatches.
+
+.. currentmodule:: curious.core.coalescer
+"""
+import collections
+import typing
+
+
+def _member_key(data: dict):
+    return data.get("guild_id"), (data.get("user") or {}).get("id")
+
+
+def _typing_key(data: dict):
+    return data.get("channel_id"), data.get("user_id")
+
+
+#: A mapping of dispatch name -> callable that gets the key dispatches are coalesced by.
+COALESCE_KEYS = {
+    "PRESENCE_UPDATE": _member_key,
+    "GUILD_MEMBER_UPDATE": _member_key,
+    "TYPING_START": _typing_key,
+}
+
+#: The dispatches that are coalesced by default.
+DEFAULT_COALESCED = frozenset(COALESCE_KEYS)
+
+#: The dispatches that flush every held dispatch before they are processed, as they can change
+#: the meaning of the held ones.
+BARRIER_DISPATCHES = frozenset({
+    "READY", "RESUMED", "GUILD_CREATE", "GUILD_DELETE", "GUILD_MEMBER_ADD", "GUILD_MEMBER_REMOVE",
+    "GUILD_MEMBERS_CHUNK",
+})
+
+
+class DispatchCoalescer(object):
+    """
+    Holds high-frequency dispatches for a short window, merging dispatches of the same type for
+    the same member (or the same member and channel, for typing) into one.
+
+    Only one type of dispatch is held for a member at a time. A ``PRESENCE_UPDATE`` for a member
+    with a held ``GUILD_MEMBER_UPDATE``, or the other way around, is processed straight away,
+    after the held one, so the two are never applied out of order.
+
+    The state only processes the merged dispatch, so one event is fired with the state from
+    before the first dispatch and after the last one.
+
+    .. code-block:: python3
+
+        factory = functools.partial(DispatchCoalescer, window=0.5)
+        client = Client(token, coalescer_factory=factory)
+
+    .. warning::
+
+        Held dispatches are processed up to ``window`` seconds late, and after other dispatches
+        received in the meantime.
+    """
+
+    def __init__(self, window: float = 0.25,
+                 dispatches: typing.AbstractSet[str] = DEFAULT_COALESCED):
+        """
+        :param window: The number of seconds to hold dispatches for.
+        :param dispatches: The dispatch names to coalesce. Must be keys of \
+            :data:`.COALESCE_KEYS`.
+        """
+        if window <= 0:
+            raise ValueError("window must be positive")
+
+        unknown = set(dispatches) - set(COALESCE_KEYS)
+        if unknown:
+            raise ValueError(f"Cannot coalesce {', '.join(sorted(unknown))}")
+
+        #: The number of seconds dispatches are held for.
+        self.window = window
+
+        #: The dispatch names that are coalesced.
+        self.dispatches = frozenset(dispatches)
+
+        #: A counter of dispatch name -> number of dispatches merged into a held one.
+        self.coalesced = collections.Counter()
+
+        #: A counter of dispatch name -> number of dispatches held.
+        self.held = collections.Counter()
+
+        # (name, key) -> event, in the order they were first held
+        self._pending = collections.OrderedDict()
+        # (key function, key) -> name of the held dispatch, so dispatches of different types for
+        # the same member are kept in order
+        self._held_names = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __repr__(self) -> str:
+        return f"<DispatchCoalescer window={self.window} pending={len(self._pending)}>"
+
+    @staticmethod
+    def _merge(old: dict, new: dict) -> dict:
+        """
+        Merges a newer dispatch into an older one.
+        """
+        merged = {**old, **new}
+        if "user" in old and "user" in new:
+            # presence users are partial, and only contain the fields that changed
+            merged["user"] = {**old["user"], **new["user"]}
+
+        return merged
+
+    def hold(self, event: tuple) -> bool:
+        """
+        Holds an event if it can be coalesced.
+
+        :param event: The ``("gateway_dispatch_received", name, data)`` tuple.
+        :return: True if the event is being held, False if it should be processed now.
+        """
+        name = event[1]
+        if name not in self.dispatches:
+            return False
+
+        get_key = COALESCE_KEYS[name]
+        subject = (get_key, get_key(event[2]))
+        held_name = self._held_names.get(subject, name)
+        if held_name != name:
+            return False
+
+        key = (name, subject[1])
+        existing = self._pending.get(key)
+        if existing is None:
+            self._pending[key] = event
+            self._held_names[subject] = name
+            self.held[name] += 1
+        else:
+            self._pending[key] = (event[0], name, self._merge(existing[2], event[2]))
+            self.coalesced[name] += 1
+
+        return True
+
+    def release(self, event: tuple) -> typing.List[tuple]:
+        """
+        Removes the held dispatches that must be processed before an event that wasn't held.
+
+        :param event: The ``("gateway_dispatch_received", name, data)`` tuple.
+        :return: The held dispatches to process first, in the order they were first received.
+        """
+        if not self._pending:
+            return []
+
+        name = event[1]
+        if name in BARRIER_DISPATCHES:
+            return self.drain()
+
+        get_key = COALESCE_KEYS.get(name)
+        if get_key is None:
+            return []
+
+        subject = (get_key, get_key(event[2]))
+        held_name = self._held_names.pop(subject, None)
+        if held_name is None:
+            return []
+
+        return [self._pending.pop((held_name, subject[1]))]
+
+    def drain(self) -> typing.List[tuple]:
+        """
+        Removes every held dispatch.
+
+        :return: The held dispatches, in the order they were first received.
+        """
+        events = list(self._pending.values())
+        self._pending.clear()
+        self._held_names.clear()
+        return events
@@ -18,9 +18,11 @@ Special helpers for events.
 
 .. currentmodule: curious.core.events
 """
+import collections
 import functools
 import inspect
 import logging
+import time
 import typing
 
 import multio
@@ -29,10 +31,35 @@ from multidict import MultiDict
 
 from curious.core import client as md_client
 from curious.core.gateway import GatewayHandler
+from curious.core.tracing import EventTracer, TraceStage
 from curious.util import remove_from_multidict, safe_generator
 
 logger = logging.getLogger("curious.events")
 
+#: A mapping of event name -> callable that gets the key of an event from its arguments.
+#: These are the events that can be used with a keyed :meth:`.EventManager.wait_for`.
+EVENT_KEYS = {
+    # new messages are keyed by channel, as their ID is not known beforehand
+    "message_create": lambda message: message.channel_id,
+    "message_update": lambda old, new: new.id,
+    "message_edit": lambda old, new: new.id,
+    "message_delete": lambda message: message.id,
+    "message_reaction_add": lambda message, author, reaction: message.id,
+    "message_reaction_remove": lambda message, reaction: message.id,
+    "message_reaction_remove_all": lambda message, reactions: message.id,
+    "member_update": lambda old, new: new.id,
+    "guild_member_add": lambda member: member.id,
+    "guild_member_remove": lambda member: member.id,
+    "guild_member_update": lambda old, new: new.id,
+    "guild_update": lambda old, new: new.id,
+    "channel_create": lambda channel: channel.id,
+    "channel_update": lambda old, new: new.id,
+    "channel_delete": lambda channel: channel.id,
+    "role_create": lambda role: role.id,
+    "role_update": lambda old, new: new.id,
+    "role_delete": lambda role: role.id,
+}
+
 
 class ListenerExit(Exception):
     """
@@ -49,13 +76,13 @@ class ListenerExit(Exception):
 
 @asynccontextmanager
 @safe_generator
-async def _wait_for_manager(manager, name: str, predicate):
+async def _wait_for_manager(manager, name: str, predicate, key):
     """
     Helper class for managing a wait_for.
     """
     async with multio.asynclib.task_manager() as tg:
         try:
-            partial = functools.partial(manager.wait_for, name, predicate)
+            partial = functools.partial(manager.wait_for, name, predicate, key=key)
             await multio.asynclib.spawn(tg, partial)
             yield
         except:
@@ -80,8 +107,32 @@ class EventManager(object):
         #: A MultiDict of event listeners.
         self.event_listeners = MultiDict()
 
-        #: A MultiDict of temporary listeners.
-        self.temporary_listeners = MultiDict()
+        #: A mapping of event name -> {temporary listener: None}.
+        #: This is used as an ordered set, so listeners can be removed in constant time.
+        self.temporary_listeners = {}  # type: typing.Dict[str, typing.Dict[typing.Any, None]]
+
+        #: A mapping of (event name, key) -> {temporary listener: None}, for keyed listeners.
+        self.keyed_listeners = {}  # type: typing.Dict[tuple, typing.Dict[typing.Any, None]]
+
+        # event name -> number of keyed listeners, so unkeyed events skip the key lookup
+        self._keyed_counts = collections.Counter()
+
+        #: If the handlers for an event that aren't ran inline should share a single task.
+        #: If this is False, every handler is spawned in its own task.
+        #:
+        #: Batched handlers run one after another, so this should only be enabled if no handler
+        #: waits for long, e.g. on a command, a ``wait_for`` or a slow HTTP request. Temporary
+        #: listeners are always spawned in their own task.
+        self.batch_handlers = False
+
+        #: A counter of event name -> number of times the event was fired.
+        self.events_fired = collections.Counter()
+
+        #: A counter of event name -> number of tasks spawned to handle the event.
+        self.tasks_spawned = collections.Counter()
+
+        #: The :class:`.EventTracer` used to time handlers, if tracing is enabled.
+        self.tracer = None  # type: EventTracer
 
     # add or removal functions
     # Events
@@ -113,8 +164,21 @@ class EventManager(object):
         """
         self.event_listeners = remove_from_multidict(self.event_listeners, key=name, item=func)
 
+    def has_listeners(self, event_name: str) -> bool:
+        """
+        Checks if anything would be called if an event was fired.
+
+        :param event_name: The name of the event.
+        :return: True if there are any hooks, or any listeners or temporary listeners for this \
+            event.
+        """
+        return bool(self.event_hooks) \
+            or event_name in self.event_listeners \
+            or event_name in self.temporary_listeners \
+            or self._keyed_counts[event_name] > 0
+
     # listeners
-    def add_temporary_listener(self, name: str, listener):
+    def add_temporary_listener(self, name: str, listener, *, key=None):
         """
         Adds a new temporary listener.
 
@@ -123,17 +187,42 @@ class EventManager(object):
 
         :param name: The name of the event to listen to.
         :param listener: The listener function.
+        :param key: If provided, the listener is only called for events with this key. \
+            See :data:`.EVENT_KEYS`.
         """
-        self.temporary_listeners.add(name, listener)
+        if key is None:
+            self.temporary_listeners.setdefault(name, {})[listener] = None
+            return
+
+        if name not in EVENT_KEYS:
+            raise ValueError(f"Event {name} cannot be listened to with a key")
 
-    def remove_listener_early(self, name: str, listener):
+        self.keyed_listeners.setdefault((name, key), {})[listener] = None
+        self._keyed_counts[name] += 1
+
+    def remove_listener_early(self, name: str, listener, *, key=None):
         """
         Removes a temporary listener early.
 
         :param name: The name of the event the listener is registered under.
         :param listener: The listener function.
+        :param key: The key the listener was registered with, if any.
         """
-        self.event_listeners = remove_from_multidict(self.event_listeners, key=name, item=listener)
+        if key is None:
+            listeners = self.temporary_listeners.get(name)
+            if listeners is None or listeners.pop(listener, 1) is not None:
+                return
+
+            if not listeners:
+                del self.temporary_listeners[name]
+        else:
+            listeners = self.keyed_listeners.get((name, key))
+            if listeners is None or listeners.pop(listener, 1) is not None:
+                return
+
+            self._keyed_counts[name] -= 1
+            if not listeners:
+                del self.keyed_listeners[(name, key)]
 
     def add_event_hook(self, listener):
         """
@@ -150,6 +239,25 @@ class EventManager(object):
         """
         self.event_hooks.remove(listener)
 
+    def tasks_per_event(self, event_name: str = None) -> float:
+        """
+        Gets the average number of tasks spawned every time an event was fired.
+
+        :param event_name: The name of the event, or None for the average over all events.
+        :return: The average number of tasks spawned per event.
+        """
+        if event_name is None:
+            fired = sum(self.events_fired.values())
+            spawned = sum(self.tasks_spawned.values())
+        else:
+            fired = self.events_fired[event_name]
+            spawned = self.tasks_spawned[event_name]
+
+        if not fired:
+            return 0.0
+
+        return spawned / fired
+
     # wrapper functions
     async def _safety_wrapper(self, func, *args, **kwargs):
         """
@@ -158,9 +266,28 @@ class EventManager(object):
         try:
             await func(*args, **kwargs)
         except Exception as e:
-            logger.exception("Unhandled exception in {}!".format(func.__name__), exc_info=True)
+            name = getattr(func, "__name__", func)
+            logger.exception("Unhandled exception in {}!".format(name), exc_info=True)
 
-    async def _listener_wrapper(self, key: str, func, *args, **kwargs):
+    async def _run_handlers(self, event_name: str, handlers: list, ctx: 'EventContext',
+                            args: tuple, kwargs: dict):
+        """
+        Runs a list of (is temporary, handler, key) one after another, isolating their errors.
+        """
+        tracer = self.tracer
+        for (temporary, handler, key) in handlers:
+            if tracer is not None:
+                start = time.perf_counter()
+
+            if temporary:
+                await self._listener_wrapper(event_name, handler, ctx, *args, key=key, **kwargs)
+            else:
+                await self._safety_wrapper(handler, ctx, *args, **kwargs)
+
+            if tracer is not None:
+                tracer.record(TraceStage.HANDLER, event_name, time.perf_counter() - start)
+
+    async def _listener_wrapper(self, name: str, func, *args, key=None, **kwargs):
         """
         Wraps a listener, ensuring ListenerExit is handled properly.
         """
@@ -168,20 +295,40 @@ class EventManager(object):
             await func(*args, **kwargs)
         except ListenerExit:
             # remove the function
-            self.temporary_listeners = remove_from_multidict(self.temporary_listeners, key, func)
+            self.remove_listener_early(name, func, key=key)
         except Exception:
             logger.exception("Unhandled exception in listener {}!".format(func.__name__),
                              exc_info=True)
-            self.temporary_listeners = remove_from_multidict(self.temporary_listeners, key, func)
+            self.remove_listener_early(name, func, key=key)
+
+    def _get_event_key(self, event_name: str, args: tuple):
+        """
+        Gets the key of an event, for keyed listeners.
+        """
+        try:
+            return EVENT_KEYS[event_name](*args)
+        except Exception:
+            # e.g. an event fired by user code with different arguments
+            return None
 
-    async def wait_for(self, event_name: str, predicate=None):
+    async def wait_for(self, event_name: str, predicate=None, *, key=None):
         """
         Waits for an event.
 
         Returning a truthy value from the predicate will cause it to exit and return.
 
+        If a key is provided, the predicate is only checked for events with that key, which is
+        much faster when there are many waiters for the same event:
+
+        .. code-block:: python3
+
+            # only called for reactions on this message
+            await client.events.wait_for("message_reaction_add", predicate, key=message.id)
+
         :param event_name: The name of the event.
         :param predicate: The predicate to use to check for the event.
+        :param key: The key of the event to wait for. See :data:`.EVENT_KEYS` for the events \
+            that support keys, and what their key is.
         """
         p = multio.Promise()
         errored = False
@@ -214,8 +361,13 @@ class EventManager(object):
                     await p.set(args)
                     raise ListenerExit
 
-        self.add_temporary_listener(name=event_name, listener=listener)
-        output = await p.wait()
+        self.add_temporary_listener(name=event_name, listener=listener, key=key)
+        try:
+            output = await p.wait()
+        finally:
+            # if we got cancelled, the listener is still registered
+            self.remove_listener_early(event_name, listener, key=key)
+
         if errored:
             raise output
 
@@ -224,7 +376,8 @@ class EventManager(object):
             return output[0]
         return output
 
-    def wait_for_manager(self, event_name: str, predicate) -> 'typing.AsyncContextManager[None]':
+    def wait_for_manager(self, event_name: str, predicate, *,
+                         key=None) -> 'typing.AsyncContextManager[None]':
         """
         Returns a context manager that can be used to run some steps whilst waiting for a
         temporary listener.
@@ -235,8 +388,12 @@ class EventManager(object):
                 await member.nickname.set("Test")
 
         This probably won't be needed outside of internal library functions.
+
+        :param event_name: The name of the event.
+        :param predicate: The predicate to use to check for the event.
+        :param key: The key of the event to wait for. See :meth:`.EventManager.wait_for`.
         """
-        return _wait_for_manager(self, event_name, predicate)
+        return _wait_for_manager(self, event_name, predicate, key)
 
     async def spawn(self, cofunc, *args) -> typing.Any:
         """
@@ -270,28 +427,56 @@ class EventManager(object):
         # clobber event name
         ctx.event_name = event_name
 
+        self.events_fired[event_name] += 1
+
+        # split the handlers into the ones ran inline, and the ones ran in a task
         # always ensure hooks are ran first
+        inline = []
+        spawned = []
         for hook in self.event_hooks:
-            cofunc = functools.partial(hook, ctx, *args, **kwargs)
-            await self.spawn(cofunc)
+            (inline if getattr(hook, "inline", False) else spawned).append((False, hook, None))
+
+        for handler in self.event_listeners.getall(event_name, ()):
+            (inline if getattr(handler, "inline", False) else spawned) \
+                .append((False, handler, None))
+
+        # temporary listeners are never batched, so that a slow handler can't hold up the
+        # wait_for that it is waiting on
+        temporary = []
+        listeners = self.temporary_listeners.get(event_name)
+        if listeners:
+            temporary.extend((True, listener, None) for listener in listeners)
 
-        for handler in self.event_listeners.getall(event_name, []):
-            coro = functools.partial(handler, ctx, *args, **kwargs)
-            coro.__name__ = handler.__name__
-            await self.spawn(self._safety_wrapper, coro)
+        if self._keyed_counts[event_name] > 0:
+            key = self._get_event_key(event_name, args)
+            listeners = self.keyed_listeners.get((event_name, key))
+            if listeners:
+                temporary.extend((True, listener, key) for listener in listeners)
 
-        for listener in self.temporary_listeners.getall(event_name, []):
-            coro = functools.partial(self._listener_wrapper, event_name, listener, ctx,
-                                     *args, **kwargs)
-            await self.spawn(coro)
+        if inline:
+            await self._run_handlers(event_name, inline, ctx, args, kwargs)
 
+        if spawned and self.batch_handlers:
+            self.tasks_spawned[event_name] += 1
+            await self.spawn(self._run_handlers, event_name, spawned, ctx, args, kwargs)
+            spawned = []
 
-def event(name, scan: bool = True):
+        spawned.extend(temporary)
+        self.tasks_spawned[event_name] += len(spawned)
+        for handler in spawned:
+            await self.spawn(self._run_handlers, event_name, [handler], ctx, args, kwargs)
+
+
+def event(name, scan: bool = True, inline: bool = False):
     """
     Marks a function as an event.
 
     :param name: The name of the event.
     :param scan: Should this event be handled in scans too?
+    :param inline: Should this event be ran inline, rather than in a new task?
+
+        Inline handlers are awaited directly when the event is fired, so they must be fast and
+        must not wait on other events. Errors are still caught and logged.
     """
 
     def __innr(f):
@@ -301,6 +486,7 @@ def event(name, scan: bool = True):
         f.is_event = True
         f.events.add(name)
         f.scan = scan
+        f.inline = getattr(f, "inline", False) or inline
         return f
 
     return __innr
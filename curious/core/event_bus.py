@@ -0,0 +1,401 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A local event bus, for handling dispatches in processes other than the gateway process.
+
+The process that owns the gateway connections runs an :class:`.EventBusPublisher`, which
+publishes every dispatch it receives over a Unix socket. Worker processes connect to it with
+:func:`.open_event_bus`, and only receive the dispatches they subscribe to.
+
+Packets are framed like :class:`curious.ipc.packet.IPCPacket`: a little-endian header of the
+opcode, the body encoding and the body length, followed by the body. Bodies are encoded with
+msgpack if it is installed, or JSON otherwise.
+
+.. currentmodule:: curious.core.event_bus
+"""
+import enum
+import functools
+import json
+import logging
+import os
+import socket
+import struct
+import typing
+
+import multio
+from async_generator import asynccontextmanager
+
+from curious.core import client as md_client
+from curious.core.event import EventContext, event as ev_dec
+from curious.core.event_queue import EventQueue, OverflowPolicy
+from curious.util import safe_generator
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger("curious.event_bus")
+
+# the errors raised by a packet that can't be decoded
+_PROTOCOL_ERRORS = (ValueError, TypeError, struct.error, RuntimeError)
+if msgpack is not None:
+    _PROTOCOL_ERRORS += (msgpack.UnpackException,)
+
+#: The header of every packet: opcode, encoding, body length.
+HEADER = struct.Struct("<HHI")
+
+
+class BusOpcode(enum.IntEnum):
+    """
+    Represents an event bus opcode.
+    """
+    #: Sent by a subscriber when it connects. The body is a list of dispatch names, or None for
+    #: every dispatch.
+    SUBSCRIBE = 0
+
+    #: Sent by the publisher for every dispatch. The body is ``[shard_id, name, data]``.
+    DISPATCH = 1
+
+
+class BusEncoding(enum.IntEnum):
+    """
+    Represents the encoding of a packet body.
+    """
+    JSON = 0
+    MSGPACK = 1
+
+
+#: The encoding used by default.
+DEFAULT_ENCODING = BusEncoding.MSGPACK if msgpack is not None else BusEncoding.JSON
+
+
+def encode_packet(opcode: BusOpcode, body, encoding: BusEncoding = DEFAULT_ENCODING) -> bytes:
+    """
+    Encodes a packet.
+
+    :param opcode: The :class:`.BusOpcode` of the packet.
+    :param body: The body of the packet.
+    :param encoding: The :class:`.BusEncoding` to encode the body with.
+    :return: The encoded packet.
+    """
+    if encoding is BusEncoding.MSGPACK:
+        data = msgpack.packb(body, use_bin_type=True)
+    else:
+        data = json.dumps(body, separators=(',', ':')).encode("utf-8")
+
+    return HEADER.pack(opcode, encoding, len(data)) + data
+
+
+def decode_body(encoding: BusEncoding, data: bytes):
+    """
+    Decodes the body of a packet.
+
+    :param encoding: The :class:`.BusEncoding` of the body.
+    :param data: The body.
+    :return: The decoded body.
+    """
+    if encoding == BusEncoding.MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("Received a msgpack packet, but msgpack is not installed")
+
+        return msgpack.unpackb(data, raw=False)
+
+    return json.loads(data.decode("utf-8"))
+
+
+async def _sendall(sock: socket.socket, data: bytes):
+    """
+    Sends all of the data on a non-blocking socket.
+    """
+    view = memoryview(data)
+    while view:
+        try:
+            sent = sock.send(view)
+        except BlockingIOError:
+            await multio.asynclib.wait_write(sock)
+        else:
+            view = view[sent:]
+
+
+async def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """
+    Receives exactly ``size`` bytes from a non-blocking socket.
+    """
+    buf = bytearray()
+    while len(buf) < size:
+        try:
+            chunk = sock.recv(size - len(buf))
+        except BlockingIOError:
+            await multio.asynclib.wait_read(sock)
+            continue
+
+        if not chunk:
+            raise ConnectionResetError("Event bus connection closed")
+
+        buf.extend(chunk)
+
+    return bytes(buf)
+
+
+async def read_packet(sock: socket.socket) \
+        -> typing.Tuple[BusOpcode, BusEncoding, typing.Any]:
+    """
+    Reads a packet off of a socket.
+
+    :param sock: The non-blocking socket to read from.
+    :return: A tuple of (:class:`.BusOpcode`, :class:`.BusEncoding`, decoded body).
+    """
+    opcode, encoding, length = HEADER.unpack(await _recv_exactly(sock, HEADER.size))
+    encoding = BusEncoding(encoding)
+    body = await _recv_exactly(sock, length)
+    return BusOpcode(opcode), encoding, decode_body(encoding, body)
+
+
+class _Subscription(object):
+    """
+    A worker connected to a publisher.
+    """
+
+    def __init__(self, sock: socket.socket, dispatches, encoding: BusEncoding,
+                 queue: EventQueue):
+        self.sock = sock
+        self.dispatches = dispatches
+        self.encoding = encoding
+        self.queue = queue
+
+        # set when the worker fell too far behind, and is being disconnected
+        self.lagging = False
+
+    def wants(self, name: str) -> bool:
+        return self.dispatches is None or name in self.dispatches
+
+
+class EventBusPublisher(object):
+    """
+    Publishes the dispatches received by a :class:`.Client` to worker processes over a Unix
+    socket.
+
+    .. code-block:: python3
+
+        publisher = EventBusPublisher("/run/mybot/events.sock")
+        publisher.attach(client)
+
+        async with multio.asynclib.task_manager() as tg:
+            await multio.asynclib.spawn(tg, publisher.serve)
+            await client.run_async()
+
+    Every worker has its own :class:`.EventQueue`, so a slow worker does not hold up the others.
+    Publishing never waits for a worker: when its queue is full, low priority dispatches are
+    dropped, and if any other dispatch would be dropped the worker is disconnected instead, as
+    its view of the state would no longer be complete. It can then reconnect and resync.
+    """
+
+    def __init__(self, path: str, *,
+                 queue_factory: 'typing.Callable[[], EventQueue]' = None):
+        """
+        :param path: The path of the Unix socket to listen on.
+        :param queue_factory: A callable that makes the :class:`.EventQueue` for each worker.
+        """
+        if queue_factory is None:
+            queue_factory = functools.partial(EventQueue, maxsize=10000,
+                                              overflow=OverflowPolicy.DROP_LOW_PRIORITY)
+
+        #: The path of the Unix socket.
+        self.path = path
+
+        #: The callable used to make the :class:`.EventQueue` for each worker.
+        self.queue_factory = queue_factory
+
+        #: The list of connected workers.
+        self.subscriptions = []  # type: typing.List[_Subscription]
+
+        #: The number of dispatches published.
+        self.published = 0
+
+        #: The number of workers disconnected for falling behind.
+        self.lagged = 0
+
+    def attach(self, client: 'md_client.Client'):
+        """
+        Publishes the dispatches of a client.
+
+        The client still processes every dispatch itself; use :meth:`.Client.add_raw_subscriber`
+        with :meth:`.EventBusPublisher.publish` to skip the state for dispatches that are only
+        handled by workers.
+
+        :param client: The :class:`.Client` to publish the dispatches of.
+        """
+        client.events.add_event(self.handle_dispatch)
+
+    # inline, so dispatches are published in order
+    @ev_dec(name="gateway_dispatch_received", scan=False, inline=True)
+    async def handle_dispatch(self, ctx: EventContext, name: str, data: dict):
+        """
+        Publishes a dispatch received by a client.
+        """
+        await self.publish(ctx.shard_id, name, data)
+
+    async def publish(self, shard_id: int, name: str, data: dict):
+        """
+        Publishes a dispatch to every worker subscribed to it.
+
+        :param shard_id: The shard ID the dispatch was received on.
+        :param name: The name of the dispatch.
+        :param data: The decoded data of the dispatch.
+        """
+        self.published += 1
+        event = ("gateway_dispatch_received", name, data, shard_id)
+        for subscription in self.subscriptions.copy():
+            if not subscription.wants(name):
+                continue
+
+            # this runs inline in the gateway reader, so it must never wait on a worker
+            if await subscription.queue.try_put(event) \
+                    or name in subscription.queue.low_priority:
+                continue
+
+            logger.warning(f"Worker fell behind and missed {name}, disconnecting it")
+            subscription.lagging = True
+            self.lagged += 1
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    async def serve(self):
+        """
+        Listens for workers, forever.
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.setblocking(False)
+        server.bind(self.path)
+        server.listen()
+        logger.info(f"Publishing events on {self.path}")
+
+        try:
+            async with multio.asynclib.task_manager() as tg:
+                while True:
+                    try:
+                        sock, _ = server.accept()
+                    except BlockingIOError:
+                        await multio.asynclib.wait_read(server)
+                        continue
+
+                    sock.setblocking(False)
+                    await multio.asynclib.spawn(tg, self._handle_worker, sock)
+        finally:
+            server.close()
+            os.unlink(self.path)
+
+    async def _handle_worker(self, sock: socket.socket):
+        """
+        Sends dispatches to a worker until it disconnects.
+        """
+        subscription = None
+        try:
+            # a bad packet only disconnects this worker, not the publisher
+            try:
+                # dispatches are sent in the same encoding as the SUBSCRIBE packet
+                opcode, encoding, dispatches = await read_packet(sock)
+                if opcode != BusOpcode.SUBSCRIBE:
+                    logger.warning(f"Expected SUBSCRIBE from worker, got {opcode!r}")
+                    return
+
+                if dispatches is not None:
+                    dispatches = frozenset(dispatches)
+            except _PROTOCOL_ERRORS as e:
+                logger.warning(f"Received a bad packet from worker, disconnecting it: {e!r}")
+                return
+
+            subscription = _Subscription(sock, dispatches, encoding, self.queue_factory())
+            self.subscriptions.append(subscription)
+            logger.info(f"Worker subscribed to {dispatches or 'every dispatch'}")
+
+            while not subscription.lagging:
+                _, name, data, shard_id = await subscription.queue.get()
+                packet = encode_packet(BusOpcode.DISPATCH, [shard_id, name, data],
+                                       subscription.encoding)
+                await _sendall(sock, packet)
+        except (ConnectionError, OSError):
+            logger.info("Worker disconnected")
+        finally:
+            if subscription is not None and not subscription.lagging:
+                self.subscriptions.remove(subscription)
+
+            sock.close()
+
+
+class EventBusSubscriber(object):
+    """
+    Receives dispatches from an :class:`.EventBusPublisher`.
+
+    You don't want to create this class directly; use :func:`.open_event_bus` instead.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+
+    async def dispatches(self) -> 'typing.AsyncGenerator[typing.Tuple[int, str, dict], None]':
+        """
+        Receives dispatches, forever.
+
+        :return: An async generator of ``(shard_id, name, data)`` tuples.
+        """
+        while True:
+            opcode, _, body = await read_packet(self._sock)
+            if opcode != BusOpcode.DISPATCH:
+                continue
+
+            shard_id, name, data = body
+            yield shard_id, name, data
+
+
+@asynccontextmanager
+@safe_generator
+async def open_event_bus(path: str, dispatches: typing.Iterable[str] = None, *,
+                         encoding: BusEncoding = DEFAULT_ENCODING) \
+        -> 'typing.AsyncContextManager[EventBusSubscriber]':
+    """
+    Connects to an :class:`.EventBusPublisher`.
+
+    .. code-block:: python3
+
+        async with open_event_bus("/run/mybot/events.sock", ["MESSAGE_CREATE"]) as bus:
+            async for shard_id, name, data in bus.dispatches():
+                ...
+
+    :param path: The path of the publisher's Unix socket.
+    :param dispatches: The names of the dispatches to receive, or None for every dispatch.
+    :param encoding: The :class:`.BusEncoding` the publisher should use.
+    :return: An async context manager that yields an :class:`.EventBusSubscriber`.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.setblocking(False)
+        try:
+            sock.connect(path)
+        except BlockingIOError:
+            await multio.asynclib.wait_write(sock)
+
+        if dispatches is not None:
+            dispatches = list(dispatches)
+
+        await _sendall(sock, encode_packet(BusOpcode.SUBSCRIBE, dispatches, encoding))
+        yield EventBusSubscriber(sock)
+    finally:
+        sock.close()
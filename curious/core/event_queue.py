@@ -0,0 +1,328 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A bounded queue of gateway dispatches, for applying backpressure to a shard.
+
+.. currentmodule:: curious.core.event_queue
+"""
+import collections
+import enum
+import typing
+
+import multio
+
+#: The dispatches that are dropped by :attr:`.OverflowPolicy.DROP_LOW_PRIORITY` by default.
+DEFAULT_LOW_PRIORITY = frozenset({"PRESENCE_UPDATE", "TYPING_START"})
+
+# the order key of dispatches that aren't for a guild
+_GLOBAL = object()
+
+# dispatches that change a member, which newer presence updates must not be moved in front of
+_MEMBER_DISPATCHES = frozenset({"GUILD_MEMBER_ADD", "GUILD_MEMBER_UPDATE", "GUILD_MEMBER_REMOVE"})
+
+
+class OverflowPolicy(enum.Enum):
+    """
+    Represents what an :class:`.EventQueue` does when it is full.
+    """
+    #: Block the shard from reading any more events until there is space in the queue.
+    BLOCK = 0
+
+    #: Drop low priority dispatches, and block for everything else.
+    DROP_LOW_PRIORITY = 1
+
+
+class EventQueue(object):
+    """
+    A bounded queue of dispatches for a single shard, processed by a pool of workers.
+
+    The shard puts every ``gateway_dispatch_received`` event into the queue instead of processing
+    it immediately; other gateway events are still processed immediately. Once the queue is full,
+    the :class:`.OverflowPolicy` decides if the shard waits for space or drops the dispatch.
+
+    Queued ``PRESENCE_UPDATE`` dispatches for the same member can be coalesced, so only the newest
+    one is processed. A presence update is never coalesced into one queued before a member
+    update for the same member, so the two are processed in order.
+
+    .. code-block:: python3
+
+        factory = functools.partial(EventQueue, maxsize=500, workers=2,
+                                    overflow=OverflowPolicy.DROP_LOW_PRIORITY)
+        client = Client(token, event_queue_factory=factory)
+
+    With more than one worker, dispatches for different guilds are processed concurrently, but
+    dispatches for the same guild are still processed in order, so that the cache stays
+    consistent. Dispatches that aren't for a guild (such as ``READY``) wait for every dispatch
+    before them to finish, and hold up every dispatch after them. Workers must call
+    :meth:`.EventQueue.done` once they have processed a dispatch.
+    """
+
+    def __init__(self, maxsize: int = 1000, workers: int = 1,
+                 overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+                 low_priority: typing.AbstractSet[str] = DEFAULT_LOW_PRIORITY,
+                 coalesce_presences: bool = True):
+        """
+        :param maxsize: The maximum number of dispatches to hold.
+        :param workers: The number of workers that process dispatches from this queue.
+        :param overflow: The :class:`.OverflowPolicy` to use when the queue is full.
+        :param low_priority: The dispatch names that may be dropped when the queue is full.
+        :param coalesce_presences: If queued ``PRESENCE_UPDATE`` dispatches for the same member \
+            should be replaced by newer ones.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        if workers < 1:
+            raise ValueError("There must be at least one worker")
+
+        #: The maximum number of dispatches this queue holds.
+        self.maxsize = maxsize
+
+        #: The number of workers processing this queue.
+        self.workers = workers
+
+        #: The :class:`.OverflowPolicy` for this queue.
+        self.overflow = overflow
+
+        #: The dispatch names that may be dropped when the queue is full.
+        self.low_priority = frozenset(low_priority)
+
+        #: If queued presence updates are coalesced.
+        self.coalesce_presences = coalesce_presences
+
+        #: A counter of dispatch name -> number of dispatches dropped.
+        self.dropped = collections.Counter()
+
+        #: A counter of dispatch name -> number of dispatches replaced by a newer one.
+        self.coalesced = collections.Counter()
+
+        #: The highest depth this queue has reached.
+        self.max_depth = 0
+
+        #: The number of times the shard had to wait for space in this queue.
+        self.blocked = 0
+
+        # deque of [event, coalesce key]
+        self._items = collections.deque()
+        # coalesce key -> entry, for queued presence updates
+        self._presences = {}
+
+        self._not_empty = multio.Event()
+        self._not_full = multio.Event()
+
+        # guild ID (or _GLOBAL) -> number of dispatches being processed, with more than one worker
+        self._in_flight = collections.Counter()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return f"<EventQueue depth={self.depth} maxsize={self.maxsize} workers={self.workers}>"
+
+    @property
+    def depth(self) -> int:
+        """
+        :return: The number of dispatches currently queued.
+        """
+        return len(self._items)
+
+    @staticmethod
+    def _coalesce_key(event: tuple):
+        """
+        Gets the key used to coalesce a presence update.
+        """
+        data = event[2]
+        user = data.get("user") or {}
+        return data.get("guild_id"), user.get("id")
+
+    @staticmethod
+    def _order_key(event: tuple):
+        """
+        Gets the key of the dispatches that must be processed in order with this one.
+        """
+        name, data = event[1], event[2]
+        if not isinstance(data, dict):
+            return _GLOBAL
+
+        if name in ("GUILD_CREATE", "GUILD_UPDATE", "GUILD_DELETE"):
+            key = data.get("id")
+        else:
+            key = data.get("guild_id")
+
+        return _GLOBAL if key is None else key
+
+    async def put(self, event: tuple) -> bool:
+        """
+        Puts an event into the queue, waiting for space if needed.
+
+        :param event: The ``("gateway_dispatch_received", name, data)`` tuple to queue.
+        :return: True if the event was queued or coalesced, False if it was dropped.
+        """
+        name = event[1]
+        key = self._coalesce(event)
+        if key is True:
+            return True
+
+        while len(self._items) >= self.maxsize:
+            if self.overflow is OverflowPolicy.DROP_LOW_PRIORITY and name in self.low_priority:
+                self.dropped[name] += 1
+                return False
+
+            self.blocked += 1
+            if self._not_full.is_set():
+                self._not_full = multio.Event()
+
+            await self._not_full.wait()
+
+        await self._append(event, key)
+        return True
+
+    async def try_put(self, event: tuple) -> bool:
+        """
+        Puts an event into the queue if there is space, without waiting.
+
+        Unlike :meth:`.EventQueue.put`, this drops any dispatch when the queue is full, not only
+        low priority ones.
+
+        :param event: The event tuple to queue.
+        :return: True if the event was queued or coalesced, False if it was dropped.
+        """
+        key = self._coalesce(event)
+        if key is True:
+            return True
+
+        if len(self._items) >= self.maxsize:
+            self.dropped[event[1]] += 1
+            return False
+
+        await self._append(event, key)
+        return True
+
+    def _coalesce(self, event: tuple):
+        """
+        Replaces a queued presence update with a newer one.
+
+        :return: True if the event was coalesced, otherwise the coalesce key of the event.
+        """
+        name = event[1]
+        if not self.coalesce_presences:
+            return None
+
+        if name in _MEMBER_DISPATCHES:
+            # presence updates after this one are queued after it
+            self._presences.pop(self._coalesce_key(event), None)
+            return None
+
+        if name != "PRESENCE_UPDATE":
+            return None
+
+        key = self._coalesce_key(event)
+        entry = self._presences.get(key)
+        if entry is not None:
+            # replace the queued update, so only the newest one is processed
+            entry[0] = event
+            self.coalesced[name] += 1
+            return True
+
+        return key
+
+    async def _append(self, event: tuple, key):
+        entry = [event, key]
+        self._items.append(entry)
+        if key is not None:
+            self._presences[key] = entry
+
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+
+        await self._not_empty.set()
+
+    async def get(self) -> tuple:
+        """
+        Gets the next event from the queue, waiting for one if needed.
+
+        :return: The next event tuple.
+        """
+        while True:
+            if self.workers == 1:
+                index = 0 if self._items else None
+            else:
+                index = self._next_ready()
+
+            if index is not None:
+                break
+
+            if self._not_empty.is_set():
+                self._not_empty = multio.Event()
+
+            await self._not_empty.wait()
+
+        if index == 0:
+            entry = self._items.popleft()
+        else:
+            entry = self._items[index]
+            del self._items[index]
+
+        event, key = entry
+        # a newer presence update might be queued for the same member
+        if key is not None and self._presences.get(key) is entry:
+            del self._presences[key]
+
+        if self.workers > 1:
+            self._in_flight[self._order_key(event)] += 1
+
+        await self._not_full.set()
+        return event
+
+    def _next_ready(self) -> typing.Optional[int]:
+        """
+        Finds the first queued dispatch that can be processed without overtaking an earlier
+        dispatch for the same guild.
+        """
+        in_flight = self._in_flight
+        if in_flight[_GLOBAL]:
+            return None
+
+        blocked = set(key for key, count in in_flight.items() if count)
+        for index, (event, _) in enumerate(self._items):
+            key = self._order_key(event)
+            if key is _GLOBAL:
+                # a global dispatch waits for everything before it, and holds up everything after
+                return index if index == 0 and not blocked else None
+
+            if key not in blocked:
+                return index
+
+            blocked.add(key)
+
+        return None
+
+    async def done(self, event: tuple):
+        """
+        Marks a dispatch from :meth:`.EventQueue.get` as processed, letting the dispatches queued
+        after it for the same guild be processed.
+
+        :param event: The event tuple that was processed.
+        """
+        if self.workers == 1:
+            return
+
+        key = self._order_key(event)
+        self._in_flight[key] -= 1
+        if self._in_flight[key] <= 0:
+            del self._in_flight[key]
+
+        await self._not_empty.set()
@@ -34,6 +34,7 @@ from lomond.events import Binary, Closed, Connected, Connecting, Text
 from typing import Any, AsyncContextManager, AsyncGenerator, List, Union
 
 from curious.core._ws_wrapper import BasicWebsocketWrapper
+from curious.core.tracing import EventTracer, TraceStage
 from curious.util import safe_generator
 
 
@@ -139,6 +140,9 @@ class GatewayHandler(object):
         self._stop_heartbeating = multio.Event()
         self._dispatches_handled = Counter()
 
+        #: The :class:`.EventTracer` used to trace payload decoding, if tracing is enabled.
+        self.tracer = None  # type: EventTracer
+
         # used for zlib-streaming
         self._databuffer = bytearray()
         self._decompressor = zlib.decompressobj()
@@ -381,10 +385,24 @@ class GatewayHandler(object):
         self.heartbeat_stats.heartbeats = 0
         self.heartbeat_stats.heartbeat_acks = 0
 
+    @staticmethod
+    def _opcode_name(opcode: int) -> str:
+        """
+        Gets the name of an opcode, for tracing.
+        """
+        try:
+            return GatewayOp(opcode).name
+        except ValueError:
+            return str(opcode)
+
     async def handle_data_event(self, evt: Union[Text, Binary]):
         """
         Handles a data event.
         """
+        tracer = self.tracer
+        if tracer is not None:
+            start = time.perf_counter()
+
         if evt.name == "binary":
             self._databuffer.extend(evt.data)
             if not evt.data.endswith(self.ZLIB_FLUSH_SUFFIX):
@@ -399,11 +417,22 @@ class GatewayHandler(object):
         if not data:
             return
 
+        if tracer is not None:
+            decompressed = time.perf_counter()
+
         decoded = json.loads(data)
         opcode = decoded.get('op')
         sequence = decoded.get('s')
         event_data = decoded.get('d', {})
 
+        if tracer is not None:
+            decoded_at = time.perf_counter()
+            name = decoded.get('t') or self._opcode_name(opcode)
+            if evt.name == "binary":
+                tracer.record(TraceStage.DECOMPRESS, name, decompressed - start)
+
+            tracer.record(TraceStage.DECODE, name, decoded_at - decompressed)
+
         # update sequence number for dispatches
         if sequence is not None:
             self.gw_state.sequence = sequence
@@ -21,13 +21,18 @@ Defines :class:`.State`.
 
 import collections
 import copy
+import enum
+import inspect
 import logging
 import multio
+import time
 import typing
+from array import array
 from types import MappingProxyType
-from typing import Dict
+from typing import Dict, Set
 
 from curious.core import gateway
+from curious.core.cache_policy import CachePolicy
 from curious.dataclasses.channel import Channel, ChannelType
 from curious.dataclasses.embed import Embed
 from curious.dataclasses.emoji import Emoji
@@ -42,6 +47,7 @@ from curious.dataclasses.role import Role
 from curious.dataclasses.user import BotUser, User
 from curious.dataclasses.voice_state import VoiceState
 from curious.dataclasses.webhook import Webhook
+from curious.util import intern_or_none
 
 UserType = typing.TypeVar("UserType", bound=User)
 logger = logging.getLogger("curious.state")
@@ -57,6 +63,20 @@ def int_or_none(val, default: typing.Any) -> typing.Union[int, None]:
     return int(val)
 
 
+class HandlerType(enum.IntEnum):
+    """
+    Represents the type of a dispatch handler on the :class:`.State`.
+    """
+    #: The handler is an async generator, yielding events.
+    ASYNC_GENERATOR = 0
+
+    #: The handler is a coroutine function, returning a single event.
+    COROUTINE = 1
+
+    #: The handler is a regular function, returning a single event.
+    FUNCTION = 2
+
+
 class State(object):
     """
     This represents the state of the Client - in other libraries, the cache.
@@ -81,15 +101,100 @@ class State(object):
         #: The current user cache.
         self._users = {}
 
+        #: A mapping of emoji_id -> :class:`.Emoji` for every guild the bot can see.
+        self._emojis = {}  # type: Dict[int, Emoji]
+
+        #: If new guilds should keep a :class:`.ColumnarMemberStore` of their members.
+        self.columnar_members = False
+
+        #: The :class:`.CachePolicy` that controls what this state caches.
+        self.cache_policy = CachePolicy()
+
+        #: A mapping of guild_id -> {member_id: last seen}, ordered by last seen.
+        #: Only used if the cache policy has a member TTL.
+        self._members_seen = collections.defaultdict(collections.OrderedDict)
+
         #: The deque of messages.
         #: This is bounded to prevent the message cache from growing infinitely.
         self.messages = collections.deque(maxlen=max_messages)
 
+        #: A mapping of shard_id -> set of guild IDs on that shard.
+        self._shard_guilds = collections.defaultdict(set)  # type: Dict[int, Set[int]]
+
+        #: A mapping of shard_id -> set of guild IDs on that shard that are unavailable.
+        self._shard_unavailable = collections.defaultdict(set)  # type: Dict[int, Set[int]]
+
+        #: A mapping of shard_id -> set of large guild IDs on that shard that are not chunked yet.
+        self._shard_unchunked = collections.defaultdict(set)  # type: Dict[int, Set[int]]
+
+        #: A mapping of guild_id -> the shard ID the guild is indexed under.
+        self._guild_shards = {}  # type: Dict[int, int]
+
+        #: A mapping of dispatch name -> (handler, :class:`.HandlerType`).
+        #: This is built once, so dispatching doesn't need to look up and inspect the handler.
+        self._dispatch_table = self._build_dispatch_table()
+
         self.__shards_is_ready = collections.defaultdict(lambda: False)
         self.__voice_state_crap = collections.defaultdict(
             lambda *args, **kwargs: ((multio.Event(), multio.Event()), {})
         )
 
+    def _build_dispatch_table(self) \
+            -> 'Dict[str, typing.Tuple[typing.Callable, HandlerType]]':
+        """
+        Builds the dispatch table from the ``handle_`` methods of this state.
+        """
+        table = {}
+        for name in dir(type(self)):
+            if not name.startswith("handle_"):
+                continue
+
+            handler = getattr(self, name)
+            table[name[len("handle_"):].upper()] = (handler, self._classify_handler(handler))
+
+        return table
+
+    @staticmethod
+    def _classify_handler(handler) -> HandlerType:
+        """
+        Gets the :class:`.HandlerType` of a dispatch handler.
+        """
+        if inspect.isasyncgenfunction(handler):
+            return HandlerType.ASYNC_GENERATOR
+
+        if inspect.iscoroutinefunction(handler):
+            return HandlerType.COROUTINE
+
+        return HandlerType.FUNCTION
+
+    def get_dispatch_handler(self, name: str) \
+            -> 'typing.Union[typing.Tuple[typing.Callable, HandlerType], None]':
+        """
+        Gets the handler for a dispatch.
+
+        :param name: The name of the dispatch, e.g. ``MESSAGE_CREATE``.
+        :return: A tuple of (handler, :class:`.HandlerType`), or None if there is no handler for \
+            this dispatch.
+        """
+        try:
+            return self._dispatch_table[name]
+        except KeyError:
+            # unusual casing, or a handler added after construction
+            handler = getattr(self, f"handle_{name.lower()}", None)
+            if handler is None:
+                return None
+
+            entry = self._dispatch_table[name] = (handler, self._classify_handler(handler))
+            return entry
+
+    def _is_listening(self, *event_names: str) -> bool:
+        """
+        Checks if anything listens to any of the specified events, so the "old" copies of
+        objects only need to be made if they are going to be used.
+        """
+        events = self.client.events
+        return any(events.has_listeners(name) for name in event_names)
+
     def is_ready(self, shard_id: int) -> bool:
         """
         Checks if a shard is ready.
@@ -107,6 +212,88 @@ class State(object):
 
         for guild in self.guilds_for_shard(shard_id):
             guild._finished_chunking.clear()
+            self._index_guild(guild)
+
+    def _index_guild(self, guild: Guild):
+        """
+        Updates the per-shard indexes for a guild.
+
+        This needs to be called whenever the shard, availability, or chunking state of a guild
+        changes.
+        """
+        shard_id = guild.shard_id
+        if shard_id is None:
+            return
+
+        # the guild moved shards, so drop it from the old shard's indexes first
+        old_shard_id = self._guild_shards.get(guild.id)
+        if old_shard_id is not None and old_shard_id != shard_id:
+            self._unindex_guild(guild)
+
+        self._guild_shards[guild.id] = shard_id
+        self._shard_guilds[shard_id].add(guild.id)
+
+        if guild.unavailable is True:
+            self._shard_unavailable[shard_id].add(guild.id)
+        else:
+            self._shard_unavailable[shard_id].discard(guild.id)
+
+        if guild.large and self.cache_policy.offline_members \
+                and not guild._finished_chunking.is_set():
+            self._shard_unchunked[shard_id].add(guild.id)
+        else:
+            self._shard_unchunked[shard_id].discard(guild.id)
+
+    def _unindex_guild(self, guild: Guild):
+        """
+        Removes a guild from the per-shard indexes.
+        """
+        # use the shard it was indexed under, in case guild.shard_id has changed since
+        shard_id = self._guild_shards.pop(guild.id, guild.shard_id)
+        for index in (self._shard_guilds, self._shard_unavailable, self._shard_unchunked):
+            guilds = index.get(shard_id)
+            if guilds is not None:
+                guilds.discard(guild.id)
+
+    def _touch_member(self, guild: Guild, member_id: int):
+        """
+        Marks a member as seen, and drops any members that haven't been seen within the member
+        TTL of the cache policy.
+        """
+        ttl = self.cache_policy.member_ttl
+        if ttl is None:
+            return
+
+        seen = self._members_seen[guild.id]
+        now = time.monotonic()
+        seen[member_id] = now
+        seen.move_to_end(member_id)
+
+        # the oldest members are always at the front, so stop at the first one still alive
+        cutoff = now - ttl
+        while True:
+            oldest_id, last_seen = next(iter(seen.items()))
+            if last_seen >= cutoff:
+                break
+
+            if self._user is not None and oldest_id == self._user.id:
+                # never drop ourselves, we need our own member for permissions
+                seen[oldest_id] = now
+                seen.move_to_end(oldest_id)
+                continue
+
+            self._drop_member(guild, oldest_id)
+
+    def _drop_member(self, guild: Guild, member_id: int):
+        """
+        Drops a member from the cache of a guild.
+        """
+        guild._members.pop(member_id, None)
+        guild._untrack_member(member_id)
+
+        seen = self._members_seen.get(guild.id)
+        if seen is not None:
+            seen.pop(member_id, None)
 
     @property
     def guilds(self) -> typing.Mapping[int, Guild]:
@@ -128,18 +315,31 @@ class State(object):
 
         :param shard_id: The shard ID to check.
         """
-        if any(guild.unavailable is True for guild in self.guilds.values()):
+        if self.unavailable_guild_count(shard_id):
             return False
 
-        return all(guild._finished_chunking.is_set()
-                   for guild in self.guilds.values()
-                   if guild.shard_id == shard_id and guild.unavailable is False)
+        return not self.unchunked_guild_count(shard_id)
+
+    def unavailable_guild_count(self, shard_id: int) -> int:
+        """
+        :param shard_id: The shard ID to check.
+        :return: The number of unavailable guilds on the specified shard.
+        """
+        return len(self._shard_unavailable.get(shard_id, ()))
+
+    def unchunked_guild_count(self, shard_id: int) -> int:
+        """
+        :param shard_id: The shard ID to check.
+        :return: The number of large guilds on the specified shard that are not chunked yet.
+        """
+        return len(self._shard_unchunked.get(shard_id, ()))
 
     def guilds_for_shard(self, shard_id: int):
         """
         Gets all the guilds for a particular shard.
         """
-        return [guild for guild in self.guilds.values() if guild.shard_id == shard_id]
+        return [self._guilds[guild_id] for guild_id in self._shard_guilds.get(shard_id, ())
+                if guild_id in self._guilds]
 
     # get_all_* methods
     def get_all_channels(self) -> typing.Generator[Channel, None, None]:
@@ -361,14 +561,27 @@ class State(object):
             if event_data.get("webhook_id") is not None:
                 message.author = self.make_webhook(event_data)
             else:
-                message.author = message.guild.members.get(author_id)
+                guild = message.guild
+                message.author = guild.members.get(author_id)
+                if message.author is None and not self.cache_policy.caches_all_members \
+                        and "member" in event_data:
+                    # the author was dropped by the cache policy, so re-cache them from the
+                    # partial member sent with the message
+                    message.author = Member(self.client, user=event_data["author"],
+                                            **event_data["member"])
+                    message.author.guild_id = guild.id
+                    guild._members[author_id] = message.author
+                    guild._track_member(message.author)
+
+                if message.author is not None:
+                    self._touch_member(guild, author_id)
 
         for reaction_data in event_data.get("reactions", []):
             emoji = reaction_data.get("emoji", {})
             reaction = Reaction(**reaction_data)
 
             if "id" in emoji and emoji["id"] is not None:
-                emoji_obb = message.guild.emojis.get(int(emoji["id"]))
+                emoji_obb = self._emojis.get(int(emoji["id"]))
                 if emoji_obb is None:
                     emoji_obb = Emoji(id=emoji["id"], name=emoji["name"])
             else:
@@ -406,6 +619,7 @@ class State(object):
             self._guilds[new_guild.id] = new_guild
             new_guild.from_guild_create(**guild)
             new_guild.shard_id = gw.gw_state.shard_id
+            self._index_guild(new_guild)
 
         logger.info("Ready processed for shard {}. Delaying until all guilds are chunked."
                     .format(gw.gw_state.shard_id))
@@ -428,8 +642,10 @@ class State(object):
 
         self._user.id = int(id)
         self._user.username = event_data.get("username", self._user.username)
-        self._user.discriminator = event_data.get("discriminator", self._user.discriminator)
-        self._user.avatar_hash = event_data.get("avatar", self._user.avatar_hash)
+        self._user.discriminator = intern_or_none(
+            event_data.get("discriminator", self._user.discriminator)
+        )
+        self._user.avatar_hash = intern_or_none(event_data.get("avatar", self._user.avatar_hash))
 
         yield "user_update",
 
@@ -462,27 +678,32 @@ class State(object):
             # we only pass the User here as we're about to update everything
             member = Member(client=self.client, user=event_data["user"])
             member.guild_id = guild.id
-            old_member = None
+            existing = False
         else:
+            existing = True
+
+        listening = self._is_listening("member_update")
+        if existing and listening:
             old_member = member._copy()
+        else:
+            old_member = None
 
         # Update the member's presence
-        member.presence = Presence(status=event_data.get("status"), game=event_data.get("game", {}))
+        policy = self.cache_policy
+        status = event_data.get("status")
+        if policy.presences:
+            game = event_data.get("game", {}) if policy.presence_games else None
+            member.presence = Presence(status=status, game=game)
 
         # copy the roles if it exists
-        if old_member is not None:
-            fallback = old_member.role_ids
-        else:
-            fallback = None
-
-        roles = event_data.get("roles", fallback)
+        roles = event_data.get("roles")
         if roles:
             # clear roles
-            member.role_ids = [int(rid) for rid in roles]
+            member.role_ids = array("Q", map(int, roles))
 
         # update the nickname
-        if old_member is not None:
-            fallback = old_member.nickname.value
+        if existing:
+            fallback = member.nickname.value
         else:
             fallback = None
 
@@ -497,8 +718,23 @@ class State(object):
         # We might get PRESENCE_UPDATE events for members that recently left the guild though,
         # so we must ensure we only update, not add a member
         if user_id in guild._members:
+            if not policy.offline_members and status == Status.OFFLINE.value \
+                    and user_id != self._user.id:
+                self._drop_member(guild, user_id)
+            else:
+                guild._members[user_id] = member
+                guild._track_member(member)
+                self._touch_member(guild, user_id)
+        elif not policy.caches_all_members and status != Status.OFFLINE.value \
+                and "roles" in event_data:
+            # we're not caching every member, so this is a member that we dropped or never cached
+            # coming online
             guild._members[user_id] = member
-        yield "member_update", old_member, member,
+            guild._track_member(member)
+            self._touch_member(guild, user_id)
+
+        if listening:
+            yield "member_update", old_member, member,
 
     async def handle_presences_replace(self, gw: 'gateway.GatewayHandler', event_data: dict):
         # TODO
@@ -519,12 +755,18 @@ class State(object):
         logger.info("Got a chunk of {} members in guild {} "
                     "on shard {}".format(len(members), guild.name or guild.id, guild.shard_id))
 
-        guild._handle_member_chunk(event_data.get("members"))
+        if self.cache_policy.offline_members:
+            guild._handle_member_chunk(members)
+        else:
+            # chunks are mostly offline members, so only update the ones we already have
+            guild._handle_member_chunk([m for m in members
+                                        if int(m["user"]["id"]) in guild._members])
         yield "guild_chunk", guild, len(members),
 
         if guild._chunks_left <= 0:
             # Set the finished chunking event.
             await guild._finished_chunking.set()
+            self._index_guild(guild)
 
     async def handle_guild_create(self, gw: 'gateway.GatewayHandler', event_data: dict):
         """
@@ -543,6 +785,7 @@ class State(object):
             guild.from_guild_create(**event_data)
 
         guild.shard_id = gw.gw_state.shard_id
+        self._index_guild(guild)
         # TODO: Need to do this
         # try:
         #    guild.me.presence.game = gw.game
@@ -584,8 +827,9 @@ class State(object):
         if not guild:
             return
 
-        # disable dataclass checking temporarily
-        old_guild = copy.copy(guild)
+        listening = self._is_listening("guild_update")
+        if listening:
+            old_guild = copy.copy(guild)
 
         guild.unavailable = event_data.get("unavailable", False)
         guild.name = event_data.get("name", guild.name)
@@ -614,8 +858,10 @@ class State(object):
         guild.afk_channel_id = int_or_none(event_data.get("afk_channel"), guild.afk_channel_id)
         guild.afk_timeout = event_data.get("afk_timeout", guild.afk_timeout)
         guild.owner_id = int_or_none(event_data.get("owner_id"), guild.owner_id)
+        self._index_guild(guild)
 
-        yield "guild_update", old_guild, guild,
+        if listening:
+            yield "guild_update", old_guild, guild,
 
     async def handle_guild_delete(self, gw: 'gateway.GatewayHandler', event_data: dict):
         """
@@ -630,12 +876,18 @@ class State(object):
             guild = self._guilds.get(guild_id)
             if guild:
                 guild.unavailable = True
+                self._index_guild(guild)
                 yield "guild_unavailable", guild,
 
         else:
             # We've left this guild - clear it from our dictionary of guilds.
             guild = self._guilds.pop(guild_id, None)
             if guild:
+                self._unindex_guild(guild)
+                self._members_seen.pop(guild.id, None)
+                for emoji_id in guild._emojis:
+                    self._emojis.pop(emoji_id, None)
+
                 yield "guild_leave", guild,
                 for member in guild._members.values():
                     # use member.id to avoid user lookup
@@ -651,11 +903,15 @@ class State(object):
         if not guild:
             return
 
-        old_guild = guild._copy()
+        listening = self._is_listening("guild_emojis_update")
+        if listening:
+            old_guild = guild._copy()
+
         emojis = event_data.get("emojis", [])
         guild._handle_emojis(emojis)
 
-        yield "guild_emojis_update", old_guild, guild,
+        if listening:
+            yield "guild_emojis_update", old_guild, guild,
 
     async def handle_message_create(self, gw: 'gateway.GatewayHandler', event_data: dict):
         """
@@ -688,7 +944,13 @@ class State(object):
         if not old_message:
             return
 
-        new_message = copy.copy(old_message)
+        listening = self._is_listening("message_update", "message_edit")
+        if listening:
+            new_message = copy.copy(old_message)
+        else:
+            # nobody needs the old message, so just update it
+            new_message = old_message
+
         new_message.content = event_data.get("content", old_message.content)
         embeds = event_data.get("embeds")
         if not embeds:
@@ -698,6 +960,9 @@ class State(object):
         new_message._mentions = event_data.get("mentions", old_message._mentions)
         new_message._role_mentions = event_data.get("mention_roles", old_message._role_mentions)
 
+        if not listening:
+            return
+
         self.messages.remove(old_message)
         self.messages.append(new_message)
 
@@ -738,16 +1003,18 @@ class State(object):
 
         yield "message_delete_bulk", messages,
 
-    def _find_emoji(self, emoji_data: dict):
+    def _find_emoji(self, emoji_data: dict) -> typing.Union[Emoji, str, None]:
+        """
+        Finds an emoji from the emoji data of a reaction.
+
+        :param emoji_data: The emoji data to use.
+        :return: The :class:`.Emoji` found, the unicode emoji string, or None if it isn't cached.
+        """
         if emoji_data.get("id", None) is None:
             # str only
             return emoji_data["name"]
 
-        # try and get it from the guilds
-        for guild in self.guilds.values():
-            em = guild.emojis.get(int(emoji_data["id"]))
-            if em:
-                return em
+        return self._emojis.get(int(emoji_data["id"]))
 
     async def handle_message_reaction_add(self, gw: 'gateway.GatewayHandler', event_data: dict):
         """
@@ -763,19 +1030,12 @@ class State(object):
         if not message:
             return
 
-        # complex filter
-        def _f(r: Reaction):
-            if not r.emoji:
-                return False
-
-            e = self._find_emoji(event_data["emoji"])
-            if not e:
-                # ¯\_(ツ)_/¯
-                return False
-
-            return r.emoji == e
-
-        reaction = next(filter(_f, message.reactions), None)
+        emoji = self._find_emoji(event_data["emoji"])
+        if emoji:
+            reaction = next((r for r in message.reactions if r.emoji and r.emoji == emoji), None)
+        else:
+            # ¯\_(ツ)_/¯
+            reaction = None
 
         if not reaction:
             emoji = event_data.get("emoji", {})
@@ -783,7 +1043,7 @@ class State(object):
             reaction = Reaction()
 
             if "id" in emoji and emoji["id"] is not None:
-                emoji_obb = message.guild.emojis.get(int(emoji["id"]))
+                emoji_obb = self._emojis.get(int(emoji["id"]))
                 if emoji_obb is None:
                     emoji_obb = Emoji(id=emoji["id"], name=emoji["name"])
             else:
@@ -834,16 +1094,12 @@ class State(object):
         if not message:
             return
 
-        def _f(r: Reaction):
-            if not r.emoji:
-                return False
-
-            e = self._find_emoji(event_data["emoji"])
-            if not e:
-                # ¯\_(ツ)_/¯
-                return False
+        emoji = self._find_emoji(event_data["emoji"])
+        if not emoji:
+            # ¯\_(ツ)_/¯
+            return
 
-        reaction = next(filter(_f, message.reactions), None)
+        reaction = next((r for r in message.reactions if r.emoji and r.emoji == emoji), None)
         if not reaction:
             # nothing to do
             return
@@ -871,6 +1127,8 @@ class State(object):
         member.guild_id = guild.id
 
         guild._members[member.id] = member
+        guild._track_member(member)
+        self._touch_member(guild, member.id)
         guild.member_count += 1
         yield "guild_member_add", member,
 
@@ -885,7 +1143,8 @@ class State(object):
             return
 
         member_id = int(event_data["user"]["id"])
-        member = guild._members.pop(member_id, None)
+        member = guild._members.get(member_id)
+        self._drop_member(guild, member_id)
 
         guild.member_count -= 1
         if not member:
@@ -911,7 +1170,10 @@ class State(object):
             return
 
         # Make a copy of the member for the old previous reference.
-        old_member = member._copy()
+        listening = self._is_listening("guild_member_update")
+        if listening:
+            old_member = member._copy()
+
         # Re-create the user object.
         # self.make_user(event_data["user"], override_cache=True)
         # self._users[member.user.id] = member.user
@@ -923,12 +1185,15 @@ class State(object):
 
         # Overwrite roles, we want to get rid of any roles that are stale.
         if "roles" in event_data:
-            member.role_ids = [int(i) for i in event_data.get("roles", [])]
+            member.role_ids = array("Q", map(int, event_data.get("roles", [])))
 
-        guild._members[member.id] = member
         member.nickname = event_data.get("nick", member.nickname.value)
+        guild._members[member.id] = member
+        guild._track_member(member)
+        self._touch_member(guild, member.id)
 
-        yield "guild_member_update", old_member, member,
+        if listening:
+            yield "guild_member_update", old_member, member,
 
     async def handle_guild_ban_add(self, gw: 'gateway.GatewayHandler', event_data: dict):
         """
@@ -979,6 +1244,7 @@ class State(object):
             channel._update_overwrites((event_data.get("permission_overwrites", [])))
             if channel.id not in guild._channels:
                 guild._channels[channel.id] = channel
+                guild._track_channel(channel)
             else:
                 channel = guild._channels[channel.id]
 
@@ -994,7 +1260,9 @@ class State(object):
         if not channel:
             return
 
-        old_channel = channel._copy()
+        listening = self._is_listening("channel_update")
+        if listening:
+            old_channel = channel._copy()
 
         channel.name = event_data.get("name", channel.name)
         channel.position = event_data.get("position", channel.position)
@@ -1005,7 +1273,11 @@ class State(object):
         channel.parent_id = int_or_none(event_data.get("parent_id"), channel.parent_id)
 
         channel._update_overwrites(event_data.get("permission_overwrites", []))
-        yield "channel_update", old_channel, channel,
+        if not channel.private:
+            channel.guild._track_channel(channel)
+
+        if listening:
+            yield "channel_update", old_channel, channel,
 
     async def handle_channel_delete(self, gw: 'gateway.GatewayHandler', event_data: dict):
         """
@@ -1021,6 +1293,7 @@ class State(object):
             del self._private_channels[channel.id]
         else:
             del channel.guild._channels[channel.id]
+            channel.guild._untrack_channel(channel.id)
 
         yield "channel_delete", channel,
 
@@ -1046,6 +1319,7 @@ class State(object):
             role = Role(self.client, **role_data)
             role.guild_id = guild.id
             guild._roles[role_id] = role
+            guild._track_role(role)
         else:
             # thinking
             role = guild._roles[role_id]
@@ -1074,7 +1348,9 @@ class State(object):
         if not role:
             return
 
-        old_role = role._copy()
+        listening = self._is_listening("role_update")
+        if listening:
+            old_role = role._copy()
 
         # Update all the fields on the role.
         event_data = event_data.get("role", {})
@@ -1085,8 +1361,10 @@ class State(object):
         role.mentionable = event_data.get("mentionable")
         role.managed = event_data.get("managed")
         role.permissions = Permissions(event_data.get("permissions", 0))
+        guild._track_role(role)
 
-        yield "role_update", old_role, role,
+        if listening:
+            yield "role_update", old_role, role,
 
     async def handle_guild_role_delete(self, gw: 'gateway.GatewayHandler', event_data: dict):
         """
@@ -1102,6 +1380,8 @@ class State(object):
         if not role:
             return
 
+        guild._untrack_role(role.id)
+
         # Remove the role from all members.
         for member in guild.members.values():
             try:
@@ -1109,6 +1389,9 @@ class State(object):
             except ValueError:
                 continue
 
+        if guild.member_store is not None:
+            guild.member_store.remove_role(role.id)
+
         yield "role_delete", role,
 
     async def handle_typing_start(self, gw: 'gateway.GatewayHandler', event_data: dict):
@@ -1126,6 +1409,8 @@ class State(object):
             member = channel.guild.members.get(user_id)
             if not member:
                 return
+
+            self._touch_member(channel.guild, user_id)
             yield "guild_member_typing", channel, member,
         else:
             user = channel.recipients.get(user_id)
@@ -1164,9 +1449,11 @@ class State(object):
 
         # copy the voice states
         old_voice_state = guild._voice_states.pop(user_id, None)
-        if new_voice_state is not None:
+        if new_voice_state is not None and self.cache_policy.voice_states:
             guild._voice_states[new_voice_state.user_id] = new_voice_state
 
+        self._touch_member(guild, user_id)
+
         yield "voice_state_update", member, old_voice_state, new_voice_state,
 
     async def handle_webhooks_update(self, gw: 'gateway.GatewayHandler', event_data: dict):
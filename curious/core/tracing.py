@@ -0,0 +1,220 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Latency tracing for the event pipeline.
+
+.. currentmodule:: curious.core.tracing
+"""
+import enum
+import logging
+import typing
+from bisect import bisect_left
+
+logger = logging.getLogger("curious.tracing")
+
+#: The upper bounds of the histogram buckets, in seconds.
+#: These go from 1 microsecond to about 33 seconds, doubling each time.
+BUCKETS = tuple(2 ** n / 1_000_000 for n in range(26))
+
+
+class TraceStage(enum.Enum):
+    """
+    Represents a stage of the event pipeline that is traced.
+    """
+    #: Decompressing a zlib-streamed payload in :meth:`.GatewayHandler.handle_data_event`.
+    #: Recorded under the dispatch name, or the opcode name for other payloads.
+    DECOMPRESS = "decompress"
+
+    #: Decoding the JSON of a payload in :meth:`.GatewayHandler.handle_data_event`.
+    DECODE = "decode"
+
+    #: The whole of :meth:`.Client.handle_dispatches`, recorded under the dispatch name.
+    DISPATCH = "dispatch"
+
+    #: The ``State.handle_*`` method for a dispatch, recorded under the dispatch name.
+    STATE = "state"
+
+    #: Running a single handler from :meth:`.EventManager.fire_event`, recorded under the event
+    #: name. Handlers in the same task are timed one by one.
+    HANDLER = "handler"
+
+
+class LatencyHistogram(object):
+    """
+    A histogram of latencies, with exponentially sized buckets.
+    """
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        #: The number of samples in each bucket. The last bucket holds samples above the largest
+        #: bound in :data:`.BUCKETS`.
+        self.counts = [0] * (len(BUCKETS) + 1)
+
+        #: The number of samples recorded.
+        self.count = 0
+
+        #: The sum of every sample, in seconds.
+        self.total = 0.0
+
+        #: The smallest sample, in seconds.
+        self.min = None  # type: float
+
+        #: The largest sample, in seconds.
+        self.max = None  # type: float
+
+    def __repr__(self) -> str:
+        if not self.count:
+            return "<LatencyHistogram count=0>"
+
+        return f"<LatencyHistogram count={self.count} mean={self.mean * 1e6:.1f}us " \
+               f"p99={self.percentile(99) * 1e6:.1f}us>"
+
+    def record(self, elapsed: float):
+        """
+        Records a sample.
+
+        :param elapsed: The time taken, in seconds.
+        """
+        self.counts[bisect_left(BUCKETS, elapsed)] += 1
+        self.count += 1
+        self.total += elapsed
+
+        if self.min is None or elapsed < self.min:
+            self.min = elapsed
+
+        if self.max is None or elapsed > self.max:
+            self.max = elapsed
+
+    @property
+    def mean(self) -> float:
+        """
+        :return: The mean of every sample, in seconds.
+        """
+        if not self.count:
+            return 0.0
+
+        return self.total / self.count
+
+    def percentile(self, percent: float) -> float:
+        """
+        Estimates a percentile of the samples.
+
+        This returns the upper bound of the bucket the percentile falls in, so it is accurate to
+        within a factor of two.
+
+        :param percent: The percentile to get, from 0 to 100.
+        :return: The estimated percentile, in seconds.
+        """
+        if not self.count:
+            return 0.0
+
+        target = self.count * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                if bucket == len(BUCKETS):
+                    return self.max
+
+                return min(BUCKETS[bucket], self.max)
+
+        return self.max
+
+
+class EventTracer(object):
+    """
+    Records the latency of each stage of the event pipeline into per-event histograms.
+
+    Enable it with :meth:`.Client.enable_tracing`:
+
+    .. code-block:: python3
+
+        tracer = client.enable_tracing()
+
+        # later
+        for name, histogram in tracer.histograms_for(TraceStage.STATE).items():
+            print(name, histogram)
+
+    Hooks are called with ``(stage, name, elapsed)`` for every sample, and must be regular
+    functions, as they are called in the middle of processing events.
+    """
+
+    def __init__(self):
+        #: A mapping of (:class:`.TraceStage`, name) -> :class:`.LatencyHistogram`.
+        self.histograms = {}  # type: typing.Dict[typing.Tuple[TraceStage, str], LatencyHistogram]
+
+        #: A list of hooks called for every sample.
+        self.hooks = []  # type: typing.List[typing.Callable[[TraceStage, str, float], None]]
+
+    def add_hook(self, hook: 'typing.Callable[[TraceStage, str, float], None]'):
+        """
+        Adds a hook that is called for every sample.
+
+        :param hook: The hook to add.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: 'typing.Callable[[TraceStage, str, float], None]'):
+        """
+        Removes a hook.
+
+        :param hook: The hook to remove.
+        """
+        self.hooks.remove(hook)
+
+    def record(self, stage: TraceStage, name: str, elapsed: float):
+        """
+        Records a sample.
+
+        :param stage: The :class:`.TraceStage` the sample is for.
+        :param name: The name of the event or dispatch the sample is for.
+        :param elapsed: The time taken, in seconds.
+        """
+        try:
+            histogram = self.histograms[(stage, name)]
+        except KeyError:
+            histogram = self.histograms[(stage, name)] = LatencyHistogram()
+
+        histogram.record(elapsed)
+
+        for hook in self.hooks:
+            try:
+                hook(stage, name, elapsed)
+            except Exception:
+                logger.exception("Unhandled exception in tracing hook {}!"
+                                 .format(getattr(hook, "__name__", hook)))
+
+    def histogram(self, stage: TraceStage, name: str) -> 'typing.Optional[LatencyHistogram]':
+        """
+        :param stage: The :class:`.TraceStage` to get the histogram for.
+        :param name: The name of the event or dispatch.
+        :return: The :class:`.LatencyHistogram` for this stage and name, or None if nothing has \
+            been recorded.
+        """
+        return self.histograms.get((stage, name))
+
+    def histograms_for(self, stage: TraceStage) -> 'typing.Dict[str, LatencyHistogram]':
+        """
+        :param stage: The :class:`.TraceStage` to get the histograms for.
+        :return: A mapping of name -> :class:`.LatencyHistogram` for this stage.
+        """
+        return {name: hist for (st, name), hist in self.histograms.items() if st is stage}
+
+    def clear(self):
+        """
+        Clears every recorded sample.
+        """
+        self.histograms.clear()
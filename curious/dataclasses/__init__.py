@@ -32,6 +32,8 @@ stateful,  as in they store state which allows the user to edit them as appropri
     guild
     invite
     member
+    member_store
+    name_index
     message
     permissions
     presence
@@ -1226,7 +1226,7 @@ class Channel(Dataclass):
             async def _listener(before, after):
                 return after.id == self.id
 
-        async with self._bot.events.wait_for_manager("channel_update", _listener):
+        async with self._bot.events.wait_for_manager("channel_update", _listener, key=self.id):
             await coro
 
         return self
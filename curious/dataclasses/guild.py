@@ -37,6 +37,8 @@ from curious.dataclasses import channel as dt_channel, emoji as dt_emoji, invite
     member as dt_member, permissions as dt_permissions, role as dt_role, \
     search as dt_search, user as dt_user, voice_state as dt_vs, webhook as dt_webhook
 from curious.dataclasses.bases import Dataclass
+from curious.dataclasses.member_store import ColumnarMemberStore
+from curious.dataclasses.name_index import NameIndex
 from curious.dataclasses.presence import Presence, Status
 from curious.exc import CuriousError, HTTPException, HierarchyError, PermissionsError
 from curious.util import AsyncIteratorWrapper, base64ify, deprecated
@@ -44,6 +46,14 @@ from curious.util import AsyncIteratorWrapper, base64ify, deprecated
 default_var = typing.TypeVar("T")
 
 
+def _member_names(member: 'dt_member.Member') -> tuple:
+    """
+    Gets the names a member is indexed under.
+    """
+    user = member.user
+    return user.username, f"{user.username}#{user.discriminator}", member._nickname
+
+
 class MFALevel(enum.IntEnum):
     """
     Represents the MFA level of a :class:`.Guild`.
@@ -229,12 +239,29 @@ class GuildChannelWrapper(_WrapperBase):
         :param default: The default value to get, if the channel cannot be found.
         :return: A :class:`.Channel` if it can be found.
         """
-        s = sorted(self._guild._channels.values(), key=lambda c: c.position)
-        try:
-            return next(filter(lambda ch: ch.name == name, s))
-        except StopIteration:
+        channels = self._guild._channels
+        found = [channels[id_] for id_ in self._guild._get_channel_names().get(name)
+                 if id_ in channels and channels[id_].name == name]
+        if not found:
             return default
 
+        return min(found, key=lambda c: c.position)
+
+    def search(self, query: str, *, limit: int = 10, fuzzy: bool = True) \
+            -> 'typing.List[dt_channel.Channel]':
+        """
+        Searches for channels by name, ignoring case.
+
+        :param query: The name to search for.
+        :param limit: The maximum number of channels to return.
+        :param fuzzy: If channels with similar names should be included. See \
+            :meth:`.NameIndex.search`.
+        :return: A list of :class:`.Channel`, best matches first.
+        """
+        channels = self._guild._channels
+        ids = self._guild._get_channel_names().search(query, limit=limit, fuzzy=fuzzy)
+        return [channels[id_] for id_ in ids if id_ in channels]
+
     async def create(self, name: str, type_: 'dt_channel.ChannelType' = None,
                      permission_overwrites: 'typing.List[dt_permissions.Overwrite]' = None,
                      *,
@@ -294,7 +321,9 @@ class GuildChannelWrapper(_WrapperBase):
 
         # if it's a text channel and the topic was provided, automatically add it
         if type is dt_channel.ChannelType.TEXT and topic is not None:
-            async with self._guild._bot.events.wait_for_manager("channel_update", _listener):
+            channel_id = int(channel_data["id"])
+            async with self._guild._bot.events.wait_for_manager("channel_update", None,
+                                                                key=channel_id):
                 await self._guild._bot.http.edit_channel(channel_id=channel_data["id"], topic=topic)
 
         return self._guild._channels[int(channel_data.get("id"))]
@@ -414,12 +443,29 @@ class GuildRoleWrapper(_WrapperBase):
         :param default: The default value to get, if the role cannot be found.
         :return: A :class:`.Role` if it can be found.
         """
-        s = sorted(self._guild._roles.values(), key=lambda c: c.position)
-        try:
-            return next(filter(lambda r: r.name == name, s))
-        except StopIteration:
+        roles = self._guild._roles
+        found = [roles[id_] for id_ in self._guild._get_role_names().get(name)
+                 if id_ in roles and roles[id_].name == name]
+        if not found:
             return default
 
+        return min(found, key=lambda r: r.position)
+
+    def search(self, query: str, *, limit: int = 10, fuzzy: bool = True) \
+            -> 'typing.List[dt_role.Role]':
+        """
+        Searches for roles by name, ignoring case.
+
+        :param query: The name to search for.
+        :param limit: The maximum number of roles to return.
+        :param fuzzy: If roles with similar names should be included. See \
+            :meth:`.NameIndex.search`.
+        :return: A list of :class:`.Role`, best matches first.
+        """
+        roles = self._guild._roles
+        ids = self._guild._get_role_names().search(query, limit=limit, fuzzy=fuzzy)
+        return [roles[id_] for id_ in ids if id_ in roles]
+
     async def create(self, **kwargs) -> 'dt_role.Role':
         """
         Creates a new role in this guild.
@@ -432,6 +478,7 @@ class GuildRoleWrapper(_WrapperBase):
         role_obb = dt_role.Role(client=self._guild._bot,
                                 **(await self._guild._bot.http.create_role(self._guild.id)))
         self._guild._roles[role_obb.id] = role_obb
+        self._guild._track_role(role_obb)
         role_obb.guild_id = self._guild.id
         return await role_obb.edit(**kwargs)
 
@@ -669,7 +716,7 @@ class Guild(Dataclass):
         "shard_id", "_roles", "_members", "_channels", "_emojis", "member_count", "_voice_states",
         "_large", "_chunks_left", "_finished_chunking", "icon_hash", "splash_hash",
         "owner_id", "afk_channel_id", "system_channel_id", "widget_channel_id",
-        "voice_client",
+        "voice_client", "_member_store", "_member_names", "_channel_names", "_role_names",
         "channels", "roles", "emojis", "bans",
     )
 
@@ -754,6 +801,16 @@ class Guild(Dataclass):
         #: The current voice client associated with this guild.
         self.voice_client = None
 
+        # the columnar member store, if enabled
+        self._member_store = None  # type: ColumnarMemberStore
+        if bot.state.columnar_members:
+            self._member_store = ColumnarMemberStore()
+
+        # the name indexes, built the first time they are searched
+        self._member_names = None  # type: NameIndex
+        self._channel_names = None  # type: NameIndex
+        self._role_names = None  # type: NameIndex
+
         #: The :class:`.GuildChannelWrapper` that wraps the channels in this Guild.
         self.channels = GuildChannelWrapper(self)
         #: The :class:`.GuildRoleWrapper` that wraps the roles in this Guild.
@@ -771,9 +828,11 @@ class Guild(Dataclass):
         obb.bans = GuildRoleWrapper(obb)
         obb._channels = self._channels.copy()
         obb._roles = self._roles.copy()
-        obb._emojis = self._roles.copy()
+        obb._emojis = self._emojis.copy()
         obb._members = self._members.copy()
         obb._voice_states = self._voice_states.copy()
+        # the indexes are kept up to date for this guild, not the copy
+        obb._member_names = obb._channel_names = obb._role_names = None
         return obb
 
     def __repr__(self) -> str:
@@ -790,6 +849,123 @@ class Guild(Dataclass):
         """
         return MappingProxyType(self._members)
 
+    @property
+    def member_store(self) -> 'typing.Union[ColumnarMemberStore, None]':
+        """
+        :return: The :class:`.ColumnarMemberStore` for this guild, or None if it is not enabled.
+        """
+        return self._member_store
+
+    def enable_member_store(self) -> ColumnarMemberStore:
+        """
+        Enables the :class:`.ColumnarMemberStore` for this guild, filling it with the members
+        currently cached.
+
+        This is done automatically for every guild if the client was created with
+        ``columnar_members=True``.
+
+        :return: The :class:`.ColumnarMemberStore` for this guild.
+        """
+        if self._member_store is None:
+            self._member_store = ColumnarMemberStore()
+            for member in self._members.values():
+                self._member_store.update(member)
+
+        return self._member_store
+
+    def disable_member_store(self) -> None:
+        """
+        Disables the :class:`.ColumnarMemberStore` for this guild.
+        """
+        self._member_store = None
+
+    def _track_member(self, member: 'dt_member.Member'):
+        """
+        Updates the member store row for a member, if the store is enabled.
+        """
+        if self._member_store is not None:
+            self._member_store.update(member)
+
+        if self._member_names is not None:
+            self._member_names.update(member.id, *_member_names(member))
+
+    def _untrack_member(self, member_id: int):
+        """
+        Removes the member store row for a member, if the store is enabled.
+        """
+        if self._member_store is not None:
+            self._member_store.remove(member_id)
+
+        if self._member_names is not None:
+            self._member_names.remove(member_id)
+
+    def _track_channel(self, channel: 'dt_channel.Channel'):
+        """
+        Updates the name index entry for a channel, if the index has been built.
+        """
+        if self._channel_names is not None:
+            self._channel_names.update(channel.id, channel.name)
+
+    def _untrack_channel(self, channel_id: int):
+        """
+        Removes the name index entry for a channel, if the index has been built.
+        """
+        if self._channel_names is not None:
+            self._channel_names.remove(channel_id)
+
+    def _track_role(self, role: 'dt_role.Role'):
+        """
+        Updates the name index entry for a role, if the index has been built.
+        """
+        if self._role_names is not None:
+            self._role_names.update(role.id, role.name)
+
+    def _untrack_role(self, role_id: int):
+        """
+        Removes the name index entry for a role, if the index has been built.
+        """
+        if self._role_names is not None:
+            self._role_names.remove(role_id)
+
+    def _get_member_names(self) -> NameIndex:
+        """
+        Gets the member name index, building it if needed.
+        """
+        if self._member_names is None:
+            index = NameIndex()
+            for member in self._members.values():
+                index.update(member.id, *_member_names(member))
+
+            self._member_names = index
+
+        return self._member_names
+
+    def _get_channel_names(self) -> NameIndex:
+        """
+        Gets the channel name index, building it if needed.
+        """
+        if self._channel_names is None:
+            index = NameIndex()
+            for channel in self._channels.values():
+                index.update(channel.id, channel.name)
+
+            self._channel_names = index
+
+        return self._channel_names
+
+    def _get_role_names(self) -> NameIndex:
+        """
+        Gets the role name index, building it if needed.
+        """
+        if self._role_names is None:
+            index = NameIndex()
+            for role in self._roles.values():
+                index.update(role.id, role.name)
+
+            self._role_names = index
+
+        return self._role_names
+
     @property
     def voice_states(self) -> 'typing.Mapping[int, dt_vs.VoiceState]':
         """
@@ -863,6 +1039,9 @@ class Guild(Dataclass):
         """
         :return: The number of members with a non-Invisible presence. 
         """
+        if self._member_store is not None:
+            return len(self._member_store) - self._member_store.count_status(Status.OFFLINE)
+
         return sum(1 for member in self._members.values() if member.status is not Status.OFFLINE)
 
     # Presence methods
@@ -871,10 +1050,56 @@ class Guild(Dataclass):
         """
         A generator that returns the members that match the specified status.
         """
+        if self._member_store is not None:
+            for member_id in self._member_store.ids_with_status(status):
+                member = self._members.get(member_id)
+                if member is not None:
+                    yield member
+
+            return
+
         for member in self.members.values():
             if member.status == status:
                 yield member
 
+    def members_with_role(self, role: 'dt_role.Role') \
+            -> 'typing.Generator[dt_member.Member, None, None]':
+        """
+        A generator that returns the members that have the specified role.
+
+        :param role: The :class:`.Role` to match.
+        """
+        if self._member_store is not None:
+            for member_id in self._member_store.ids_with_role(role.id):
+                member = self._members.get(member_id)
+                if member is not None:
+                    yield member
+
+            return
+
+        for member in self.members.values():
+            if role.id in member.role_ids:
+                yield member
+
+    def members_joined_after(self, when: datetime.datetime) \
+            -> 'typing.Generator[dt_member.Member, None, None]':
+        """
+        A generator that returns the members that joined this guild after the specified time.
+
+        :param when: The :class:`datetime.datetime` to compare against.
+        """
+        if self._member_store is not None:
+            for member_id in self._member_store.ids_joined_after(when):
+                member = self._members.get(member_id)
+                if member is not None:
+                    yield member
+
+            return
+
+        for member in self.members.values():
+            if member.joined_at is not None and member.joined_at > when:
+                yield member
+
     @property
     def online_members(self) -> 'typing.Generator[dt_member.Member, None, None]':
         """
@@ -927,6 +1152,8 @@ class Guild(Dataclass):
         """
         Searches for a member.
 
+        Names are matched ignoring case, but a member whose name matches exactly is preferred.
+
         :param name: The username or nickname of the member.
         :param discriminator: The discriminator of the member.
         :param full_name: The full name (i.e. username#discrim) of the member. Optional; will be \
@@ -951,16 +1178,50 @@ class Guild(Dataclass):
         if isinstance(discriminator, int):
             discriminator = "{:04d}".format(discriminator)
 
-        for member in self._members.values():
+        if name is None:
+            return None
+
+        # exact matches win, but fall back to the first match that ignores case
+        folded = name.casefold()
+        fallback = None
+        for member_id in self._get_member_names().get(name):
+            member = self._members.get(member_id)
+            if member is None:
+                continue
+
             # ensure discrim matches first
             if discriminator is not None and discriminator != member.user.discriminator:
                 continue
 
-            if member.user.username == name:
+            username, nickname = member.user.username, member._nickname
+            if name == username or name == nickname:
                 return member
 
-            if member.nickname == name:
-                return member
+            if fallback is None and (folded == username.casefold()
+                                     or (nickname is not None and folded == nickname.casefold())):
+                fallback = member
+
+        return fallback
+
+    def search_members(self, query: str, *, limit: int = 10, fuzzy: bool = True) \
+            -> 'typing.List[dt_member.Member]':
+        """
+        Searches for members by username, ``username#discriminator`` or nickname, ignoring case.
+
+        .. code-block:: python3
+
+            # members called "fuyu", then members whose names start with "fuyu"
+            members = guild.search_members("fuyu", limit=5)
+
+        :param query: The name to search for.
+        :param limit: The maximum number of members to return.
+        :param fuzzy: If members with similar names should be included. See \
+            :meth:`.NameIndex.search`.
+        :return: A list of :class:`.Member`, best matches first.
+        """
+        members = self._members
+        ids = self._get_member_names().search(query, limit=limit, fuzzy=fuzzy)
+        return [members[id_] for id_ in ids if id_ in members]
 
     @deprecated(since="0.7.0", see_instead=search_for_member, removal="0.9.0")
     def find_member(self, search_str: str) -> 'dt_member.Member':
@@ -1015,6 +1276,8 @@ class Guild(Dataclass):
             # We have a new chunk, so decrement the number left.
             self._chunks_left -= 1
 
+        state = self._bot.state
+
         for member_data in members:
             member_id = int(member_data["user"]["id"])
             if member_id in self._members:
@@ -1025,6 +1288,8 @@ class Guild(Dataclass):
 
             member_obj.nickname = member_data.get("nick", member_obj.nickname)
             member_obj.guild_id = self.id
+            self._track_member(member_obj)
+            state._touch_member(self, member_id)
 
     def _handle_emojis(self, emojis: typing.List[dict]):
         """
@@ -1032,10 +1297,19 @@ class Guild(Dataclass):
         
         :param emojis: A list of emoji objects from Discord.
         """
+        # this is always the full list of emojis, so drop the old ones from the global index
+        state_emojis = self._bot.state._emojis
+        for emoji_id in self._emojis:
+            state_emojis.pop(emoji_id, None)
+
+        self._emojis = {}
+        if not self._bot.state.cache_policy.emojis:
+            return
         for emoji in emojis:
             emoji_obj = dt_emoji.Emoji(**emoji, client=self._bot)
             self._emojis[emoji_obj.id] = emoji_obj
             emoji_obj.guild_id = self.id
+            state_emojis[emoji_obj.id] = emoji_obj
 
     def from_guild_create(self, **data: dict) -> 'Guild':
         """
@@ -1082,28 +1356,51 @@ class Guild(Dataclass):
             role_obj = dt_role.Role(self._bot, **role_data)
             role_obj.guild_id = self.id
             self._roles[role_obj.id] = role_obj
+            self._track_role(role_obj)
+
+        policy = self._bot.state.cache_policy
+        members = data.get("members", [])
+        presences = data.get("presences", [])
+
+        if not policy.offline_members:
+            # members without a presence here are offline
+            online = {presence["user"]["id"] for presence in presences
+                      if presence.get("status", Status.OFFLINE.value) != Status.OFFLINE.value}
+            if self._bot.user is not None:
+                online.add(str(self._bot.user.id))
+
+            members = [member for member in members if member["user"]["id"] in online]
 
         # Create all the Member objects for the server.
-        self._handle_member_chunk(data.get("members", []))
+        self._handle_member_chunk(members)
+
+        if not policy.presences:
+            presences = []
 
-        for presence in data.get("presences", []):
+        for presence in presences:
             member_id = int(presence["user"]["id"])
             member_obj = self._members.get(member_id)
 
             if not member_obj:
                 continue
 
+            if not policy.presence_games:
+                presence = {**presence, "game": None}
+
             member_obj.presence = Presence(**presence)
+            self._track_member(member_obj)
 
         # Create all of the channel objects.
         for channel_data in data.get("channels", []):
             channel_obj = dt_channel.Channel(self._bot, **channel_data)
             self._channels[channel_obj.id] = channel_obj
+            self._track_channel(channel_obj)
             channel_obj.guild_id = self.id
             channel_obj._update_overwrites(channel_data.get("permission_overwrites", []), )
 
         # Create all of the voice states.
-        for vs_data in data.get("voice_states", []):
+        voice_states = data.get("voice_states", []) if policy.voice_states else []
+        for vs_data in voice_states:
             user_id = int(vs_data.get("user_id", 0))
             member = self.members.get(user_id)
             if not member:
@@ -21,6 +21,7 @@ Wrappers for Member objects (Users with guilds).
 import collections
 import copy
 import datetime
+from array import array
 from typing import List
 
 from curious.dataclasses import guild as dt_guild, role as dt_role, user as dt_user, \
@@ -35,10 +36,24 @@ from curious.util import to_datetime
 class Nickname(object):
     """
     Represents the nickname of a :class:`.Member`.
+
+    This is a view over the nickname string stored on the member, and is created on access.
     """
-    def __init__(self, parent: 'Member', value: str):
+    __slots__ = "parent",
+
+    def __init__(self, parent: 'Member'):
         self.parent = parent
-        self.value = value
+
+    @property
+    def value(self) -> str:
+        """
+        :return: The nickname string of the member, or None if they have no nickname.
+        """
+        return self.parent._nickname
+
+    @value.setter
+    def value(self, value: str):
+        self.parent._nickname = value
 
     def __eq__(self, other):
         if other is None and self.value in [None, ""]:
@@ -99,7 +114,8 @@ class Nickname(object):
         async def _listener(before, after):
             return after.guild == guild and after.id == self.parent.id
 
-        async with self.parent._bot.events.wait_for_manager("guild_member_update", _listener):
+        async with self.parent._bot.events.wait_for_manager("guild_member_update", _listener,
+                                                            key=self.parent.id):
             await self.parent._bot.http.change_nickname(guild.id, new_nickname,
                                                         member_id=self.parent.id, me=me)
 
@@ -117,6 +133,7 @@ class MemberRoleContainer(collections.Sequence):
     """
     Represents the roles of a :class:`.Member`.
     """
+    __slots__ = "_member",
 
     def __init__(self, member: 'Member'):
         self._member = member
@@ -190,7 +207,8 @@ class MemberRoleContainer(collections.Sequence):
 
             return True
 
-        async with self._member._bot.events.wait_for_manager("guild_member_update", _listener):
+        async with self._member._bot.events.wait_for_manager("guild_member_update", _listener,
+                                                             key=self._member.id):
             role_ids = set([_r.id for _r in self._member.roles] + [_r.id for _r in roles])
             await self._member._bot.http.edit_member_roles(
                 self._member.guild_id, self._member.id, role_ids
@@ -223,7 +241,8 @@ class MemberRoleContainer(collections.Sequence):
         # Calculate the roles to keep.
         to_keep = set(self._member.roles) - set(roles)
 
-        async with self._member._bot.events.wait_for_manager("guild_member_update", _listener):
+        async with self._member._bot.events.wait_for_manager("guild_member_update", _listener,
+                                                             key=self._member.id):
             role_ids = set([_r.id for _r in to_keep])
             await self._member._bot.http.edit_member_roles(self._member.guild_id, self._member.id,
                                                            role_ids)
@@ -234,35 +253,32 @@ class Member(Dataclass):
     A member represents somebody who is inside a guild.
     """
 
-    __slots__ = ("_user_data", "role_ids", "joined_at", "_nickname", "guild_id", "presence",
-                 "roles")
+    __slots__ = ("_user", "role_ids", "joined_at", "_nickname", "guild_id", "_presence")
 
     def __init__(self, client, **kwargs):
         super().__init__(kwargs["user"]["id"], client)
 
-        # copy user data for when the user is decached
-        self._user_data = kwargs["user"]
-        self._bot.state.make_user(self._user_data)
-
-        #: An iterable of role IDs this member has.
-        self.role_ids = [int(rid) for rid in kwargs.get("roles", [])]
+        # keep a reference to the (shared) user for when the user is decached
+        self._user = self._bot.state.make_user(kwargs["user"])
 
-        #: A :class:`._MemberRoleContainer` that represents the roles of this member.
-        self.roles = MemberRoleContainer(self)
+        #: An array of role IDs this member has.
+        self.role_ids = array("Q", map(int, kwargs.get("roles", [])))
 
         #: The date the user joined the guild.
         self.joined_at = to_datetime(kwargs.get("joined_at", None))  # type: datetime.datetime
 
-        nick = kwargs.get("nick")
-        #: The member's current :class:`.Nickname`.
-        self._nickname = Nickname(self, nick)  # type: Nickname
+        # the nickname string, wrapped by the nickname property
+        self._nickname = kwargs.get("nick")  # type: str
 
         #: The ID of the guild that this member is in.
         self.guild_id = None  # type: int
 
-        #: The current :class:`.Presence` of this member.
-        self.presence = Presence(status=kwargs.get("status", Status.OFFLINE),
-                                 game=kwargs.get("game", None))
+        # most members are offline, so only make a presence when we have one
+        if "status" in kwargs or "game" in kwargs:
+            self._presence = Presence(status=kwargs.get("status", Status.OFFLINE),
+                                      game=kwargs.get("game", None))
+        else:
+            self._presence = None  # type: Presence
 
     @property
     def guild(self) -> 'dt_guild.Guild':
@@ -289,14 +305,35 @@ class Member(Dataclass):
         :getter: A :class:`._Nickname` for this member.
         :setter: Coerces a string nickname into a :class:`._Nickname`. Do not use.
         """
-        return self._nickname
+        return Nickname(self)
 
     @nickname.setter
     def nickname(self, value: str):
         if isinstance(value, Nickname):
             # unwrap nicknames, in case of error
             value = value.value
-        self._nickname.value = value
+        self._nickname = value
+
+    @property
+    def roles(self) -> MemberRoleContainer:
+        """
+        :return: A :class:`.MemberRoleContainer` that represents the roles of this member.
+        """
+        return MemberRoleContainer(self)
+
+    @property
+    def presence(self) -> Presence:
+        """
+        :return: The current :class:`.Presence` of this member.
+        """
+        if self._presence is None:
+            self._presence = Presence(status=Status.OFFLINE)
+
+        return self._presence
+
+    @presence.setter
+    def presence(self, value: Presence):
+        self._presence = value
 
     def __hash__(self) -> int:
         return hash(self.guild_id) + hash(self.user.id)
@@ -312,8 +349,7 @@ class Member(Dataclass):
         Copies a member object.
         """
         new_object = copy.copy(self)
-        new_object.roles = MemberRoleContainer(new_object)
-        new_object.role_ids = self.role_ids.copy()
+        new_object.role_ids = array("Q", self.role_ids)
 
         return new_object
 
@@ -333,7 +369,7 @@ class Member(Dataclass):
             return self._bot.state._users[self.id]
         except KeyError:
             # don't go through make_user as it'll cache it
-            return dt_user.User(self._bot, **self._user_data)
+            return self._user
 
     @property
     def name(self) -> str:
@@ -357,20 +393,20 @@ class Member(Dataclass):
         """
         :return: The current :class:`.Status` of this member.
         """
-        return self.presence.status if self.presence else Status.OFFLINE
+        return self._presence.status if self._presence else Status.OFFLINE
 
     @property
     def game(self) -> Game:
         """
         :return: The current :class:`.Game` this member is playing.
         """
-        if not self.presence:
+        if not self._presence:
             return None
 
-        if self.presence.status == Status.OFFLINE:
+        if self._presence.status == Status.OFFLINE:
             return None
 
-        return self.presence.game
+        return self._presence.game
 
     @property
     def colour(self) -> int:
@@ -0,0 +1,249 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A columnar store of guild members, for fast aggregate queries.
+
+.. currentmodule:: curious.dataclasses.member_store
+"""
+import datetime
+from array import array
+from typing import Dict, Iterator, List
+
+from curious.dataclasses import member as dt_member
+from curious.dataclasses.presence import Status
+
+#: The status code used for each :class:`.Status` in the status column.
+STATUS_CODES = {status: code for (code, status) in enumerate(Status)}
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _to_epoch(dt: datetime.datetime) -> float:
+    """
+    Converts a naive UTC datetime into a UNIX timestamp, or 0 if it is None.
+    """
+    if dt is None:
+        return 0.0
+
+    if dt.tzinfo is not None:
+        return dt.timestamp()
+
+    return (dt - _EPOCH).total_seconds()
+
+
+class ColumnarMemberStore(object):
+    """
+    Stores the members of a :class:`.Guild` as parallel columns, rather than as one object per
+    member.
+
+    Each row has a member ID, a status code, a join timestamp and a role bitset, where each role of
+    the guild is assigned a bit index the first time it is seen. Queries run over the columns
+    without touching any :class:`.Member` objects, and return member IDs.
+
+    This sits alongside the :class:`.Member` objects of a guild, and is kept up to date by the
+    state; enable it with :meth:`.Guild.enable_member_store`.
+    """
+    __slots__ = ("ids", "statuses", "joined_at", "role_bits", "_rows", "_role_indexes",
+                 "_free_role_indexes")
+
+    def __init__(self):
+        #: The member ID column.
+        self.ids = array("Q")
+
+        #: The status code column. See :data:`.STATUS_CODES`.
+        self.statuses = bytearray()
+
+        #: The join timestamp column, as UNIX timestamps.
+        self.joined_at = array("d")
+
+        #: The role bitset column.
+        self.role_bits = []  # type: List[int]
+
+        # member_id -> row
+        self._rows = {}  # type: Dict[int, int]
+
+        # role_id -> bit index
+        self._role_indexes = {}  # type: Dict[int, int]
+        self._free_role_indexes = []  # type: List[int]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, member_id: int) -> bool:
+        return member_id in self._rows
+
+    def __repr__(self) -> str:
+        return f"<ColumnarMemberStore members={len(self)} roles={len(self._role_indexes)}>"
+
+    def _role_index(self, role_id: int) -> int:
+        """
+        Gets (or assigns) the bit index for a role.
+        """
+        try:
+            return self._role_indexes[role_id]
+        except KeyError:
+            if self._free_role_indexes:
+                index = self._free_role_indexes.pop()
+            else:
+                index = len(self._role_indexes)
+
+            self._role_indexes[role_id] = index
+            return index
+
+    def _bits_for(self, role_ids) -> int:
+        """
+        Gets the role bitset for an iterable of role IDs.
+        """
+        bits = 0
+        for role_id in role_ids:
+            bits |= 1 << self._role_index(role_id)
+
+        return bits
+
+    def update(self, member: 'dt_member.Member'):
+        """
+        Adds or updates the row for a member.
+
+        :param member: The :class:`.Member` to store.
+        """
+        status = STATUS_CODES[member.status]
+        bits = self._bits_for(member.role_ids)
+
+        row = self._rows.get(member.id)
+        if row is None:
+            self._rows[member.id] = len(self.ids)
+            self.ids.append(member.id)
+            self.statuses.append(status)
+            self.joined_at.append(_to_epoch(member.joined_at))
+            self.role_bits.append(bits)
+        else:
+            self.statuses[row] = status
+            self.role_bits[row] = bits
+            if member.joined_at is not None:
+                self.joined_at[row] = _to_epoch(member.joined_at)
+
+    def update_status(self, member_id: int, status: Status):
+        """
+        Updates the status of a member, if they are stored.
+
+        :param member_id: The ID of the member.
+        :param status: The new :class:`.Status` of the member.
+        """
+        row = self._rows.get(member_id)
+        if row is not None:
+            self.statuses[row] = STATUS_CODES[status]
+
+    def remove(self, member_id: int):
+        """
+        Removes the row for a member, if they are stored.
+
+        :param member_id: The ID of the member to remove.
+        """
+        row = self._rows.pop(member_id, None)
+        if row is None:
+            return
+
+        # move the last row into the hole, so removal doesn't shift every row after it
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.statuses[row] = self.statuses[last]
+            self.joined_at[row] = self.joined_at[last]
+            self.role_bits[row] = self.role_bits[last]
+            self._rows[moved_id] = row
+
+        self.ids.pop()
+        self.statuses.pop()
+        self.joined_at.pop()
+        self.role_bits.pop()
+
+    def remove_role(self, role_id: int):
+        """
+        Removes a role from every row, and frees its bit index.
+
+        :param role_id: The ID of the role that was deleted.
+        """
+        index = self._role_indexes.pop(role_id, None)
+        if index is None:
+            return
+
+        mask = ~(1 << index)
+        self.role_bits = [bits & mask for bits in self.role_bits]
+        self._free_role_indexes.append(index)
+
+    def clear(self):
+        """
+        Removes every row from this store.
+        """
+        self.__init__()
+
+    # queries
+    def count_status(self, status: Status) -> int:
+        """
+        :param status: The :class:`.Status` to count.
+        :return: The number of members with the specified status.
+        """
+        return self.statuses.count(STATUS_CODES[status])
+
+    def ids_with_status(self, status: Status) -> Iterator[int]:
+        """
+        :param status: The :class:`.Status` to match.
+        :return: An iterator of the IDs of members with the specified status.
+        """
+        code = STATUS_CODES[status]
+        ids = self.ids
+        statuses = self.statuses
+
+        # bytearray.find skips over the rows that don't match in C
+        row = statuses.find(code)
+        while row != -1:
+            yield ids[row]
+            row = statuses.find(code, row + 1)
+
+    def count_role(self, role_id: int) -> int:
+        """
+        :param role_id: The ID of the role to count.
+        :return: The number of members with the specified role.
+        """
+        index = self._role_indexes.get(role_id)
+        if index is None:
+            return 0
+
+        bit = 1 << index
+        return sum(1 for bits in self.role_bits if bits & bit)
+
+    def ids_with_role(self, role_id: int) -> Iterator[int]:
+        """
+        :param role_id: The ID of the role to match.
+        :return: An iterator of the IDs of members with the specified role.
+        """
+        index = self._role_indexes.get(role_id)
+        if index is None:
+            return iter(())
+
+        bit = 1 << index
+        return (member_id for (member_id, bits) in zip(self.ids, self.role_bits) if bits & bit)
+
+    def ids_joined_after(self, when: datetime.datetime) -> Iterator[int]:
+        """
+        :param when: The :class:`datetime.datetime` to compare against. Naive datetimes are \
+            treated as UTC.
+        :return: An iterator of the IDs of members that joined after the specified time.
+        """
+        epoch = _to_epoch(when)
+        return (member_id for (member_id, joined) in zip(self.ids, self.joined_at)
+                if joined > epoch)
@@ -338,7 +338,7 @@ class Message(Dataclass):
             embed = embed.to_dict()
 
         async with self._bot.events.wait_for_manager("message_update",
-                                                     lambda o, n: n.id == self.id):
+                                                     lambda o, n: n.id == self.id, key=self.id):
             await self._bot.http.edit_message(self.channel.id, self.id, content=new_content,
                                               embed=embed)
         return self
@@ -0,0 +1,171 @@
+# This file is part of curious.
+#
+# curious is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# curious is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with curious.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A case-insensitive index of names, for looking up members, channels and roles by name.
+
+.. currentmodule:: curious.dataclasses.name_index
+"""
+import difflib
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class NameIndex(object):
+    """
+    Maps case-folded names to the IDs of the objects with that name.
+
+    Each ID can be indexed under several names, for example the username, full name and nickname
+    of a member. Exact lookups are a single dict lookup; prefix searches use a sorted list of
+    names that is rebuilt the first time it is needed after a name is added or removed.
+
+    The indexes of a :class:`.Guild` are built the first time they are searched, and are kept up
+    to date by the state after that.
+    """
+    __slots__ = ("_ids", "_sources", "_sorted")
+
+    def __init__(self):
+        # folded name -> IDs, as a tuple as most names only belong to one object
+        self._ids = {}  # type: Dict[str, Tuple[int, ...]]
+
+        # ID -> the names it is indexed under, as given
+        self._sources = {}  # type: Dict[int, Tuple[str, ...]]
+
+        # the sorted folded names, or None if it needs rebuilding
+        self._sorted = None  # type: Optional[List[str]]
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def __contains__(self, id_: int) -> bool:
+        return id_ in self._sources
+
+    def __repr__(self) -> str:
+        return f"<NameIndex ids={len(self._sources)} names={len(self._ids)}>"
+
+    def update(self, id_: int, *names: Optional[str]):
+        """
+        Indexes an object under some names, replacing the names it was indexed under before.
+
+        :param id_: The ID of the object.
+        :param names: The names of the object. None and empty names are skipped.
+        """
+        names = tuple(name for name in names if name)
+        old = self._sources.get(id_)
+        if old == names:
+            return
+
+        if old is not None:
+            self._unindex(id_, old)
+
+        self._sources[id_] = names
+        for key in {name.casefold() for name in names}:
+            ids = self._ids.get(key)
+            if ids is None:
+                self._ids[key] = (id_,)
+                self._sorted = None
+            else:
+                self._ids[key] = ids + (id_,)
+
+    def remove(self, id_: int):
+        """
+        Removes an object from the index.
+
+        :param id_: The ID of the object.
+        """
+        names = self._sources.pop(id_, None)
+        if names is not None:
+            self._unindex(id_, names)
+
+    def _unindex(self, id_: int, names: Tuple[str, ...]):
+        for key in {name.casefold() for name in names}:
+            ids = tuple(i for i in self._ids.get(key, ()) if i != id_)
+            if ids:
+                self._ids[key] = ids
+            else:
+                self._ids.pop(key, None)
+                self._sorted = None
+
+    def clear(self):
+        """
+        Removes every object from the index.
+        """
+        self._ids.clear()
+        self._sources.clear()
+        self._sorted = None
+
+    def get(self, name: str) -> Tuple[int, ...]:
+        """
+        Gets the IDs of the objects with a name, ignoring case.
+
+        :param name: The name to look up.
+        :return: A tuple of IDs, which is empty if nothing has this name.
+        """
+        return self._ids.get(name.casefold(), ())
+
+    def startswith(self, prefix: str) -> Iterator[int]:
+        """
+        Gets the IDs of the objects with a name that starts with a prefix, ignoring case.
+
+        :param prefix: The prefix to search for.
+        :return: An iterator of IDs, in the order of the names they matched.
+        """
+        if self._sorted is None:
+            self._sorted = sorted(self._ids)
+
+        prefix = prefix.casefold()
+        names = self._sorted
+        seen = set()
+        for pos in range(bisect_left(names, prefix), len(names)):
+            name = names[pos]
+            if not name.startswith(prefix):
+                break
+
+            for id_ in self._ids[name]:
+                if id_ not in seen:
+                    seen.add(id_)
+                    yield id_
+
+    def search(self, query: str, *, limit: int = 10, fuzzy: bool = True,
+               cutoff: float = 0.6) -> List[int]:
+        """
+        Searches for objects by name, ignoring case.
+
+        Exact matches come first, followed by prefix matches. If there are fewer than ``limit``
+        results and ``fuzzy`` is True, the closest names are added with :mod:`difflib`, which
+        scans every name.
+
+        :param query: The name to search for.
+        :param limit: The maximum number of IDs to return.
+        :param fuzzy: If close matches should be included.
+        :param cutoff: The minimum similarity of close matches, from 0 to 1.
+        :return: A list of IDs, best matches first.
+        """
+        results = list(self.get(query)[:limit])
+        if len(results) < limit:
+            for id_ in self.startswith(query):
+                if id_ not in results:
+                    results.append(id_)
+                    if len(results) >= limit:
+                        break
+
+        if fuzzy and len(results) < limit:
+            for name in difflib.get_close_matches(query.casefold(), self._ids, n=limit,
+                                                  cutoff=cutoff):
+                for id_ in self._ids[name]:
+                    if id_ not in results:
+                        results.append(id_)
+
+        return results[:limit]
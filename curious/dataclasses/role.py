@@ -197,7 +197,8 @@ class Role(Dataclass):
             if isinstance(permissions, dt_permissions.Permissions):
                 permissions = permissions.bitfield
 
-        async with self._bot.events.wait_for_manager("role_update", lambda b, a: a.id == self.id):
+        async with self._bot.events.wait_for_manager("role_update", lambda b, a: a.id == self.id,
+                                                     key=self.id):
             await self._bot.http.edit_role(self.guild_id, self.id,
                                            name=name, permissions=permissions, colour=colour,
                                            hoist=hoist, position=position, mentionable=mentionable)
@@ -24,6 +24,7 @@ import datetime
 from curious.dataclasses import channel as dt_channel, guild as dt_guild, message as dt_message
 from curious.dataclasses.bases import Dataclass
 from curious.exc import CuriousError
+from curious.util import intern_or_none
 
 
 class AvatarUrl(object):
@@ -110,10 +111,10 @@ class User(Dataclass):
 
         #: The discriminator of this user.
         #: Note: This is a string, not an integer.
-        self.discriminator = kwargs.get("discriminator", None)
+        self.discriminator = intern_or_none(kwargs.get("discriminator", None))
 
         #: The avatar hash of this user.
-        self.avatar_hash = kwargs.get("avatar", None)
+        self.avatar_hash = intern_or_none(kwargs.get("avatar", None))
 
         #: If this user is verified or not.
         self.verified = kwargs.get("verified", None)
@@ -137,11 +137,10 @@ class ReactionsPaginator(object):
             else:
                 raise ListenerExit
 
-        # spawn the consumer task first
-        self.bot.events.add_temporary_listener("message_reaction_add", consume_reaction)
-
-        # send the stuff we want
+        # send the message first, so the listener can be keyed by its ID
         await self.send_current_page()
+        self.bot.events.add_temporary_listener("message_reaction_add", consume_reaction,
+                                               key=self._message.id)
         await self._add_initial_reactions()
 
         try:
@@ -176,4 +175,5 @@ class ReactionsPaginator(object):
         self._running = False
         # we've broken out of the loop, so remove reactions and cancel the listener
         await self._message.remove_all_reactions()
-        self.bot.events.remove_listener_early("message_reaction_add", consume_reaction)
+        self.bot.events.remove_listener_early("message_reaction_add", consume_reaction,
+                                              key=self._message.id)
@@ -24,6 +24,7 @@ import datetime
 import functools
 import imghdr
 import inspect
+import sys
 import textwrap
 import types
 import warnings
@@ -149,6 +150,19 @@ def to_datetime(timestamp: str) -> datetime.datetime:
         return datetime.datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S")
 
 
+def intern_or_none(value: str) -> str:
+    """
+    Interns a string, so that every object holding an equal string shares the same one.
+
+    :param value: The string to intern, or None.
+    :return: The interned string, or None if the value was None.
+    """
+    if value is None:
+        return None
+
+    return sys.intern(value)
+
+
 def replace_quotes(item: str) -> str:
     """
     Replaces the quotes in a string, but only if they are un-escaped.
@@ -54,6 +54,7 @@ setup(
     extras_require={
         "voice": ["opuslib==1.1.0",
                   "PyNaCL==1.0.1"],
+        "eventbus": ["msgpack>=0.5.6"],
         "docs": [
             "sphinx_py3doc_enhanced_theme",
             "sphinx",
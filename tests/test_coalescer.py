@@ -0,0 +1,131 @@
+"""
+Tests for holding and merging dispatches with :class:`.DispatchCoalescer`.
+"""
+import functools
+from types import SimpleNamespace
+
+import multio
+import trio
+
+from curious.core.client import Client
+from curious.core.coalescer import DispatchCoalescer
+
+multio.init("trio")
+
+
+def _presence(user: int, roles: list, **data):
+    return ("gateway_dispatch_received", "PRESENCE_UPDATE",
+            {"guild_id": "1", "user": {"id": str(user)}, "roles": roles, **data})
+
+
+def _member_update(user: int, roles: list, **data):
+    return ("gateway_dispatch_received", "GUILD_MEMBER_UPDATE",
+            {"guild_id": "1", "user": {"id": str(user)}, "roles": roles, **data})
+
+
+def _process(coalescer: DispatchCoalescer, events: list) -> list:
+    # the same steps the client takes for every dispatch, followed by a flush
+    processed = []
+    for event in events:
+        if coalescer.hold(event):
+            continue
+
+        processed += coalescer.release(event)
+        processed.append(event)
+
+    return processed + coalescer.drain()
+
+
+def _summary(events: list) -> list:
+    return [(name, data["user"]["id"], data["roles"], data.get("status")) for _, name, data in events]
+
+
+def test_merges_same_type():
+    coalescer = DispatchCoalescer()
+    processed = _process(coalescer, [
+        _presence(1, ["a"], status="online"),
+        _presence(2, ["a"], status="online"),
+        _presence(1, ["a"], status="idle"),
+    ])
+
+    assert _summary(processed) == [
+        ("PRESENCE_UPDATE", "1", ["a"], "idle"),
+        ("PRESENCE_UPDATE", "2", ["a"], "online"),
+    ]
+    assert coalescer.coalesced["PRESENCE_UPDATE"] == 1
+
+
+def test_presence_and_member_update_keep_order():
+    coalescer = DispatchCoalescer()
+    processed = _process(coalescer, [
+        _presence(1, ["old"], status="online"),
+        _presence(2, ["a"], status="online"),
+        _member_update(1, ["new"]),
+        _presence(1, ["new"], status="idle"),
+    ])
+
+    # the member update is applied after the presence held before it, and before the one after it
+    assert _summary(processed) == [
+        ("PRESENCE_UPDATE", "1", ["old"], "online"),
+        ("GUILD_MEMBER_UPDATE", "1", ["new"], None),
+        ("PRESENCE_UPDATE", "2", ["a"], "online"),
+        ("PRESENCE_UPDATE", "1", ["new"], "idle"),
+    ]
+
+
+def test_member_update_then_presence_keep_order():
+    coalescer = DispatchCoalescer()
+    processed = _process(coalescer, [
+        _member_update(1, ["old"]),
+        _presence(1, ["old"], status="online"),
+        _member_update(1, ["new"]),
+    ])
+
+    assert _summary(processed) == [
+        ("GUILD_MEMBER_UPDATE", "1", ["old"], None),
+        ("PRESENCE_UPDATE", "1", ["old"], "online"),
+        ("GUILD_MEMBER_UPDATE", "1", ["new"], None),
+    ]
+
+
+def test_barrier_releases_everything():
+    coalescer = DispatchCoalescer()
+    remove = ("gateway_dispatch_received", "GUILD_MEMBER_REMOVE",
+              {"guild_id": "1", "user": {"id": "1"}})
+    processed = _process(coalescer, [_presence(1, ["a"]), _member_update(2, ["b"]), remove])
+
+    assert [event[1] for event in processed] == ["PRESENCE_UPDATE", "GUILD_MEMBER_UPDATE",
+                                                 "GUILD_MEMBER_REMOVE"]
+    assert len(coalescer) == 0
+
+
+def test_client_keeps_order():
+    class Gateway:
+        gw_state = SimpleNamespace(shard_id=0)
+
+        async def events(self):
+            yield _presence(1, ["old"], status="online")
+            yield _member_update(1, ["new"])
+            yield _presence(1, ["new"], status="idle")
+            await trio.sleep(0.1)
+
+    async def main():
+        client = Client("x.y.z", coalescer_factory=functools.partial(DispatchCoalescer,
+                                                                     window=0.02))
+        seen = []
+
+        async def fire_event(name, *args, gateway):
+            seen.append(args)
+            # give the flusher a chance to run in the middle of a dispatch
+            await trio.sleep(0.01)
+
+        client.fire_event = fire_event
+        await client._handle_shard_staged(0, Gateway())
+        return seen
+
+    seen = trio.run(main)
+    assert [(name, data["roles"]) for name, data in seen] == [
+        ("PRESENCE_UPDATE", ["old"]),
+        ("GUILD_MEMBER_UPDATE", ["new"]),
+        ("PRESENCE_UPDATE", ["new"]),
+    ]
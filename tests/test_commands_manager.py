@@ -0,0 +1,64 @@
+"""
+Tests for loading and unloading plugins with :class:`.CommandsManager`.
+"""
+import multio
+import pytest
+import trio
+
+from curious.commands.manager import CommandsManager
+from curious.commands.plugin import Plugin
+from curious.core.client import Client
+from curious.core.event import event
+
+multio.init("trio")
+
+
+class First(Plugin):
+    unloaded = False
+
+    @event("message_create")
+    async def on_message(self, ctx, message):
+        pass
+
+    async def unload(self):
+        self.unloaded = True
+
+
+class Second(First):
+    pass
+
+
+def _handlers(manager: CommandsManager):
+    return [handler.__self__ for handler in
+            manager.client.events.event_listeners.getall("message_create", ())
+            if hasattr(handler, "__self__") and isinstance(handler.__self__, Plugin)]
+
+
+@pytest.mark.parametrize("target", ["First", First])
+def test_unload_plugin_leaves_others(target):
+    async def main():
+        manager = CommandsManager(Client("x.y.z"), command_prefix="!")
+        first = await manager.load_plugin(First)
+        second = await manager.load_plugin(Second)
+
+        assert await manager.unload_plugin(target) is first
+        assert first.unloaded and not second.unloaded
+        assert list(manager.plugins.values()) == [second]
+        assert _handlers(manager) == [second]
+
+    trio.run(main)
+
+
+def test_unload_plugin_not_loaded():
+    class Other(Plugin):
+        pass
+
+    async def main():
+        manager = CommandsManager(Client("x.y.z"), command_prefix="!")
+        first = await manager.load_plugin(First)
+
+        assert await manager.unload_plugin(Other) is None
+        assert not first.unloaded
+        assert _handlers(manager) == [first]
+
+    trio.run(main)
@@ -0,0 +1,61 @@
+"""
+Tests for the local event bus.
+"""
+import socket
+
+import multio
+import trio
+
+from curious.core.event_bus import BusEncoding, BusOpcode, EventBusPublisher, HEADER, \
+    _sendall, encode_packet, open_event_bus
+
+multio.init("trio")
+
+
+async def _send_raw(path: str, data: bytes):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        sock.connect(path)
+        await _sendall(sock, data)
+        # wait for the publisher to hang up
+        await multio.asynclib.wait_read(sock)
+        assert sock.recv(1) == b""
+    finally:
+        sock.close()
+
+
+def test_bad_packets_only_disconnect_worker(tmp_path):
+    path = str(tmp_path / "events.sock")
+    bad_packets = [
+        # unknown encoding
+        HEADER.pack(BusOpcode.SUBSCRIBE, 7, 0),
+        # unknown opcode
+        HEADER.pack(9, BusEncoding.JSON, 4) + b"null",
+        # body that isn't JSON
+        HEADER.pack(BusOpcode.SUBSCRIBE, BusEncoding.JSON, 3) + b"{x}",
+        # body that isn't a list of dispatch names
+        encode_packet(BusOpcode.SUBSCRIBE, 1, BusEncoding.JSON),
+    ]
+
+    async def main():
+        publisher = EventBusPublisher(path)
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(publisher.serve)
+            await trio.sleep(0.1)
+
+            for packet in bad_packets:
+                await _send_raw(path, packet)
+
+            async with open_event_bus(path, ["MESSAGE_CREATE"],
+                                      encoding=BusEncoding.JSON) as bus:
+                await trio.sleep(0.1)
+                await publisher.publish(0, "MESSAGE_CREATE", {"id": "1"})
+                with trio.fail_after(5):
+                    async for dispatch in bus.dispatches():
+                        assert dispatch == (0, "MESSAGE_CREATE", {"id": "1"})
+                        break
+
+            nursery.cancel_scope.cancel()
+
+    trio.run(main)
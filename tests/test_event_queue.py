@@ -0,0 +1,36 @@
+"""
+Tests for queueing dispatches with :class:`.EventQueue`.
+"""
+import multio
+import trio
+
+from curious.core.event_queue import EventQueue
+
+multio.init("trio")
+
+
+def _dispatch(name: str, user: int, roles: list):
+    return ("gateway_dispatch_received", name,
+            {"guild_id": "1", "user": {"id": str(user)}, "roles": roles})
+
+
+def test_presences_not_coalesced_across_member_updates():
+    async def main():
+        queue = EventQueue()
+        for event in [
+            _dispatch("PRESENCE_UPDATE", 1, ["old"]),
+            _dispatch("GUILD_MEMBER_UPDATE", 1, ["new"]),
+            _dispatch("PRESENCE_UPDATE", 1, ["new"]),
+            _dispatch("PRESENCE_UPDATE", 1, ["newer"]),
+        ]:
+            assert await queue.put(event)
+
+        return [(await queue.get()) for _ in range(len(queue))], queue
+
+    events, queue = trio.run(main)
+    assert [(name, data["roles"]) for _, name, data in events] == [
+        ("PRESENCE_UPDATE", ["old"]),
+        ("GUILD_MEMBER_UPDATE", ["new"]),
+        ("PRESENCE_UPDATE", ["newer"]),
+    ]
+    assert queue.coalesced["PRESENCE_UPDATE"] == 1
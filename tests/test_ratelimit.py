@@ -0,0 +1,139 @@
+"""
+Tests for command ratelimits and :class:`.RateLimitBackend`.
+"""
+import time
+import warnings
+from types import SimpleNamespace
+
+import multio
+import pytest
+import trio
+
+from curious.commands.decorators import command, ratelimit
+from curious.commands.exc import CommandRateLimited
+from curious.commands.ratelimit import BucketNamer, CommandRateLimit, RateLimitAlgorithm, \
+    RateLimitBackend, RateLimiter
+from curious.util import CuriousDeprecatedWarning
+
+multio.init("trio")
+
+
+class SharedStore(object):
+    """
+    A store shared between processes, such as a Redis server, with a compare-and-set operation.
+    """
+
+    def __init__(self):
+        # key -> (version, state)
+        self.data = {}
+        self.conflicts = 0
+
+    async def get(self, key: int):
+        return self.data.get(key, (0, None))
+
+    async def compare_and_set(self, key: int, version: int, state) -> bool:
+        # let other "processes" run in between the get and the set
+        await trio.sleep(0)
+        if self.data.get(key, (0, None))[0] != version:
+            self.conflicts += 1
+            return False
+
+        self.data[key] = (version + 1, state)
+        return True
+
+
+class CompareAndSetBackend(RateLimitBackend):
+    """
+    A backend for a shared store, following the contract of :class:`.RateLimitBackend`.
+    """
+
+    def __init__(self, store: SharedStore):
+        self.store = store
+
+    async def hit(self, key: int, limit: CommandRateLimit) -> float:
+        while True:
+            version, state = await self.store.get(key)
+            retry_after, state, _ = limit.apply(state, time.time())
+            if retry_after > 0:
+                return retry_after
+
+            if await self.store.compare_and_set(key, version, state):
+                return 0.0
+
+
+def _command(**kwargs):
+    @ratelimit(bucket_namer=BucketNamer.GLOBAL, **kwargs)
+    @command()
+    async def cmd(ctx):
+        pass
+
+    return cmd
+
+
+async def _use(limiter: RateLimiter, cmd) -> bool:
+    try:
+        await limiter.ensure_ratelimits(SimpleNamespace(), cmd)
+    except CommandRateLimited:
+        return False
+
+    return True
+
+
+@pytest.mark.parametrize("algorithm", list(RateLimitAlgorithm))
+def test_shared_backend_across_processes(algorithm):
+    cmd = _command(limit=5, time=60, algorithm=algorithm)
+    store = SharedStore()
+    # one limiter per "process", all sharing the same store
+    limiters = [RateLimiter(CompareAndSetBackend(store)) for _ in range(3)]
+    results = []
+
+    async def use(limiter):
+        results.append(await _use(limiter, cmd))
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            for _ in range(4):
+                for limiter in limiters:
+                    nursery.start_soon(use, limiter)
+
+    trio.run(main)
+    # the limit holds across every process, even though their uses raced each other
+    assert results.count(True) == 5
+    assert store.conflicts > 0
+
+
+def test_memory_backend():
+    cmd = _command(limit=2, time=60)
+    limiter = RateLimiter()
+
+    async def main():
+        return [await _use(limiter, cmd) for _ in range(3)]
+
+    assert trio.run(main) == [True, True, False]
+    assert len(limiter.backend) == 1
+
+
+def test_legacy_buckets_warn_once():
+    class LegacyRateLimiter(RateLimiter):
+        def __init__(self):
+            super().__init__()
+            self.buckets = {}
+
+        async def get_bucket(self, key):
+            return self.buckets.get(key)
+
+        async def update_bucket(self, key, current_uses, expiration):
+            self.buckets[key] = (current_uses, expiration)
+
+    cmd = _command(limit=2, time=60)
+    limiter = LegacyRateLimiter()
+
+    async def main():
+        return [await _use(limiter, cmd) for _ in range(3)]
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert trio.run(main) == [True, True, False]
+
+    assert [w.category for w in caught] == [CuriousDeprecatedWarning]
+    assert list(limiter.buckets.values())[0][0] == 2
@@ -0,0 +1,149 @@
+"""
+Regression tests for splitting command arguments with :class:`.TokenStream`.
+
+The old splitter is kept here, so that the cases where the output is meant to be the same are
+checked against it, and the cases where it deliberately changed are listed explicitly.
+"""
+import multio
+import pytest
+import trio
+
+from curious.commands.context import Context
+from curious.commands.decorators import command
+from curious.commands.utils import TokenStream, _convert, split_message_content
+from curious.core.client import Client
+from curious.core.event import EventContext
+from curious.util import replace_quotes
+
+multio.init("trio")
+
+
+# This function is the old version of split_message_content, taken from
+# https://stackoverflow.com/a/43035638.
+# This function is licenced under the MIT Licence. (C) 2017 THE_MAD_KING.
+# See: https://meta.stackexchange.com/questions/272956/a-new-code-license-the-mit-this-time-with
+# -attribution-required
+# You can find a copy of the MIT Licence at https://opensource.org/licenses/MIT.
+def old_split(content: str, delim: str = " ") -> list:
+    tokens = []
+    cur = ''
+    in_quotes = False
+
+    for char in content.strip():
+        if char == delim and not in_quotes:
+            tokens.append(cur)
+            cur = ''
+        elif char == '"' and not in_quotes:
+            in_quotes = True
+            cur += char
+        elif char == '"' and in_quotes:
+            in_quotes = False
+            cur += char
+        else:
+            cur += char
+    tokens.append(cur)
+
+    return tokens
+
+
+# inputs where the tokens are the same as the old splitter followed by replace_quotes
+UNCHANGED = [
+    "a b c",
+    " a b ",
+    '"a b" c',
+    'a "b c" d',
+    '"unterminated a b',
+    "x\ny z",
+    '"a"b"c" d',
+]
+
+
+@pytest.mark.parametrize("content", UNCHANGED)
+def test_split_unchanged(content):
+    assert split_message_content(content) == old_split(content)
+    old = [replace_quotes(token) for token in old_split(content) if token]
+    assert list(TokenStream(content)) == old
+
+
+@pytest.mark.parametrize("content, expected", [
+    # escaped quotes are kept, without the backslash; replace_quotes dropped the quote after
+    # an escaped one
+    (r'a \"b\" c', ["a", '"b"', "c"]),
+    (r'"a \"q\" b" c', ['a "q" b', "c"]),
+    # escaped backslashes are unescaped
+    (r"a\\ b", ["a\\", "b"]),
+    # empty tokens from repeated delimiters are skipped, but quoted empty strings are kept
+    ("a  b", ["a", "b"]),
+    ('a "" b', ["a", "", "b"]),
+])
+def test_split_changed(content, expected):
+    assert list(TokenStream(content)) == expected
+
+
+def test_split_message_content_keeps_quotes():
+    # split_message_content still returns the tokens as written
+    assert split_message_content(r'a "b c" \"d\"  e') == ["a", '"b c"', r'\"d\"', "", "e"]
+
+
+def test_rest():
+    stream = TokenStream('eval  print("a  b")\n  x')
+    assert stream.next_raw() == "eval"
+    assert stream.rest() == 'print("a  b")\n  x'
+    assert stream.rest() is None
+
+
+async def _pos(ctx, a: str, b: str = None):
+    pass
+
+
+async def _kw(ctx, a: str, *, rest: str):
+    pass
+
+
+async def _var(ctx, *args: str):
+    pass
+
+
+def _convert_sync(func, content: str):
+    ctx = Context(message=None, event_context=EventContext(Client("x.y.z"), 0, "test"))
+    return trio.run(_convert, ctx, TokenStream(content), command()(func))
+
+
+@pytest.mark.parametrize("func, content, expected", [
+    # positional arguments are unquoted, as before
+    (_pos, '"a b" c', (["a b", "c"], {})),
+    (_pos, "a", (["a"], {})),
+    # keyword-only arguments get the rest of the message as written; leading delimiters are now
+    # stripped, where the old splitter kept all but one
+    (_kw, 'a "b  c"   d', (["a"], {"rest": '"b  c"   d'})),
+    (_kw, "a  b", (["a"], {"rest": "b"})),
+    # var-positional arguments are now unquoted like positional ones, and skip empty tokens;
+    # they used to get the tokens as written, including empty ones
+    (_var, 'a "b c"  d', (["a", "b c", "d"], {})),
+    (_var, r'a \"b\"', (["a", '"b"'], {})),
+])
+def test_convert(func, content, expected):
+    assert _convert_sync(func, content) == expected
+
+
+@pytest.mark.parametrize("func, tokens, expected", [
+    # lists from custom message checks are never split again, and each token is unquoted on its own
+    (_pos, ["hello world", "x"], (["hello world", "x"], {})),
+    (_pos, ['say "hi', "x"], (["say hi", "x"], {})),
+    (_pos, ["", '"a b"'], (["a b"], {})),
+    # keyword-only arguments get the rest of the tokens joined as they are, like before
+    (_kw, ["a", "hello world", '"b'], (["a"], {"rest": 'hello world "b'})),
+    (_var, ["hello world", '"b"'], (["hello world", "b"], {})),
+])
+def test_convert_token_list(func, tokens, expected):
+    ctx = Context(message=None, event_context=EventContext(Client("x.y.z"), 0, "test"))
+    assert trio.run(_convert, ctx, tokens, command()(func)) == expected
+
+
+def test_token_list_stream():
+    stream = TokenStream.from_tokens(["", "a b", "c"])
+    assert stream.peek_raw() == "a b"
+    assert stream.next_raw() == "a b"
+    assert stream.rest() == "c"
+    assert not stream
+    assert TokenStream.from_tokens([]).rest() is None